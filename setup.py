@@ -18,6 +18,8 @@ setup(
         "matplotlib>=3.5.0",
         "tqdm>=4.60.0",
         "pyyaml>=6.0.0",
+        'backports.zoneinfo>=0.2.1; python_version < "3.9"',
+        "tzdata>=2022.1",
     ],
     author="Nik Jois" "Nik Jois" "Nik Jois" "Nik Jois" "Nik Jois",
     author_email="nikjois@llamasearch.ai"
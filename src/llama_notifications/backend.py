@@ -0,0 +1,372 @@
+"""
+Numeric backend registry for the ML components.
+
+The spam filter, priority router and encryption service run a handful of
+small numeric kernels. Instead of probing for MLX types on every call, a
+backend (MLX, NumPy or pure Python) is selected once per process and its
+kernels are bound by each component at construction time, so the hot paths
+contain no backend branching.
+
+The backend can be forced with the ``LLAMA_NOTIFICATIONS_BACKEND``
+environment variable (``mlx``, ``numpy``, ``python`` or ``auto`` to pick the
+fastest by a short micro-benchmark).
+"""
+
+import logging
+import math
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import mlx.core as mx
+
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.backend")
+
+BACKEND_ENV_VAR = "LLAMA_NOTIFICATIONS_BACKEND"
+
+
+class Backend(ABC):
+    """
+    Numeric kernels bound to one array library.
+
+    Arrays returned by :meth:`asarray`, :meth:`normal` and :meth:`zeros` are
+    in the backend's native representation and must only be passed back to
+    kernels of the same backend.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def asarray(self, data: Any) -> Any:
+        """Convert array-like data to the native representation."""
+
+    @abstractmethod
+    def to_numpy(self, data: Any) -> np.ndarray:
+        """Convert a native array to NumPy."""
+
+    @abstractmethod
+    def normal(self, shape: Sequence[int], scale: float = 1.0) -> Any:
+        """Draw a native array from a zero-mean normal distribution."""
+
+    @abstractmethod
+    def zeros(self, shape: Sequence[int]) -> Any:
+        """Create a native array of zeros."""
+
+    @abstractmethod
+    def mlp(self, x: Any, w1: Any, b1: Any, w2: Any, b2: Any) -> float:
+        """Score one row with a ReLU hidden layer and sigmoid output."""
+
+    @abstractmethod
+    def mlp_batch(self, x: Any, w1: Any, b1: Any, w2: Any, b2: Any) -> np.ndarray:
+        """Score a (batch, features) matrix; returns a NumPy vector."""
+
+    @abstractmethod
+    def weighted_mean(self, values: Sequence[float], weights: Sequence[float]):
+        """Weighted mean of values (0.5 when the weights sum to zero)."""
+
+    @abstractmethod
+    def add_bytes(self, data: bytes, value: int) -> bytes:
+        """Add a constant to every byte modulo 256."""
+
+
+class NumpyBackend(Backend):
+    """Kernels implemented with NumPy."""
+
+    name = "numpy"
+
+    def asarray(self, data):
+        # Keep float32 (e.g. memory-mapped) arrays as they are
+        return data if isinstance(data, np.ndarray) else np.asarray(data)
+
+    def to_numpy(self, data):
+        return np.asarray(data)
+
+    def normal(self, shape, scale=1.0):
+        return np.random.normal(0, scale, tuple(shape))
+
+    def zeros(self, shape):
+        return np.zeros(tuple(shape))
+
+    def mlp(self, x, w1, b1, w2, b2):
+        hidden = np.maximum(0, np.dot(x, w1) + b1)
+        output = 1.0 / (1.0 + np.exp(-(np.dot(hidden, w2) + b2)))
+        return float(output[0])
+
+    def mlp_batch(self, x, w1, b1, w2, b2):
+        x = np.asarray(x, dtype=np.float64)
+        hidden = np.maximum(0, np.dot(x, w1) + b1)
+        output = 1.0 / (1.0 + np.exp(-(np.dot(hidden, w2) + b2)))
+        return output[:, 0]
+
+    def weighted_mean(self, values, weights):
+        total = float(np.sum(weights))
+        if total <= 0:
+            return 0.5
+        return float(np.dot(values, weights)) / total
+
+    def add_bytes(self, data, value):
+        array = np.frombuffer(data, dtype=np.uint8)
+        return (array + np.uint8(value % 256)).tobytes()
+
+
+class PythonBackend(Backend):
+    """Kernels implemented in pure Python on nested lists."""
+
+    name = "python"
+
+    def asarray(self, data):
+        if isinstance(data, np.ndarray):
+            return data.tolist()
+        return [self.asarray(item) for item in data] if _is_seq(data) else data
+
+    def to_numpy(self, data):
+        return np.asarray(data, dtype=np.float64)
+
+    def normal(self, shape, scale=1.0):
+        if len(shape) == 1:
+            return [random.gauss(0.0, scale) for _ in range(shape[0])]
+        return [self.normal(shape[1:], scale) for _ in range(shape[0])]
+
+    def zeros(self, shape):
+        if len(shape) == 1:
+            return [0.0] * shape[0]
+        return [self.zeros(shape[1:]) for _ in range(shape[0])]
+
+    def mlp(self, x, w1, b1, w2, b2):
+        hidden = list(b1)
+        for value, row in zip(x, w1):
+            if value:
+                for j, weight in enumerate(row):
+                    hidden[j] += value * weight
+
+        logit = b2[0]
+        for value, row in zip(hidden, w2):
+            if value > 0:
+                logit += value * row[0]
+        return 1.0 / (1.0 + math.exp(-logit))
+
+    def mlp_batch(self, x, w1, b1, w2, b2):
+        return np.array([self.mlp(row, w1, b1, w2, b2) for row in _rows(x)])
+
+    def weighted_mean(self, values, weights):
+        total = 0.0
+        score = 0.0
+        for value, weight in zip(values, weights):
+            score += value * weight
+            total += weight
+        return score / total if total > 0 else 0.5
+
+    def add_bytes(self, data, value):
+        return bytes((b + value) % 256 for b in data)
+
+
+class MLXBackend(Backend):
+    """Kernels implemented with MLX."""
+
+    name = "mlx"
+
+    def __init__(self):
+        if not MLX_AVAILABLE:
+            raise ImportError("mlx is not installed")
+
+    def asarray(self, data):
+        # MLX arrays own their memory, so this copies mapped weights
+        return mx.array(np.asarray(data))
+
+    def to_numpy(self, data):
+        return np.array(data)
+
+    def normal(self, shape, scale=1.0):
+        return mx.random.normal(tuple(shape)) * scale
+
+    def zeros(self, shape):
+        return mx.zeros(tuple(shape))
+
+    def mlp(self, x, w1, b1, w2, b2):
+        x = mx.array(x)
+        hidden = mx.maximum(0, mx.matmul(x, w1) + b1)
+        output = 1.0 / (1.0 + mx.exp(-(mx.matmul(hidden, w2) + b2)))
+        return float(output[0])
+
+    def mlp_batch(self, x, w1, b1, w2, b2):
+        x = mx.array(np.asarray(x, dtype=np.float32))
+        hidden = mx.maximum(0, mx.matmul(x, w1) + b1)
+        output = 1.0 / (1.0 + mx.exp(-(mx.matmul(hidden, w2) + b2)))
+        return np.array(output[:, 0])
+
+    def weighted_mean(self, values, weights):
+        weights = mx.array(weights)
+        total = float(mx.sum(weights))
+        if total <= 0:
+            return 0.5
+        return float(mx.sum(mx.array(values) * weights)) / total
+
+    def add_bytes(self, data, value):
+        array = mx.array(list(data)) + value
+        return bytes(int(b) % 256 for b in array.tolist())
+
+
+def _is_seq(data: Any) -> bool:
+    return isinstance(data, (list, tuple))
+
+
+def _rows(x: Any) -> List[Any]:
+    return x.tolist() if isinstance(x, np.ndarray) else list(x)
+
+
+# Registered backends in order of preference
+_REGISTRY: Dict[str, Callable[[], Backend]] = {
+    "mlx": MLXBackend,
+    "numpy": NumpyBackend,
+    "python": PythonBackend,
+}
+
+_selected: Optional[Backend] = None
+
+
+def register_backend(name: str, factory: Callable[[], Backend]) -> None:
+    """
+    Register an additional backend.
+
+    Args:
+        name: Backend name
+        factory: Callable creating the backend; raises ImportError when the
+            backend can't be used in this environment
+    """
+    _REGISTRY[name] = factory
+
+
+def create_backend(name: str) -> Backend:
+    """
+    Create a backend by name.
+
+    Args:
+        name: Registered backend name
+
+    Returns:
+        The backend
+
+    Raises:
+        ValueError: If the name is not registered
+        ImportError: If the backend is unavailable
+    """
+    if name not in _REGISTRY:
+        raise ValueError(f"Unknown numeric backend: {name}")
+    return _REGISTRY[name]()
+
+
+def available_backends() -> List[str]:
+    """
+    List the backends usable in this environment, in order of preference.
+
+    Returns:
+        List of backend names
+    """
+    names = []
+    for name in _REGISTRY:
+        try:
+            create_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def benchmark_backends(
+    names: Optional[Sequence[str]] = None,
+    iterations: int = 200,
+    batch_size: int = 64,
+) -> Dict[str, float]:
+    """
+    Time the spam network kernels on every available backend.
+
+    The workload mixes single-row scoring (the per-notification path) with
+    small batches, using the spam network's layer sizes.
+
+    Args:
+        names: Backends to time (defaults to all available)
+        iterations: Number of single-row forward passes
+        batch_size: Rows per batched forward pass
+
+    Returns:
+        Dictionary mapping backend names to elapsed seconds
+    """
+    rng = np.random.RandomState(0)
+    weights = [
+        rng.normal(0, 0.1, (32, 16)),
+        np.zeros(16),
+        rng.normal(0, 0.1, (16, 1)),
+        np.zeros(1),
+    ]
+    row = rng.uniform(0, 1, 32).tolist()
+    batch = rng.uniform(0, 1, (batch_size, 32))
+
+    timings = {}
+    for name in names or available_backends():
+        backend = create_backend(name)
+        native = [backend.asarray(w) for w in weights]
+        mlp, mlp_batch = backend.mlp, backend.mlp_batch
+
+        # Warm up (MLX compiles lazily)
+        mlp(row, *native)
+        mlp_batch(batch, *native)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            mlp(row, *native)
+        for _ in range(max(iterations // batch_size, 1)):
+            mlp_batch(batch, *native)
+        timings[name] = time.perf_counter() - start
+
+    return timings
+
+
+def select_backend(name: Optional[str] = None) -> Backend:
+    """
+    Select the process-wide backend.
+
+    Components bind kernels when they are constructed, so select the
+    backend at startup before creating them.
+
+    Args:
+        name: Backend name, ``auto`` to benchmark, or None to use the
+            environment variable or the first available backend
+
+    Returns:
+        The selected backend
+    """
+    global _selected
+
+    name = name or os.environ.get(BACKEND_ENV_VAR)
+    if name == "auto":
+        timings = benchmark_backends()
+        name = min(timings, key=timings.get)
+        logger.info(f"Benchmarked numeric backends: {timings}")
+    elif name is None:
+        name = available_backends()[0]
+
+    _selected = create_backend(name)
+    logger.info(f"Using {_selected.name} numeric backend")
+    return _selected
+
+
+def get_backend() -> Backend:
+    """
+    Get the process-wide backend, selecting it on first use.
+
+    Returns:
+        The selected backend
+    """
+    if _selected is None:
+        return select_backend()
+    return _selected
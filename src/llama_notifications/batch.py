@@ -0,0 +1,165 @@
+"""
+Columnar representation of notification request batches.
+
+Each ML stage used to pull fields out of request and content objects one
+attribute at a time. :class:`RequestBatch` does that once per batch and keeps
+the result as parallel columns: raw and lowercased text, lengths, context
+values as NumPy arrays and channel availability bitmasks. The spam filter,
+priority router and context analyzer all have batch entry points that read
+these columns directly.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Bit of each channel (by name) in channel masks
+CHANNEL_BITS = {"PUSH": 1, "SMS": 2, "EMAIL": 4}
+
+# Column order of per-channel matrices
+CHANNEL_NAMES = ("PUSH", "SMS", "EMAIL")
+
+# Recipient attributes that make each channel reachable
+_CHANNEL_ADDRESSES = {"PUSH": "push_token", "SMS": "phone", "EMAIL": "email"}
+
+# Numeric context values (NaN where a request doesn't set them)
+NUMERIC_CONTEXT_KEYS = (
+    "time_sensitivity",
+    "user_engagement",
+    "content_importance",
+    "user_relationship",
+    "business_impact",
+)
+
+# Boolean context flags (0.0 or 1.0)
+FLAG_CONTEXT_KEYS = (
+    "is_time_critical",
+    "is_security_related",
+    "is_safety_related",
+    "app_active",
+    "recent_interaction",
+    "time_sensitive",
+    "interaction_required",
+)
+
+
+@dataclass
+class RequestBatch:
+    """Struct-of-arrays view of a batch of notification requests."""
+
+    notification_ids: List[str]
+    titles: List[str]
+    bodies: List[str]
+    titles_lower: List[str]
+    bodies_lower: List[str]
+    title_lengths: np.ndarray
+    body_lengths: np.ndarray
+    # Priority level of each request (0 LOW to 3 URGENT)
+    priority_levels: np.ndarray
+    # Bitmask of requested channels the recipient has an address for
+    channel_masks: np.ndarray
+    context_columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    # Original content objects and context dicts, for stages that need
+    # fields without a column
+    contents: List[Any] = field(default_factory=list)
+    contexts: List[Dict[str, Any]] = field(default_factory=list)
+    # Recipient user ids (None where the recipient has none)
+    user_ids: List[Optional[str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.notification_ids)
+
+    @property
+    def message_lengths(self) -> np.ndarray:
+        """Combined title and body length of each request."""
+        return self.title_lengths + self.body_lengths
+
+    def column(self, key: str, default: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        Get a context column with missing values filled in.
+
+        Args:
+            key: Context key
+            default: Value for requests that don't set the key, or an array
+                of per-request values
+
+        Returns:
+            Float array with one value per request
+        """
+        values = self.context_columns.get(key)
+        if values is None:
+            return np.broadcast_to(default, len(self)).astype(np.float64)
+        return np.where(np.isnan(values), default, values)
+
+    def has_channel(self, channel: Any) -> np.ndarray:
+        """
+        Get whether each request can use a channel.
+
+        Args:
+            channel: A ``ChannelType`` member (from any module)
+
+        Returns:
+            Boolean array with one value per request
+        """
+        return (self.channel_masks & CHANNEL_BITS[channel.name]) != 0
+
+    @classmethod
+    def from_requests(cls, requests: Sequence[Any]) -> "RequestBatch":
+        """
+        Build a batch from service-level notification requests.
+
+        Requests need ``notification_id``, ``content`` (with ``title`` and
+        ``body``), ``recipient``, ``channels``, ``priority`` and ``context``
+        attributes, as in ``NotificationRequest``.
+
+        Args:
+            requests: The notification requests
+
+        Returns:
+            The columnar batch
+        """
+        count = len(requests)
+        titles = [request.content.title for request in requests]
+        bodies = [request.content.body for request in requests]
+        contexts = [request.context or {} for request in requests]
+
+        numeric = {key: np.full(count, math.nan) for key in NUMERIC_CONTEXT_KEYS}
+        flags = {key: np.zeros(count) for key in FLAG_CONTEXT_KEYS}
+        channel_masks = np.zeros(count, dtype=np.uint8)
+        priority_levels = np.zeros(count, dtype=np.int8)
+
+        for i, (request, context) in enumerate(zip(requests, contexts)):
+            for key in NUMERIC_CONTEXT_KEYS:
+                if key in context:
+                    numeric[key][i] = float(context[key])
+            for key in FLAG_CONTEXT_KEYS:
+                if context.get(key, False):
+                    flags[key][i] = 1.0
+
+            mask = 0
+            for channel in request.channels:
+                address = _CHANNEL_ADDRESSES.get(channel.name)
+                if address and getattr(request.recipient, address, None):
+                    mask |= CHANNEL_BITS[channel.name]
+            channel_masks[i] = mask
+            priority_levels[i] = request.priority.value
+
+        return cls(
+            notification_ids=[request.notification_id for request in requests],
+            titles=titles,
+            bodies=bodies,
+            titles_lower=[title.lower() for title in titles],
+            bodies_lower=[body.lower() for body in bodies],
+            title_lengths=np.fromiter(map(len, titles), dtype=np.int64, count=count),
+            body_lengths=np.fromiter(map(len, bodies), dtype=np.int64, count=count),
+            priority_levels=priority_levels,
+            channel_masks=channel_masks,
+            context_columns={**numeric, **flags},
+            contents=[request.content for request in requests],
+            contexts=contexts,
+            user_ids=[
+                getattr(request.recipient, "user_id", None) for request in requests
+            ],
+        )
@@ -0,0 +1,326 @@
+"""
+Frequency capping of notifications per user and channel.
+
+Caps such as "at most 3 pushes per hour" and "at most 2 SMS per day" are
+enforced with approximate sliding windows: each window is split into a few
+sub-buckets of counts, and a count covers the sub-buckets that overlap the
+window. State is a small fixed-size array per (user, channel) key, expired
+lazily when the key is next touched, and the number of keys is bounded by
+evicting the least recently used ones.
+"""
+
+import logging
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .clock import get_clock
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.capping")
+
+
+@dataclass(frozen=True)
+class CapRule:
+    """Maximum number of notifications on a channel within a window."""
+
+    channel: Hashable
+    limit: int
+    window_seconds: float
+
+    def __post_init__(self):
+        if self.limit < 0:
+            raise ValueError("limit must be non-negative")
+        if self.window_seconds <= 0:
+            raise ValueError("window_seconds must be positive")
+
+
+class _Window:
+    """Sub-bucketed counts of one key under one rule."""
+
+    __slots__ = ("bucket", "counts")
+
+    def __init__(self, bucket: int, sub_buckets: int):
+        self.bucket = bucket
+        self.counts = array("I", bytes(4 * sub_buckets))
+
+    def advance(self, bucket: int) -> None:
+        """Move to a later bucket, clearing the buckets that left the window."""
+        steps = bucket - self.bucket
+        if steps <= 0:
+            return
+        counts = self.counts
+        if steps >= len(counts):
+            for i in range(len(counts)):
+                counts[i] = 0
+        else:
+            for b in range(self.bucket + 1, bucket + 1):
+                counts[b % len(counts)] = 0
+        self.bucket = bucket
+
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def free_bucket(self, limit: int) -> int:
+        """First bucket at which the count drops below ``limit``."""
+        sub_buckets = len(self.counts)
+        remaining = self.total()
+        for b in range(self.bucket - sub_buckets + 1, self.bucket + 1):
+            remaining -= self.counts[b % sub_buckets]
+            if remaining < limit:
+                # Bucket b leaves the window once the current bucket passes it
+                return b + sub_buckets
+        return self.bucket + sub_buckets
+
+
+class FrequencyCapper:
+    """Sliding-window frequency caps for (user, channel) keys."""
+
+    def __init__(
+        self,
+        rules: Iterable[CapRule],
+        sub_buckets: int = 12,
+        max_keys: int = 1_000_000,
+    ):
+        """
+        Initialize the capper.
+
+        Args:
+            rules: Caps to enforce; a channel may have several (e.g. hourly
+                and daily)
+            sub_buckets: Sub-buckets per window; more are more precise at
+                the window edge and use more memory per key
+            max_keys: Maximum number of (user, channel) keys kept
+        """
+        if sub_buckets < 1:
+            raise ValueError("sub_buckets must be at least 1")
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1")
+
+        self.sub_buckets = sub_buckets
+        self.max_keys = max_keys
+        self.rules: Dict[Hashable, Tuple[CapRule, ...]] = {}
+        for rule in rules:
+            self.rules[rule.channel] = self.rules.get(rule.channel, ()) + (rule,)
+
+        self._counters: "OrderedDict[Tuple[str, Hashable], List[_Window]]" = (
+            OrderedDict()
+        )
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def _bucket(self, rule: CapRule, now: float) -> int:
+        return int(now * self.sub_buckets // rule.window_seconds)
+
+    def _windows(
+        self, user_id: str, channel: Hashable, now: float, create: bool
+    ) -> Optional[List[_Window]]:
+        """Get a key's windows advanced to ``now`` (lock must be held)."""
+        key = (user_id, channel)
+        windows = self._counters.get(key)
+        if windows is None:
+            if not create:
+                return None
+            windows = [
+                _Window(self._bucket(rule, now), self.sub_buckets)
+                for rule in self.rules[channel]
+            ]
+            self._counters[key] = windows
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+                self._evictions += 1
+        else:
+            self._counters.move_to_end(key)
+            for rule, window in zip(self.rules[channel], windows):
+                window.advance(self._bucket(rule, now))
+        return windows
+
+    def _is_capped(self, channel: Hashable, windows: List[_Window]) -> bool:
+        return any(
+            window.total() >= rule.limit
+            for rule, window in zip(self.rules[channel], windows)
+        )
+
+    def is_capped(
+        self, user_id: str, channel: Hashable, now: Optional[float] = None
+    ) -> bool:
+        """
+        Check whether a channel has reached a cap for a user.
+
+        Args:
+            user_id: User identifier
+            channel: The channel to check
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            True if another notification would exceed a cap
+        """
+        rules = self.rules.get(channel)
+        if not rules:
+            return False
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            windows = self._windows(user_id, channel, now, create=False)
+            if windows is None:
+                return any(rule.limit == 0 for rule in rules)
+            return self._is_capped(channel, windows)
+
+    def capped_matrix(
+        self,
+        user_ids: Sequence[str],
+        channels: Sequence[Hashable],
+        now: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Check caps for many users at once.
+
+        Args:
+            user_ids: User identifiers
+            channels: Channels, in column order
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            Boolean (users x channels) array, True where capped
+        """
+        if now is None:
+            now = get_clock().time()
+
+        capped = np.zeros((len(user_ids), len(channels)), dtype=bool)
+        for column, channel in enumerate(channels):
+            if channel in self.rules:
+                capped[:, column] = [
+                    self.is_capped(user_id, channel, now) for user_id in user_ids
+                ]
+        return capped
+
+    def record(
+        self,
+        user_id: str,
+        channel: Hashable,
+        now: Optional[float] = None,
+        count: int = 1,
+    ) -> None:
+        """
+        Record notifications sent to a user on a channel.
+
+        Args:
+            user_id: User identifier
+            channel: The channel they were sent on
+            now: Time they were sent (defaults to the default clock)
+            count: Number of notifications
+        """
+        if channel not in self.rules:
+            return
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            for window in self._windows(user_id, channel, now, create=True):
+                window.counts[window.bucket % self.sub_buckets] += count
+
+    def try_record(
+        self, user_id: str, channel: Hashable, now: Optional[float] = None
+    ) -> bool:
+        """
+        Record a notification unless it would exceed a cap.
+
+        Args:
+            user_id: User identifier
+            channel: The channel to send on
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            True if the notification was recorded and may be sent
+        """
+        if channel not in self.rules:
+            return True
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            windows = self._windows(user_id, channel, now, create=True)
+            if self._is_capped(channel, windows):
+                return False
+            for window in windows:
+                window.counts[window.bucket % self.sub_buckets] += 1
+            return True
+
+    def capped_until(
+        self, user_id: str, channel: Hashable, now: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Get the time a capped channel can be used again.
+
+        Args:
+            user_id: User identifier
+            channel: The channel to check
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            Timestamp at which every cap allows another notification (inf
+            for a zero limit), or None if the channel isn't capped
+        """
+        rules = self.rules.get(channel)
+        if not rules:
+            return None
+        if any(rule.limit == 0 for rule in rules):
+            return math.inf
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            windows = self._windows(user_id, channel, now, create=False)
+            if windows is None or not self._is_capped(channel, windows):
+                return None
+
+            until = now
+            for rule, window in zip(rules, windows):
+                if window.total() >= rule.limit:
+                    bucket = window.free_bucket(rule.limit)
+                    until = max(until, bucket * rule.window_seconds / self.sub_buckets)
+            return until
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """
+        Drop keys with nothing left in any window.
+
+        Args:
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            Number of keys dropped
+        """
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            expired = []
+            for (user_id, channel), windows in self._counters.items():
+                for rule, window in zip(self.rules[channel], windows):
+                    window.advance(self._bucket(rule, now))
+                if not any(window.total() for window in windows):
+                    expired.append((user_id, channel))
+            for key in expired:
+                del self._counters[key]
+
+        logger.debug(f"Purged {len(expired)} expired frequency-capping keys")
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get capping statistics.
+
+        Returns:
+            Dictionary with the number of keys and keys evicted at capacity
+        """
+        return {"keys": len(self._counters), "evictions": self._evictions}
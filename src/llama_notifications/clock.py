@@ -0,0 +1,189 @@
+"""
+Clocks for the notification pipeline.
+
+Components read the time from a :class:`Clock` instead of calling
+``time.time()`` themselves, so one clock can be injected everywhere:
+
+- :class:`SystemClock` reads the system time on every call.
+- :class:`CachedClock` reads it once per :meth:`~CachedClock.tick`, so every
+  decision in a batch sees the same "now" and no syscall is made per
+  evaluation.
+- :class:`VirtualClock` only moves when told to and runs timers in time
+  order, for deterministic simulations of days of scheduled traffic in
+  seconds.
+
+Components without an explicit clock use the process-wide default from
+:func:`get_clock`.
+"""
+
+import heapq
+import itertools
+import logging
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.clock")
+
+
+class Clock(ABC):
+    """Source of the current time."""
+
+    @abstractmethod
+    def time(self) -> float:
+        """
+        Get the current time.
+
+        Returns:
+            Unix timestamp
+        """
+
+    def now(self) -> datetime:
+        """
+        Get the current time as a naive local datetime, like ``datetime.now()``.
+
+        Returns:
+            The current datetime
+        """
+        return datetime.fromtimestamp(self.time())
+
+
+class SystemClock(Clock):
+    """Clock reading the system time on every call."""
+
+    def time(self) -> float:
+        return time.time()
+
+
+class CachedClock(Clock):
+    """Clock holding a snapshot of another clock, refreshed per tick."""
+
+    def __init__(self, source: Optional[Clock] = None):
+        """
+        Initialize the clock.
+
+        Args:
+            source: Clock to take snapshots of (defaults to the system clock)
+        """
+        self.source = source or SystemClock()
+        self._now = self.source.time()
+
+    def tick(self) -> float:
+        """
+        Refresh the snapshot, e.g. at the start of each batch.
+
+        Returns:
+            The new snapshot
+        """
+        self._now = self.source.time()
+        return self._now
+
+    def time(self) -> float:
+        return self._now
+
+
+class VirtualClock(Clock):
+    """Manually advanced clock with timers, for simulations."""
+
+    def __init__(self, start: Optional[float] = None):
+        """
+        Initialize the clock.
+
+        Args:
+            start: Initial Unix timestamp (defaults to the system time)
+        """
+        self._now = time.time() if start is None else start
+        self._timers: List[Tuple[float, int, Callable[[], Any]]] = []
+        self._sequence = itertools.count()
+
+    def time(self) -> float:
+        return self._now
+
+    def call_at(self, when: float, callback: Callable[[], Any]) -> None:
+        """
+        Schedule a callback at a virtual time.
+
+        Args:
+            when: Unix timestamp to run the callback at
+            callback: Function called without arguments
+        """
+        heapq.heappush(self._timers, (when, next(self._sequence), callback))
+
+    def pending(self) -> int:
+        """Number of scheduled callbacks not yet run."""
+        return len(self._timers)
+
+    def advance(self, seconds: float) -> int:
+        """
+        Move the clock forward, running due callbacks in time order.
+
+        Each callback runs with the clock set to its scheduled time, and may
+        schedule further callbacks.
+
+        Args:
+            seconds: Time to move forward
+
+        Returns:
+            Number of callbacks run
+        """
+        if seconds < 0:
+            raise ValueError("a virtual clock can't move backwards")
+        return self.advance_to(self._now + seconds)
+
+    def advance_to(self, when: float) -> int:
+        """
+        Move the clock forward to a time, running due callbacks in time order.
+
+        Args:
+            when: Unix timestamp to move to
+
+        Returns:
+            Number of callbacks run
+        """
+        ran = 0
+        while self._timers and self._timers[0][0] <= when:
+            due, _, callback = heapq.heappop(self._timers)
+            self._now = max(self._now, due)
+            callback()
+            ran += 1
+        self._now = max(self._now, when)
+        return ran
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the clock instead of sleeping."""
+        self.advance(seconds)
+
+
+_default: Clock = SystemClock()
+
+
+def set_clock(clock: Clock) -> Clock:
+    """
+    Set the process-wide default clock.
+
+    Components read the default when they are constructed, so set it at
+    startup (or at the start of a simulation) before creating them.
+
+    Args:
+        clock: The new default clock
+
+    Returns:
+        The previous default clock
+    """
+    global _default
+
+    previous, _default = _default, clock
+    logger.info(f"Using {type(clock).__name__} as the default clock")
+    return previous
+
+
+def get_clock() -> Clock:
+    """
+    Get the process-wide default clock.
+
+    Returns:
+        The default clock
+    """
+    return _default
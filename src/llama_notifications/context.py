@@ -7,10 +7,24 @@ and notification content to determine the optimal delivery channel.
 """
 
 import logging
-import time
-from datetime import datetime, timezone
+from dataclasses import dataclass, replace
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .batch import CHANNEL_NAMES, RequestBatch
+from .capping import FrequencyCapper
+from .clock import Clock, get_clock
+from .dnd import (
+    FULL_DAY_MASK,
+    DndSchedule,
+    is_slot_set,
+    local_slot,
+    next_allowed_time,
+)
+from .history import DEFAULT_HISTORY_CAPACITY, NotificationHistory
+from .presence import Heartbeat, PresenceStore
 
 # Configure logging
 logger = logging.getLogger("llama_notifications.ml.context")
@@ -24,6 +38,24 @@ class ChannelType(Enum):
     EMAIL = 3
 
 
+# Channel scores are rounded to this many decimals
+SCORE_DECIMALS = 9
+
+# Channels in the column order of per-channel matrices
+_CHANNELS = tuple(ChannelType[name] for name in CHANNEL_NAMES)
+
+# Score penalty of a channel in DND, for LOW/NORMAL and HIGH/URGENT priority
+DND_PENALTY = 0.8
+DND_OVERRIDE_PENALTY = 0.3
+
+
+def _clamp_score(score: float) -> float:
+    """Clamp a summed channel score to [0, 1]."""
+    # Rounding makes equal sums of factors tie exactly regardless of the
+    # order they were added in
+    return round(max(0.0, min(score, 1.0)), SCORE_DECIMALS)
+
+
 class UserPreferences:
     """User notification preferences."""
 
@@ -50,39 +82,50 @@ class UserPreferences:
         self.do_not_disturb = do_not_disturb or {}
         self.timezone = timezone
         self.language = language
+        self._dnd_schedule = DndSchedule()
 
-    def is_dnd_active(self, channel: ChannelType) -> bool:
+    @property
+    def dnd_masks(self) -> Dict[ChannelType, int]:
+        """DND slot bitmasks by channel, following edits of the ranges."""
+        return self._dnd_schedule.masks(self.do_not_disturb)
+
+    def is_dnd_active(self, channel: ChannelType, now: Optional[float] = None) -> bool:
         """
         Check if Do Not Disturb is currently active for a channel.
 
         Args:
             channel: The channel type to check
+            now: Current timestamp (defaults to the default clock)
 
         Returns:
             True if DND is active, False otherwise
         """
-        if channel not in self.do_not_disturb:
+        mask = self.dnd_masks.get(channel)
+        if not mask:
             return False
+        if now is None:
+            now = get_clock().time()
 
-        # Get current hour in user's timezone
-        now = datetime.now(timezone.utc)
-        user_tz = datetime.now(
-            tz=timezone.utc
-        )  # Placeholder, should use proper timezone
-        current_hour = user_tz.hour
-
-        # Check if current hour falls within any DND period
-        for start_hour, end_hour in self.do_not_disturb.get(channel, []):
-            if start_hour <= end_hour:
-                # Simple range (e.g., 22-06)
-                if start_hour <= current_hour < end_hour:
-                    return True
-            else:
-                # Overnight range (e.g., 22-06)
-                if current_hour >= start_hour or current_hour < end_hour:
-                    return True
+        # Bit test against the current slot of the user's local day
+        return is_slot_set(mask, local_slot(self.timezone, now))
 
-        return False
+    def next_allowed_time(
+        self, channel: ChannelType, now: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Get the next time a channel is outside Do Not Disturb.
+
+        Args:
+            channel: The channel type to check
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            ``now`` if DND is not active, the time the current DND period
+            ends otherwise, or None if DND covers the whole day
+        """
+        if now is None:
+            now = get_clock().time()
+        return next_allowed_time(self.dnd_masks.get(channel, 0), self.timezone, now)
 
 
 class RecipientContext:
@@ -101,6 +144,7 @@ class RecipientContext:
         device_active: bool = False,
         last_active: Optional[int] = None,
         notification_history: Optional[Dict[ChannelType, List[Dict[str, Any]]]] = None,
+        history_capacity: int = DEFAULT_HISTORY_CAPACITY,
     ):
         """
         Initialize recipient context.
@@ -117,6 +161,7 @@ class RecipientContext:
             device_active: Whether user's device is currently active
             last_active: Timestamp of last activity
             notification_history: Recent notification history by channel
+            history_capacity: Notifications kept per channel
         """
         self.user_id = user_id
         self.preferences = preferences
@@ -128,7 +173,9 @@ class RecipientContext:
         self.email = email
         self.device_active = device_active
         self.last_active = last_active
-        self.notification_history = notification_history or {}
+        self.notification_history = NotificationHistory(
+            notification_history, capacity=history_capacity
+        )
 
     def has_channel(self, channel: ChannelType) -> bool:
         """
@@ -169,8 +216,33 @@ class RecipientContext:
 
         return channels
 
+    def record_notification(
+        self,
+        channel: ChannelType,
+        notification_id: str,
+        priority_level: int = 0,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """
+        Record a notification sent to the recipient.
+
+        Args:
+            channel: The channel it was sent on
+            notification_id: Notification identifier
+            priority_level: Priority level (0-3)
+            timestamp: Time it was sent (defaults to the default clock)
+        """
+        if timestamp is None:
+            timestamp = get_clock().time()
+        self.notification_history.record(
+            channel, timestamp, notification_id, priority_level
+        )
+
     def get_recent_notifications(
-        self, channel: Optional[ChannelType] = None, hours: int = 24
+        self,
+        channel: Optional[ChannelType] = None,
+        hours: int = 24,
+        now: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         """
         Get recent notifications for the recipient.
@@ -178,32 +250,36 @@ class RecipientContext:
         Args:
             channel: Optional channel to filter by
             hours: Time window in hours
+            now: Current timestamp (defaults to the default clock)
 
         Returns:
-            List of recent notifications
+            List of recent notifications in time order
         """
-        now = time.time()
+        if now is None:
+            now = get_clock().time()
         cutoff = now - (hours * 3600)
+        return self.notification_history.since(cutoff, channel)
 
-        if channel:
-            # Get notifications for specific channel
-            return [
-                n
-                for n in self.notification_history.get(channel, [])
-                if n.get("timestamp", 0) >= cutoff
-            ]
-        else:
-            # Get notifications across all channels
-            all_notifications = []
-            for channel_notifications in self.notification_history.values():
-                all_notifications.extend(
-                    [
-                        n
-                        for n in channel_notifications
-                        if n.get("timestamp", 0) >= cutoff
-                    ]
-                )
-            return all_notifications
+    def count_recent_notifications(
+        self,
+        channel: Optional[ChannelType] = None,
+        hours: float = 24,
+        now: Optional[float] = None,
+    ) -> int:
+        """
+        Count recent notifications for the recipient.
+
+        Args:
+            channel: Optional channel to filter by
+            hours: Time window in hours
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            Number of notifications in the window
+        """
+        if now is None:
+            now = get_clock().time()
+        return self.notification_history.count_window(hours * 3600, channel, now)
 
 
 class NotificationContext:
@@ -245,17 +321,22 @@ class NotificationContext:
         self.expires_at = expires_at
         self.metadata = metadata or {}
 
-    def is_expired(self) -> bool:
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """
         Check if notification has expired.
 
+        Args:
+            now: Current timestamp (defaults to the default clock)
+
         Returns:
             True if expired, False otherwise
         """
         if not self.expires_at:
             return False
 
-        return time.time() >= self.expires_at
+        if now is None:
+            now = get_clock().time()
+        return now >= self.expires_at
 
 
 class EnvironmentContext:
@@ -270,6 +351,7 @@ class EnvironmentContext:
         low_power_mode: bool = False,
         location_type: Optional[str] = None,
         app_state: Optional[str] = None,
+        clock: Optional[Clock] = None,
     ):
         """
         Initialize environment context.
@@ -282,8 +364,10 @@ class EnvironmentContext:
             low_power_mode: Whether device is in low power mode
             location_type: Location type (e.g., 'home', 'work', 'traveling')
             app_state: Application state (e.g., 'foreground', 'background', 'closed')
+            clock: Clock for the default current time (defaults to the
+                default clock)
         """
-        self.current_time = current_time or time.time()
+        self.current_time = current_time or (clock or get_clock()).time()
         self.network_type = network_type
         self.network_quality = network_quality
         self.battery_level = battery_level
@@ -319,15 +403,179 @@ class EnvironmentContext:
         return self.network_type not in (None, "offline")
 
 
+@dataclass
+class RecipientColumns:
+    """
+    Columnar recipient and environment attributes for batch channel scoring.
+
+    Per-channel arrays have shape (N, 3) in PUSH, SMS, EMAIL column order.
+    """
+
+    user_ids: List[str]
+    # Channel enabled and reachable
+    available: np.ndarray
+    # Score boost from the channel's rank in the user's preferences
+    preference_boost: np.ndarray
+    # DND active for the channel at ``now``
+    dnd: np.ndarray
+    # DND active at ``now`` and ending later (not set all day)
+    dnd_ends: np.ndarray
+    device_active: np.ndarray
+    # Active within the last hour at ``now``
+    recently_active: np.ndarray
+    app_foreground: np.ndarray
+    app_background: np.ndarray
+    device_constrained: np.ndarray
+    offline: np.ndarray
+    poor_network: np.ndarray
+    # No environment was given, so device presence may supply it
+    default_environment: np.ndarray
+    now: float
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @staticmethod
+    def environment_flags(
+        environment_contexts: Sequence[Optional[EnvironmentContext]],
+    ) -> np.ndarray:
+        """
+        Get the environment flags of each recipient.
+
+        Args:
+            environment_contexts: Environment of each recipient (None for
+                an empty environment)
+
+        Returns:
+            Boolean (N x 5) array of app foreground, app background, device
+            constrained, offline and poor network flags
+        """
+        flags = np.zeros((len(environment_contexts), 5), dtype=bool)
+        for i, environment in enumerate(environment_contexts):
+            if environment is None:
+                continue
+            flags[i] = (
+                environment.app_state == "foreground",
+                environment.app_state == "background",
+                environment.is_device_constrained(),
+                environment.network_type == "offline",
+                bool(environment.network_quality) and environment.network_quality < 0.5,
+            )
+        return flags
+
+    @classmethod
+    def from_contexts(
+        cls,
+        recipient_contexts: Sequence[RecipientContext],
+        environment_contexts: Optional[Sequence[Optional[EnvironmentContext]]] = None,
+        now: Optional[float] = None,
+    ) -> "RecipientColumns":
+        """
+        Build columns from recipient and environment contexts.
+
+        Args:
+            recipient_contexts: Context of each recipient
+            environment_contexts: Environment of each recipient (defaults
+                to an empty environment for everyone; None entries are
+                empty environments too)
+            now: Timestamp DND and recent activity are resolved at
+                (defaults to the default clock)
+
+        Returns:
+            The recipient columns
+        """
+        now = get_clock().time() if now is None else now
+        count = len(recipient_contexts)
+        if environment_contexts is None:
+            environment_contexts = [None] * count
+
+        shape = (count, len(_CHANNELS))
+        available = np.zeros(shape, dtype=bool)
+        preference_boost = np.zeros(shape)
+        dnd = np.zeros(shape, dtype=bool)
+        dnd_ends = np.zeros(shape, dtype=bool)
+        activity = np.zeros((count, 2), dtype=bool)
+
+        for i, recipient in enumerate(recipient_contexts):
+            preferences = recipient.preferences
+            for column, channel in enumerate(_CHANNELS):
+                available[i, column] = recipient.has_channel(channel)
+                if preferences:
+                    if channel in preferences.preferred_channels:
+                        preference_index = preferences.preferred_channels.index(channel)
+                        preference_boost[i, column] = 0.3 * (
+                            1.0
+                            - (preference_index / len(preferences.preferred_channels))
+                        )
+                    dnd[i, column] = preferences.is_dnd_active(channel, now)
+                    dnd_ends[i, column] = dnd[i, column] and (
+                        preferences.dnd_masks.get(channel) != FULL_DAY_MASK
+                    )
+
+            activity[i] = (
+                recipient.device_active,
+                bool(recipient.last_active) and now - recipient.last_active < 3600,
+            )
+
+        flags = cls.environment_flags(environment_contexts)
+
+        return cls(
+            user_ids=[recipient.user_id for recipient in recipient_contexts],
+            available=available,
+            preference_boost=preference_boost,
+            dnd=dnd,
+            dnd_ends=dnd_ends,
+            device_active=activity[:, 0],
+            recently_active=activity[:, 1],
+            app_foreground=flags[:, 0],
+            app_background=flags[:, 1],
+            device_constrained=flags[:, 2],
+            offline=flags[:, 3],
+            poor_network=flags[:, 4],
+            default_environment=np.array(
+                [environment is None for environment in environment_contexts],
+                dtype=bool,
+            ),
+            now=now,
+        )
+
+
+def _record_factor(
+    factors: List[Dict[str, Any]], factor: str, contribution: float, description: str
+) -> None:
+    """Record the contribution of a factor to a channel score."""
+    factors.append(
+        {
+            "factor": factor,
+            "impact": "positive" if contribution > 0 else "negative",
+            "contribution": round(contribution, SCORE_DECIMALS),
+            "description": description,
+        }
+    )
+
+
 class ChannelEvaluator:
     """Evaluates channels based on contextual factors."""
 
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        Initialize the channel evaluator.
+
+        Args:
+            clock: Clock for DND and recent activity checks when no time is
+                given (defaults to the default clock)
+        """
+        self.clock = clock or get_clock()
+
     def evaluate_channel(
         self,
         channel: ChannelType,
         recipient_context: RecipientContext,
         notification_context: NotificationContext,
         environment_context: EnvironmentContext,
+        now: Optional[float] = None,
+        factors: Optional[List[Dict[str, Any]]] = None,
+        clamp: bool = True,
     ) -> float:
         """
         Evaluate a channel for the given context.
@@ -337,17 +585,134 @@ class ChannelEvaluator:
             recipient_context: Recipient context
             notification_context: Notification context
             environment_context: Environment context
+            now: Current timestamp (defaults to the evaluator's clock)
+            factors: Optional list that receives every factor moving the
+                score away from the 0.5 base, as dicts with ``factor``,
+                ``impact``, ``contribution`` and ``description``
+            clamp: Clamp the score to [0, 1]; pass False to get the raw sum
+                of the factors
 
         Returns:
-            Score for the channel (0-1)
+            Score for the channel (0-1 if clamped)
         """
-        # Start with base score
-        score = 0.5
-
         # Check basic availability
         if not recipient_context.has_channel(channel):
+            if factors is not None:
+                _record_factor(
+                    factors,
+                    "availability",
+                    -0.5,
+                    f"Channel {channel.name} is not available for this user",
+                )
             return 0.0
 
+        score = self.recipient_score(
+            channel,
+            recipient_context,
+            notification_context.priority_level,
+            environment_context,
+            now,
+            factors,
+        )
+        score += self.notification_score(
+            channel,
+            notification_context.priority_level,
+            notification_context.time_sensitive,
+            notification_context.interaction_required,
+            len(notification_context.title) + len(notification_context.body),
+            factors,
+        )
+        return _clamp_score(score) if clamp else score
+
+    def rank_channels(
+        self,
+        recipient_context: RecipientContext,
+        notification_context: NotificationContext,
+        environment_context: EnvironmentContext,
+        min_score_threshold: float = 0.3,
+        now: Optional[float] = None,
+        factors: Optional[Dict[ChannelType, List[Dict[str, Any]]]] = None,
+        unclamped: Optional[Dict[ChannelType, float]] = None,
+    ) -> List[Tuple[ChannelType, float]]:
+        """
+        Score and rank the enabled channels of a recipient.
+
+        Args:
+            recipient_context: Recipient context
+            notification_context: Notification context
+            environment_context: Environment context
+            min_score_threshold: Minimum score threshold for channels
+            now: Current timestamp (defaults to the evaluator's clock)
+            factors: Optional dict to store the factors of every evaluated
+                channel in (see ``evaluate_channel``)
+            unclamped: Optional dict to store the score of every evaluated
+                channel in before clamping and thresholding
+
+        Returns:
+            List of (channel, score) tuples sorted by score
+        """
+        if now is None:
+            now = self.clock.time()
+
+        # Evaluate each available channel
+        channel_scores = []
+        for channel in recipient_context.get_enabled_channels():
+            channel_factors = None
+            if factors is not None:
+                channel_factors = factors[channel] = []
+            score = self.evaluate_channel(
+                channel,
+                recipient_context,
+                notification_context,
+                environment_context,
+                now,
+                channel_factors,
+                clamp=False,
+            )
+            if unclamped is not None:
+                unclamped[channel] = score
+            score = _clamp_score(score)
+
+            # Filter by threshold
+            if score >= min_score_threshold:
+                channel_scores.append((channel, score))
+
+        # Sort by score (descending)
+        channel_scores.sort(key=lambda x: x[1], reverse=True)
+        return channel_scores
+
+    def recipient_score(
+        self,
+        channel: ChannelType,
+        recipient_context: RecipientContext,
+        priority_level: int,
+        environment_context: EnvironmentContext,
+        now: Optional[float] = None,
+        factors: Optional[List[Dict[str, Any]]] = None,
+    ) -> float:
+        """
+        Score the recipient and environment factors of a channel.
+
+        Includes the base score; add ``notification_score`` and clamp to
+        get the channel score.
+
+        Args:
+            channel: The channel to evaluate
+            recipient_context: Recipient context
+            priority_level: Priority level of the notification (0-3)
+            environment_context: Environment context
+            now: Current timestamp (defaults to the evaluator's clock)
+            factors: Optional list to record factor contributions in
+
+        Returns:
+            Unclamped partial score
+        """
+        if now is None:
+            now = self.clock.time()
+
+        # Start with base score
+        score = 0.5
+
         # Check user preferences
         preferences = recipient_context.preferences
         if preferences:
@@ -358,14 +723,35 @@ class ChannelEvaluator:
                     1.0 - (preference_index / len(preferences.preferred_channels))
                 )
                 score += preference_boost
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "user_preference",
+                        preference_boost,
+                        f"User has {channel.name} as preference #{preference_index + 1}",
+                    )
 
             # Check DND status - apply large penalty if active
-            if preferences.is_dnd_active(channel):
+            if preferences.is_dnd_active(channel, now):
                 # Allow high priority to override DND with smaller penalty
-                if notification_context.priority_level >= 2:  # HIGH or URGENT
-                    score -= 0.3
+                if priority_level >= 2:  # HIGH or URGENT
+                    score -= DND_OVERRIDE_PENALTY
+                    if factors is not None:
+                        _record_factor(
+                            factors,
+                            "do_not_disturb",
+                            -DND_OVERRIDE_PENALTY,
+                            f"DND is active for {channel.name}, but overridden by HIGH priority",
+                        )
                 else:
-                    score -= 0.8
+                    score -= DND_PENALTY
+                    if factors is not None:
+                        _record_factor(
+                            factors,
+                            "do_not_disturb",
+                            -DND_PENALTY,
+                            f"DND is active for {channel.name}",
+                        )
 
         # Channel-specific factors
         if channel == ChannelType.PUSH:
@@ -375,90 +761,746 @@ class ChannelEvaluator:
             # Device active bonus
             if recipient_context.device_active:
                 score += 0.2
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "device_active",
+                        0.2,
+                        "User's device is currently active",
+                    )
 
             # Recent activity bonus
             if (
                 recipient_context.last_active
-                and time.time() - recipient_context.last_active < 3600
+                and now - recipient_context.last_active < 3600
             ):  # Within last hour
                 score += 0.1
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "recent_activity",
+                        0.1,
+                        "User was active within the last hour",
+                    )
 
             # App state consideration
             if environment_context.app_state == "foreground":
                 score += 0.2
+                if factors is not None:
+                    _record_factor(factors, "app_state", 0.2, "App is in foreground")
             elif environment_context.app_state == "background":
                 score += 0.1
+                if factors is not None:
+                    _record_factor(factors, "app_state", 0.1, "App is in background")
 
             # Battery/network considerations
             if environment_context.is_device_constrained():
                 score -= 0.1
-
-            # Interaction considerations
-            if notification_context.interaction_required:
-                score += 0.2
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "device_constraints",
+                        -0.1,
+                        "Device has battery or network constraints",
+                    )
 
         elif channel == ChannelType.SMS:
             # SMS is good for urgent, short messages that need attention
             # even when the app isn't active
 
+            # Network considerations
+            if environment_context.network_type == "offline":
+                score += 0.2  # SMS can work without data connection
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "network",
+                        0.2,
+                        "Device is offline; SMS needs no data connection",
+                    )
+
+        elif channel == ChannelType.EMAIL:
+            # Email is best for longer, non-urgent content
+
+            # Network quality consideration
+            if (
+                environment_context.network_quality
+                and environment_context.network_quality < 0.5
+            ):
+                score -= 0.1
+                if factors is not None:
+                    _record_factor(factors, "network", -0.1, "Network quality is poor")
+
+        return score
+
+    def notification_score(
+        self,
+        channel: ChannelType,
+        priority_level: int,
+        time_sensitive: bool,
+        interaction_required: bool,
+        message_length: int,
+        factors: Optional[List[Dict[str, Any]]] = None,
+    ) -> float:
+        """
+        Score the notification factors of a channel.
+
+        Args:
+            channel: The channel to evaluate
+            priority_level: Priority level (0-3)
+            time_sensitive: Whether the notification is time-sensitive
+            interaction_required: Whether user interaction is required
+            message_length: Combined title and body length
+            factors: Optional list to record factor contributions in
+
+        Returns:
+            Unclamped partial score
+        """
+        score = 0.0
+        if channel == ChannelType.PUSH:
+            # Interaction considerations
+            if interaction_required:
+                score += 0.2
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "interaction",
+                        0.2,
+                        "Notification requires user interaction",
+                    )
+
+        elif channel == ChannelType.SMS:
             # Priority boost for SMS
-            if notification_context.priority_level >= 2:  # HIGH or URGENT
+            if priority_level >= 2:  # HIGH or URGENT
                 score += 0.3
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "priority",
+                        0.3,
+                        "HIGH priority notification suitable for SMS",
+                    )
 
             # Time sensitivity boost
-            if notification_context.time_sensitive:
+            if time_sensitive:
                 score += 0.2
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "time_sensitivity",
+                        0.2,
+                        "Time-sensitive notification",
+                    )
 
             # Message length penalty (SMS works better for short messages)
-            message_length = len(notification_context.title) + len(
-                notification_context.body
-            )
             if message_length > 300:
                 score -= 0.2
-
-            # Network considerations
-            if environment_context.network_type == "offline":
-                score += 0.2  # SMS can work without data connection
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "message_length",
+                        -0.2,
+                        "Message is too long for optimal SMS delivery",
+                    )
 
         elif channel == ChannelType.EMAIL:
-            # Email is best for longer, non-urgent content
-
             # Priority penalty for email (not ideal for urgent messages)
-            if notification_context.priority_level >= 2:  # HIGH or URGENT
+            if priority_level >= 2:  # HIGH or URGENT
                 score -= 0.2
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "priority",
+                        -0.2,
+                        "HIGH priority notification less suitable for Email",
+                    )
 
             # Message length bonus (email works better for longer messages)
-            message_length = len(notification_context.title) + len(
-                notification_context.body
-            )
             if message_length > 300:
                 score += 0.2
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "message_length",
+                        0.2,
+                        "Longer message well-suited for Email",
+                    )
 
             # Non-immediate content bonus
-            if not notification_context.time_sensitive:
+            if not time_sensitive:
                 score += 0.2
+                if factors is not None:
+                    _record_factor(
+                        factors,
+                        "time_sensitivity",
+                        0.2,
+                        "Content is not time-sensitive",
+                    )
 
-            # Network quality consideration
-            if (
-                environment_context.network_quality
-                and environment_context.network_quality < 0.5
-            ):
-                score -= 0.1
+        return score
 
-        # Normalize score between 0 and 1
-        score = max(0.0, min(score, 1.0))
+    def notification_scores(self, batch: RequestBatch) -> np.ndarray:
+        """
+        Score the notification factors of every channel for a batch.
 
-        return score
+        Vectorized equivalent of ``notification_score``.
+
+        Args:
+            batch: The request batch
+
+        Returns:
+            Array of shape (len(batch), 3) in PUSH, SMS, EMAIL column order
+        """
+        high = batch.priority_levels >= 2
+        long_message = batch.message_lengths > 300
+        time_sensitive = batch.column("time_sensitive", 0.0) > 0
+        interaction_required = batch.column("interaction_required", 0.0) > 0
+
+        scores = np.zeros((len(batch), len(CHANNEL_NAMES)))
+        scores[:, 0] = 0.2 * interaction_required
+        scores[:, 1] = 0.3 * high + 0.2 * time_sensitive - 0.2 * long_message
+        scores[:, 2] = -0.2 * high + 0.2 * long_message + 0.2 * ~time_sensitive
+        return scores
+
+    def score_matrix(
+        self,
+        recipients: RecipientColumns,
+        priority_level: Union[int, np.ndarray],
+        notification_scores: np.ndarray,
+        clamp: bool = True,
+    ) -> np.ndarray:
+        """
+        Score every channel for every recipient.
+
+        Vectorized equivalent of ``evaluate_channel``.
+
+        Args:
+            recipients: Columnar recipient attributes
+            priority_level: Priority level of the notification, or one per
+                recipient
+            notification_scores: Notification factors, shape (3,) for a
+                broadcast or (N, 3) for one notification per recipient
+            clamp: Clamp the scores and score unavailable channels 0; pass
+                False to get the raw sums of the factors
+
+        Returns:
+            Array of shape (N, 3)
+        """
+        high = np.asarray(priority_level) >= 2
+        dnd_penalty = np.where(high, DND_OVERRIDE_PENALTY, DND_PENALTY)
+        if dnd_penalty.ndim:
+            dnd_penalty = dnd_penalty[:, np.newaxis]
+
+        scores = 0.5 + recipients.preference_boost - recipients.dnd * dnd_penalty
+        scores[:, 0] += (
+            0.2 * recipients.device_active
+            + 0.1 * recipients.recently_active
+            + 0.2 * recipients.app_foreground
+            + 0.1 * recipients.app_background
+            - 0.1 * recipients.device_constrained
+        )
+        scores[:, 1] += 0.2 * recipients.offline
+        scores[:, 2] -= 0.1 * recipients.poor_network
+        scores += notification_scores
+
+        if clamp:
+            _clamp_scores(scores, recipients.available)
+        return scores
+
+
+def _clamp_scores(scores: np.ndarray, available: np.ndarray) -> np.ndarray:
+    """Clamp an (N x 3) score matrix in place, scoring unavailable channels 0."""
+    np.clip(scores, 0.0, 1.0, out=scores)
+    np.round(scores, SCORE_DECIMALS, out=scores)
+    scores[~available] = 0.0
+    return scores
+
+
+class BroadcastScorer:
+    """
+    Memoized channel ranking of one notification for many recipients.
+
+    Recipients whose scoring inputs are identical get identical rankings,
+    and in a broadcast most recipients share one of a few profiles. The
+    scorer reduces each recipient to a fingerprint of exactly the inputs
+    ``ChannelEvaluator`` reads and ranks each distinct fingerprint once.
+    Fingerprints include DND and recent activity resolved at ``now``, so
+    a scorer is only valid for one notification at one time.
+    """
+
+    def __init__(
+        self,
+        evaluator: ChannelEvaluator,
+        notification_context: NotificationContext,
+        min_score_threshold: float = 0.3,
+        now: Optional[float] = None,
+    ):
+        """
+        Initialize the scorer.
+
+        Args:
+            evaluator: Evaluator used for each distinct fingerprint
+            notification_context: The notification being broadcast
+            min_score_threshold: Minimum score threshold for channels
+            now: Time of the broadcast (defaults to the evaluator's clock)
+        """
+        self.evaluator = evaluator
+        self.notification_context = notification_context
+        self.min_score_threshold = min_score_threshold
+        self.now = evaluator.clock.time() if now is None else now
+        self.default_environment = EnvironmentContext(current_time=self.now)
+        self.hits = 0
+        # Fingerprint -> (ranking, unclamped score of each channel)
+        self._rankings: Dict[
+            Tuple, Tuple[List[Tuple[ChannelType, float]], Dict[ChannelType, float]]
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self._rankings)
+
+    def fingerprint(
+        self,
+        recipient_context: RecipientContext,
+        environment_context: EnvironmentContext,
+    ) -> Tuple:
+        """
+        Reduce a recipient to the inputs that affect its channel scores.
+
+        Args:
+            recipient_context: Recipient context
+            environment_context: Environment context
+
+        Returns:
+            Hashable fingerprint; recipients with equal fingerprints get
+            equal rankings
+        """
+        now = self.now
+        preferences = recipient_context.preferences
+        if preferences:
+            preference_key = (
+                tuple(preferences.preferred_channels),
+                tuple(preferences.is_dnd_active(channel, now) for channel in _CHANNELS),
+            )
+        else:
+            preference_key = None
+
+        last_active = recipient_context.last_active
+        return (
+            tuple(recipient_context.has_channel(channel) for channel in _CHANNELS),
+            preference_key,
+            bool(recipient_context.device_active),
+            bool(last_active) and now - last_active < 3600,
+            environment_context.app_state in ("foreground", "background")
+            and environment_context.app_state,
+            environment_context.is_device_constrained(),
+            environment_context.network_type == "offline",
+            bool(environment_context.network_quality)
+            and environment_context.network_quality < 0.5,
+        )
+
+    def rank(
+        self,
+        recipient_context: RecipientContext,
+        environment_context: Optional[EnvironmentContext] = None,
+        unclamped: Optional[Dict[ChannelType, float]] = None,
+    ) -> List[Tuple[ChannelType, float]]:
+        """
+        Rank the channels of a recipient, reusing the ranking of an equal
+        fingerprint.
+
+        Args:
+            recipient_context: Recipient context
+            environment_context: Environment context (defaults to an empty
+                environment at the broadcast time)
+            unclamped: Optional dict to store the unclamped score of every
+                channel in (see ``ChannelEvaluator.rank_channels``)
+
+        Returns:
+            List of (channel, score) tuples sorted by score; the list is
+            shared between recipients and must not be modified
+        """
+        if environment_context is None:
+            environment_context = self.default_environment
+
+        key = self.fingerprint(recipient_context, environment_context)
+        entry = self._rankings.get(key)
+        if entry is not None:
+            self.hits += 1
+        else:
+            scores: Dict[ChannelType, float] = {}
+            ranking = self.evaluator.rank_channels(
+                recipient_context,
+                self.notification_context,
+                environment_context,
+                self.min_score_threshold,
+                self.now,
+                unclamped=scores,
+            )
+            entry = self._rankings[key] = (ranking, scores)
+
+        if unclamped is not None:
+            unclamped.update(entry[1])
+        return entry[0]
+
+
+def _rank_channels(
+    scores: np.ndarray, available: np.ndarray, min_score_threshold: float
+) -> List[List[Tuple[ChannelType, float]]]:
+    """Turn an (N x 3) score matrix into ranked (channel, score) lists."""
+    # Stable sort keeps PUSH, SMS, EMAIL order among equal scores
+    order = np.argsort(-scores, axis=1, kind="stable")
+    keep = available & (scores >= min_score_threshold)
+
+    results = []
+    for row_order, row_scores, row_keep in zip(
+        order.tolist(), scores.tolist(), keep.tolist()
+    ):
+        results.append(
+            [
+                (_CHANNELS[column], row_scores[column])
+                for column in row_order
+                if row_keep[column]
+            ]
+        )
+    return results
+
+
+def _presence_environment(heartbeat: Heartbeat, now: float) -> EnvironmentContext:
+    """Environment reported by a device's heartbeat."""
+    return EnvironmentContext(
+        current_time=now,
+        network_type=heartbeat.network_type,
+        network_quality=heartbeat.network_quality,
+        battery_level=heartbeat.battery_level,
+        low_power_mode=bool(heartbeat.low_power_mode),
+        app_state=heartbeat.app_state,
+    )
+
+
+class _PresentRecipient:
+    """Recipient with device activity overlaid from the presence store."""
+
+    __slots__ = ("_recipient", "device_active", "last_active")
+
+    def __init__(self, recipient_context, device_active: bool, last_active: float):
+        self._recipient = recipient_context
+        self.device_active = recipient_context.device_active or device_active
+        self.last_active = max(recipient_context.last_active or 0, last_active)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._recipient, name)
 
 
 class ContextAnalyzer:
     """Analyzes context for optimal notification delivery."""
 
-    def __init__(self):
-        """Initialize the context analyzer."""
-        self.channel_evaluator = ChannelEvaluator()
+    def __init__(
+        self,
+        frequency_capper: Optional[FrequencyCapper] = None,
+        clock: Optional[Clock] = None,
+        dnd_deferral: bool = False,
+        presence_store: Optional[PresenceStore] = None,
+    ):
+        """
+        Initialize the context analyzer.
+
+        Args:
+            frequency_capper: Optional frequency caps; channels that reached
+                a cap for the recipient are left out of the optimal channels
+            clock: Clock read once per call, so every channel and recipient
+                of a call is evaluated at the same time (defaults to the
+                default clock)
+            dnd_deferral: Select no channels for notifications that should
+                wait for the recipient's best channel to leave Do Not
+                Disturb (see ``dnd_until``), instead of falling back to
+                another channel or sending despite the DND penalty
+            presence_store: Optional device presence; a fresh heartbeat
+                marks the recipient's device active, and the most recent
+                device's state is the environment of calls that don't pass
+                one
+        """
+        self.clock = clock or get_clock()
+        self.channel_evaluator = ChannelEvaluator(self.clock)
+        self.frequency_capper = frequency_capper
+        self.dnd_deferral = dnd_deferral
+        self.presence_store = presence_store
         logger.info("Context analyzer initialized")
 
+    def _with_presence(
+        self,
+        recipient_context: RecipientContext,
+        environment_context: Optional[EnvironmentContext],
+        now: float,
+        default_environment: Optional[EnvironmentContext] = None,
+    ) -> Tuple[RecipientContext, EnvironmentContext]:
+        """Overlay a recipient's presence and resolve the environment."""
+        store = self.presence_store
+        heartbeat = None
+        if store is not None:
+            heartbeat = store.latest(recipient_context.user_id)
+        fresh = heartbeat is not None and store.is_fresh(heartbeat, now)
+
+        if environment_context is None:
+            if fresh:
+                environment_context = _presence_environment(heartbeat, now)
+            else:
+                environment_context = default_environment or EnvironmentContext(
+                    current_time=now
+                )
+
+        if heartbeat is not None:
+            recipient_context = _PresentRecipient(
+                recipient_context, fresh, heartbeat.timestamp
+            )
+        return recipient_context, environment_context
+
+    def _columns_with_presence(self, recipients: RecipientColumns) -> RecipientColumns:
+        """Overlay presence on recipient columns, as ``_with_presence`` does."""
+        store = self.presence_store
+        if store is None:
+            return recipients
+
+        now = recipients.now
+        device_active = recipients.device_active.copy()
+        recently_active = recipients.recently_active.copy()
+        environment_rows = []
+        environments = []
+        for i, user_id in enumerate(recipients.user_ids):
+            heartbeat = store.latest(user_id)
+            if heartbeat is None:
+                continue
+            fresh = store.is_fresh(heartbeat, now)
+            device_active[i] |= fresh
+            recently_active[i] |= (
+                bool(heartbeat.timestamp) and now - heartbeat.timestamp < 3600
+            )
+            if fresh and recipients.default_environment[i]:
+                environment_rows.append(i)
+                environments.append(_presence_environment(heartbeat, now))
+
+        if not environment_rows:
+            return replace(
+                recipients, device_active=device_active, recently_active=recently_active
+            )
+
+        columns = {
+            name: getattr(recipients, name).copy()
+            for name in (
+                "app_foreground",
+                "app_background",
+                "device_constrained",
+                "offline",
+                "poor_network",
+            )
+        }
+        flags = RecipientColumns.environment_flags(environments)
+        for column, values in zip(columns.values(), flags.T):
+            column[environment_rows] = values
+        return replace(
+            recipients,
+            device_active=device_active,
+            recently_active=recently_active,
+            **columns,
+        )
+
+    def _rank_columns(
+        self,
+        recipients: RecipientColumns,
+        priority_level: Union[int, np.ndarray],
+        notification_scores: np.ndarray,
+        min_score_threshold: float,
+        channel_mask: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[ChannelType, float]]]:
+        """
+        Rank the channels of recipient columns in one matrix pass.
+
+        Applies presence, frequency caps and DND deferral like
+        ``get_optimal_channels`` does per recipient.
+
+        Args:
+            recipients: Columnar recipient and environment attributes
+            priority_level: Priority level of the notification, or one per
+                recipient
+            notification_scores: Notification factors, shape (3,) or (N, 3)
+            min_score_threshold: Minimum score threshold for channels
+            channel_mask: Optional (N x 3) mask of the channels allowed
+                per recipient
+
+        Returns:
+            List of (channel, score) lists sorted by score, per recipient
+        """
+        # Use presence where the columns had no device activity or environment
+        recipients = self._columns_with_presence(recipients)
+
+        unclamped = self.channel_evaluator.score_matrix(
+            recipients, priority_level, notification_scores, clamp=False
+        )
+        available = recipients.available
+        if channel_mask is not None:
+            available = available & channel_mask
+        if self.frequency_capper is not None:
+            available = available & ~self.frequency_capper.capped_matrix(
+                recipients.user_ids, _CHANNELS, recipients.now
+            )
+
+        deferred = None
+        # HIGH and URGENT notifications override DND
+        deferrable = np.asarray(priority_level) < 2
+        if self.dnd_deferral and deferrable.any() and recipients.dnd.any():
+            # Rank the channels as if no DND were active
+            scores = _clamp_scores(unclamped + DND_PENALTY * recipients.dnd, available)
+            scores[~available] = -1.0
+            best = np.argmax(scores, axis=1)[:, np.newaxis]
+            deferred = (
+                (np.take_along_axis(scores, best, axis=1)[:, 0] >= min_score_threshold)
+                & np.take_along_axis(recipients.dnd_ends, best, axis=1)[:, 0]
+                & deferrable
+            )
+
+        scores = _clamp_scores(unclamped, available)
+        results = _rank_channels(scores, available, min_score_threshold)
+        if deferred is not None:
+            for i in np.flatnonzero(deferred).tolist():
+                results[i] = []
+        return results
+
+    def _uncapped(
+        self,
+        user_id: str,
+        channel_scores: List[Tuple[ChannelType, float]],
+        now: Optional[float] = None,
+    ) -> List[Tuple[ChannelType, float]]:
+        """Drop channels that reached a frequency cap for a user."""
+        capper = self.frequency_capper
+        if capper is None:
+            return channel_scores
+        return [
+            (channel, score)
+            for channel, score in channel_scores
+            if not capper.is_capped(user_id, channel, now)
+        ]
+
+    def capped_until(
+        self, recipient_context: RecipientContext, now: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Get the time to defer a notification to when all channels are capped.
+
+        Args:
+            recipient_context: Context of the recipient
+            now: Current timestamp (defaults to the analyzer's clock)
+
+        Returns:
+            Earliest time one of the recipient's enabled channels is no
+            longer capped, or None if one can be used now
+        """
+        capper = self.frequency_capper
+        if capper is None:
+            return None
+        if now is None:
+            now = self.clock.time()
+
+        times = []
+        for channel in recipient_context.get_enabled_channels():
+            until = capper.capped_until(recipient_context.user_id, channel, now)
+            if until is None:
+                return None
+            times.append(until)
+        return min(times, default=None)
+
+    def _dnd_until(
+        self,
+        recipient_context: RecipientContext,
+        priority_level: int,
+        unclamped: Dict[ChannelType, float],
+        min_score_threshold: float,
+        now: float,
+    ) -> Optional[float]:
+        """
+        Time the best channel leaves DND, or None to deliver now.
+
+        ``unclamped`` holds the unclamped channel scores of the ranking
+        pass, so the ranking without DND follows from adding back the
+        penalty instead of scoring the channels again.
+        """
+        # HIGH and URGENT notifications override DND
+        preferences = recipient_context.preferences
+        if priority_level >= 2 or preferences is None:
+            return None
+
+        dnd = [
+            channel for channel in unclamped if preferences.is_dnd_active(channel, now)
+        ]
+        if not dnd:
+            return None
+
+        # Rank the channels as if no DND were active
+        channel_scores = [
+            (channel, _clamp_score(score + DND_PENALTY if channel in dnd else score))
+            for channel, score in unclamped.items()
+        ]
+        channel_scores.sort(key=lambda x: x[1], reverse=True)
+        channel_scores = self._uncapped(recipient_context.user_id, channel_scores, now)
+        if not channel_scores or channel_scores[0][1] < min_score_threshold:
+            return None
+
+        best = channel_scores[0][0]
+        if best not in dnd:
+            return None
+        until = preferences.next_allowed_time(best, now)
+        if until is None or until <= now:
+            return None
+        return until
+
+    def dnd_until(
+        self,
+        recipient_context: RecipientContext,
+        notification_context: NotificationContext,
+        environment_context: Optional[EnvironmentContext] = None,
+        min_score_threshold: float = 0.3,
+        now: Optional[float] = None,
+    ) -> Optional[float]:
+        """
+        Get the time to defer a notification to because of Do Not Disturb.
+
+        The best channel is the one ranked first when DND is ignored; a
+        LOW or NORMAL notification whose best channel is in DND waits until
+        the DND period ends, computed from the precompiled DND slots in the
+        recipient's timezone.
+
+        Args:
+            recipient_context: Context of the recipient
+            notification_context: Context of the notification
+            environment_context: Context of the environment
+            min_score_threshold: Minimum score threshold for channels
+            now: Current timestamp (defaults to the analyzer's clock)
+
+        Returns:
+            Time the best channel leaves DND, or None if the notification
+            can be delivered now (or DND on the best channel never ends)
+        """
+        if now is None:
+            now = self.clock.time()
+        recipient_context, environment_context = self._with_presence(
+            recipient_context, environment_context, now
+        )
+        unclamped: Dict[ChannelType, float] = {}
+        self.channel_evaluator.rank_channels(
+            recipient_context,
+            notification_context,
+            environment_context,
+            min_score_threshold,
+            now,
+            unclamped=unclamped,
+        )
+        return self._dnd_until(
+            recipient_context,
+            notification_context.priority_level,
+            unclamped,
+            min_score_threshold,
+            now,
+        )
+
     def get_optimal_channels(
         self,
         recipient_context: RecipientContext,
@@ -478,187 +1520,277 @@ class ContextAnalyzer:
         Returns:
             List of (channel, score) tuples sorted by score
         """
-        # Use default environment context if not provided
-        if environment_context is None:
-            environment_context = EnvironmentContext()
+        now = self.clock.time()
 
-        # Get available channels
-        available_channels = recipient_context.get_enabled_channels()
+        # Use presence and the default environment context if not provided
+        recipient_context, environment_context = self._with_presence(
+            recipient_context, environment_context, now
+        )
 
-        # Evaluate each channel
-        channel_scores = []
-        for channel in available_channels:
-            score = self.channel_evaluator.evaluate_channel(
-                channel, recipient_context, notification_context, environment_context
+        unclamped = {} if self.dnd_deferral else None
+        channel_scores = self.channel_evaluator.rank_channels(
+            recipient_context,
+            notification_context,
+            environment_context,
+            min_score_threshold,
+            now,
+            unclamped=unclamped,
+        )
+        if unclamped is not None and self._dnd_until(
+            recipient_context,
+            notification_context.priority_level,
+            unclamped,
+            min_score_threshold,
+            now,
+        ):
+            logger.debug(
+                f"Deferring notification {notification_context.notification_id} "
+                f"until DND ends"
             )
+            return []
 
-            # Filter by threshold
-            if score >= min_score_threshold:
-                channel_scores.append((channel, score))
-
-        # Sort by score (descending)
-        channel_scores.sort(key=lambda x: x[1], reverse=True)
+        channel_scores = self._uncapped(recipient_context.user_id, channel_scores, now)
 
         logger.debug(
             f"Channel scores for notification {notification_context.notification_id}: {channel_scores}"
         )
         return channel_scores
 
+    def get_optimal_channels_columns(
+        self,
+        batch: RequestBatch,
+        recipient_contexts: Sequence[RecipientContext],
+        environment_context: Optional[EnvironmentContext] = None,
+        min_score_threshold: float = 0.3,
+    ) -> List[List[Tuple[ChannelType, float]]]:
+        """
+        Determine optimal channels for every request of a columnar batch.
+
+        The whole batch is scored as one (N x 3) matrix; a channel must be
+        both enabled for the recipient and set in the batch's channel mask.
+        With DND deferral, the best channel is the best one in the mask.
+
+        Args:
+            batch: The request batch
+            recipient_contexts: Context of each request's recipient
+            environment_context: Context of the environment
+            min_score_threshold: Minimum score threshold for channels
+
+        Returns:
+            List of (channel, score) lists sorted by score, in batch order
+        """
+        environment_contexts = None
+        if environment_context is not None:
+            environment_contexts = [environment_context] * len(recipient_contexts)
+        recipients = RecipientColumns.from_contexts(
+            recipient_contexts, environment_contexts, self.clock.time()
+        )
+        channel_mask = np.column_stack(
+            [batch.has_channel(channel) for channel in _CHANNELS]
+        )
+
+        return self._rank_columns(
+            recipients,
+            batch.priority_levels,
+            self.channel_evaluator.notification_scores(batch),
+            min_score_threshold,
+            channel_mask,
+        )
+
+    def get_optimal_channels_many(
+        self,
+        recipients: RecipientColumns,
+        notification_context: NotificationContext,
+        min_score_threshold: float = 0.3,
+    ) -> List[List[Tuple[ChannelType, float]]]:
+        """
+        Determine optimal channels of one notification for many recipients.
+
+        Scores the full (N x 3) channel matrix with NumPy; results match
+        ``get_optimal_channels`` for each recipient, including DND deferral
+        and device presence.
+
+        Args:
+            recipients: Columnar recipient and environment attributes
+            notification_context: Context of the notification
+            min_score_threshold: Minimum score threshold for channels
+
+        Returns:
+            List of (channel, score) lists sorted by score, per recipient
+        """
+        evaluator = self.channel_evaluator
+        message_length = len(notification_context.title) + len(
+            notification_context.body
+        )
+        notification_scores = np.array(
+            [
+                evaluator.notification_score(
+                    channel,
+                    notification_context.priority_level,
+                    notification_context.time_sensitive,
+                    notification_context.interaction_required,
+                    message_length,
+                )
+                for channel in _CHANNELS
+            ]
+        )
+
+        return self._rank_columns(
+            recipients,
+            notification_context.priority_level,
+            notification_scores,
+            min_score_threshold,
+        )
+
+    def get_optimal_channels_broadcast(
+        self,
+        recipient_contexts: Sequence[RecipientContext],
+        notification_context: NotificationContext,
+        environment_contexts: Optional[Sequence[EnvironmentContext]] = None,
+        min_score_threshold: float = 0.3,
+    ) -> List[List[Tuple[ChannelType, float]]]:
+        """
+        Determine optimal channels of one notification for many recipients.
+
+        Each distinct scoring profile is evaluated once (see
+        :class:`BroadcastScorer`); results match ``get_optimal_channels``
+        for each recipient, including DND deferral. Recipients without
+        frequency-capped channels share ranking lists, which must not be
+        modified.
+
+        Args:
+            recipient_contexts: Context of each recipient
+            notification_context: Context of the notification
+            environment_contexts: Environment of each recipient (defaults
+                to the recipient's presence, or an empty environment)
+            min_score_threshold: Minimum score threshold for channels
+
+        Returns:
+            List of (channel, score) lists sorted by score, per recipient
+        """
+        scorer = BroadcastScorer(
+            self.channel_evaluator,
+            notification_context,
+            min_score_threshold,
+            self.clock.time(),
+        )
+        if environment_contexts is None:
+            environment_contexts = [None] * len(recipient_contexts)
+
+        results = []
+        for recipient_context, environment_context in zip(
+            recipient_contexts, environment_contexts
+        ):
+            # Use presence and the default environment context if not provided
+            recipient_context, environment_context = self._with_presence(
+                recipient_context,
+                environment_context,
+                scorer.now,
+                scorer.default_environment,
+            )
+            unclamped = {} if self.dnd_deferral else None
+            ranking = scorer.rank(recipient_context, environment_context, unclamped)
+            if unclamped is not None and self._dnd_until(
+                recipient_context,
+                notification_context.priority_level,
+                unclamped,
+                min_score_threshold,
+                scorer.now,
+            ):
+                results.append([])
+                continue
+            results.append(
+                self._uncapped(recipient_context.user_id, ranking, scorer.now)
+            )
+
+        logger.debug(
+            f"Ranked {len(results)} recipients of notification "
+            f"{notification_context.notification_id} with {len(scorer)} "
+            f"distinct profiles"
+        )
+        return results
+
     def explain_channel_selection(
         self,
         recipient_context: RecipientContext,
         notification_context: NotificationContext,
         environment_context: Optional[EnvironmentContext] = None,
+        min_score_threshold: float = 0.3,
     ) -> Dict[str, Any]:
         """
         Explain the channel selection process.
 
+        The factors are recorded by the same evaluation pass that scores
+        the channels, so each channel's score is the 0.5 base plus the sum
+        of its factor contributions, clamped to [0, 1], and the recommended
+        channels are exactly those ``get_optimal_channels`` returns: none
+        when the notification is deferred until DND ends.
+
         Args:
             recipient_context: Context of the recipient
             notification_context: Context of the notification
             environment_context: Context of the environment
+            min_score_threshold: Minimum score threshold for recommended
+                channels
 
         Returns:
             Dictionary with explanation of channel selection
         """
-        # Use default environment context if not provided
-        if environment_context is None:
-            environment_context = EnvironmentContext()
+        now = self.clock.time()
+
+        # Use presence and the default environment context if not provided
+        recipient_context, environment_context = self._with_presence(
+            recipient_context, environment_context, now
+        )
 
-        # Get channel scores
-        channel_scores = self.get_optimal_channels(
+        # Score every channel, recording the factors behind each score
+        factors: Dict[ChannelType, List[Dict[str, Any]]] = {}
+        unclamped: Dict[ChannelType, float] = {}
+        channel_scores = self.channel_evaluator.rank_channels(
             recipient_context,
             notification_context,
             environment_context,
             min_score_threshold=0.0,  # Include all channels in explanation
+            now=now,
+            factors=factors,
+            unclamped=unclamped,
         )
+        uncapped = self._uncapped(recipient_context.user_id, channel_scores, now)
+
+        deferred_until = None
+        if self.dnd_deferral:
+            deferred_until = self._dnd_until(
+                recipient_context,
+                notification_context.priority_level,
+                unclamped,
+                min_score_threshold,
+                now,
+            )
 
-        # Generate explanations for each channel
         explanations = {}
         for channel, score in channel_scores:
-            factors = []
-
-            # Basic availability
-            if not recipient_context.has_channel(channel):
-                factors.append(
-                    {
-                        "factor": "availability",
-                        "impact": "negative",
-                        "description": f"Channel {channel.name} is not available for this user",
-                    }
-                )
-                continue
-
-            # User preferences
-            preferences = recipient_context.preferences
-            if preferences:
-                if channel in preferences.preferred_channels:
-                    preference_index = preferences.preferred_channels.index(channel)
-                    factors.append(
-                        {
-                            "factor": "user_preference",
-                            "impact": "positive",
-                            "description": f"User has {channel.name} as preference #{preference_index+1}",
-                        }
-                    )
-
-                if preferences.is_dnd_active(channel):
-                    if notification_context.priority_level >= 2:
-                        factors.append(
-                            {
-                                "factor": "do_not_disturb",
-                                "impact": "negative",
-                                "description": f"DND is active for {channel.name}, but overridden by HIGH priority",
-                            }
-                        )
-                    else:
-                        factors.append(
-                            {
-                                "factor": "do_not_disturb",
-                                "impact": "negative",
-                                "description": f"DND is active for {channel.name}",
-                            }
-                        )
-
-            # Channel-specific factors
-            if channel == ChannelType.PUSH:
-                if recipient_context.device_active:
-                    factors.append(
-                        {
-                            "factor": "device_active",
-                            "impact": "positive",
-                            "description": "User's device is currently active",
-                        }
-                    )
-
-                if environment_context.app_state == "foreground":
-                    factors.append(
-                        {
-                            "factor": "app_state",
-                            "impact": "positive",
-                            "description": "App is in foreground",
-                        }
-                    )
-
-                if environment_context.is_device_constrained():
-                    factors.append(
-                        {
-                            "factor": "device_constraints",
-                            "impact": "negative",
-                            "description": "Device has battery or network constraints",
-                        }
-                    )
-
-            elif channel == ChannelType.SMS:
-                if notification_context.priority_level >= 2:
-                    factors.append(
-                        {
-                            "factor": "priority",
-                            "impact": "positive",
-                            "description": "HIGH priority notification suitable for SMS",
-                        }
-                    )
-
-                message_length = len(notification_context.title) + len(
-                    notification_context.body
-                )
-                if message_length > 300:
-                    factors.append(
-                        {
-                            "factor": "message_length",
-                            "impact": "negative",
-                            "description": "Message is too long for optimal SMS delivery",
-                        }
-                    )
-
-            elif channel == ChannelType.EMAIL:
-                if notification_context.priority_level >= 2:
-                    factors.append(
-                        {
-                            "factor": "priority",
-                            "impact": "negative",
-                            "description": "HIGH priority notification less suitable for Email",
-                        }
-                    )
-
-                message_length = len(notification_context.title) + len(
-                    notification_context.body
+            if (channel, score) not in uncapped:
+                _record_factor(
+                    factors[channel],
+                    "frequency_cap",
+                    0.0,
+                    f"User reached the frequency cap for {channel.name}",
                 )
-                if message_length > 300:
-                    factors.append(
-                        {
-                            "factor": "message_length",
-                            "impact": "positive",
-                            "description": "Longer message well-suited for Email",
-                        }
-                    )
+            explanations[channel.name] = {"score": score, "factors": factors[channel]}
 
-            explanations[channel.name] = {"score": score, "factors": factors}
+        if deferred_until is not None:
+            recommended = []
+        else:
+            recommended = [
+                channel.name
+                for channel, score in uncapped
+                if score >= min_score_threshold
+            ]
 
         return {
             "notification_id": notification_context.notification_id,
             "channel_explanations": explanations,
-            "recommended_channels": [
-                channel.name for channel, _ in channel_scores if _ >= 0.3
-            ],
+            "recommended_channels": recommended,
+            # Time the notification waits for, when deferred until DND ends
+            "deferred_until": deferred_until,
         }
@@ -0,0 +1,781 @@
+"""
+Compact, memory-mapped recipient directory.
+
+Holding every recipient as ``RecipientContext`` and ``UserPreferences``
+objects costs hundreds of bytes of per-instance dicts per user. The
+directory instead stores users as columns of NumPy arrays, one row per user
+sorted by user id:
+
+- user ids, push tokens, phone numbers and email addresses in string tables
+  (one UTF-8 blob plus offsets each), with a sorted index of 64-bit user id
+  hashes for vectorized lookups
+- timezones and languages interned into a small symbol table
+- enabled and available channels as bitsets, using the ``CHANNEL_BITS`` of
+  request batches
+- preferred channels packed two bits per rank
+- DND schedules interned into a table of slot bitmasks, since most users
+  share one of a few schedules
+
+The directory is saved in a versioned single-file format and loaded with
+``mmap``, so pre-forked workers share one read-only copy through the page
+cache and start without parsing anything. :class:`RecipientView` objects
+expose a row through the ``RecipientContext`` accessors, and
+:meth:`RecipientDirectory.recipient_columns` builds the columns for batch
+channel scoring straight from the arrays.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch import CHANNEL_BITS, CHANNEL_NAMES
+from .clock import get_clock
+from .context import (
+    ChannelType,
+    EnvironmentContext,
+    RecipientColumns,
+    RecipientContext,
+)
+from .dnd import (
+    FULL_DAY_MASK,
+    SLOTS_PER_DAY,
+    is_slot_set,
+    local_slot,
+    next_allowed_time,
+)
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.directory")
+
+# File magic and current format version
+DIRECTORY_MAGIC = b"LNRCPDIR"
+DIRECTORY_FORMAT_VERSION = 1
+
+# magic, version, reserved, column count, user count, payload bytes, sha256
+_HEADER = struct.Struct("<8sHHIQQ32s")
+# column name, dtype, offset from the start of the file, item count
+_COLUMN = struct.Struct("<16s4sQQ")
+
+# Bits of the status column
+STATUS_DEVICE_ACTIVE = 1
+STATUS_HAS_PREFERENCES = 2
+
+# Bits per rank in the packed preferred channels
+_PREFERENCE_BITS = 2
+
+# 64-bit words per DND slot bitmask
+_DND_WORDS = (SLOTS_PER_DAY + 63) // 64
+
+# Words of a schedule with DND set all day
+_FULL_DAY_WORDS = np.array(
+    [(FULL_DAY_MASK >> (64 * word)) & (2**64 - 1) for word in range(_DND_WORDS)],
+    dtype=np.uint64,
+)
+
+# Channels in the column order of per-channel matrices
+_CHANNELS = tuple(ChannelType[name] for name in CHANNEL_NAMES)
+
+# Column of each ChannelType value in per-channel matrices
+_COLUMN_OF_VALUE = {channel.value: column for column, channel in enumerate(_CHANNELS)}
+
+# String tables: (offsets column, data column)
+_STRING_TABLES = {
+    "user_id": ("uid_offsets", "uid_data"),
+    "push_token": ("push_offsets", "push_data"),
+    "phone": ("phone_offsets", "phone_data"),
+    "email": ("email_offsets", "email_data"),
+    "symbols": ("sym_offsets", "sym_data"),
+}
+
+
+class DirectoryFormatError(ValueError):
+    """Raised when a directory file is malformed, unsupported or corrupted."""
+
+
+class StringTable:
+    """Strings stored as one UTF-8 blob and an offsets array."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        """
+        Initialize the table.
+
+        Args:
+            offsets: int64 array of ``len + 1`` offsets into ``data``
+            data: uint8 array of concatenated UTF-8 strings
+        """
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.encoded(index).decode("utf-8")
+
+    def encoded(self, index: int) -> bytes:
+        """Get the UTF-8 bytes of a string."""
+        return self.data[self.offsets[index] : self.offsets[index + 1]].tobytes()
+
+    def take(self, indices: np.ndarray) -> List[str]:
+        """
+        Get many strings at once.
+
+        Args:
+            indices: Indices of the strings
+
+        Returns:
+            The strings, in the order of ``indices``
+        """
+        starts = self.offsets[indices].tolist()
+        ends = self.offsets[np.asarray(indices) + 1].tolist()
+        data = memoryview(self.data)
+        return [str(data[start:end], "utf-8") for start, end in zip(starts, ends)]
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[Optional[str]]) -> "StringTable":
+        """
+        Build a table from strings (None is stored as an empty string).
+
+        Args:
+            strings: The strings
+
+        Returns:
+            The string table
+        """
+        encoded = [(string or "").encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, data)
+
+
+def _user_hash(user_id: str) -> int:
+    """64-bit hash of a user id for the lookup index."""
+    digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class PreferencesView:
+    """Read-only ``UserPreferences`` view of a directory row."""
+
+    __slots__ = ("_directory", "_row")
+
+    def __init__(self, directory: "RecipientDirectory", row: int):
+        self._directory = directory
+        self._row = row
+
+    @property
+    def user_id(self) -> str:
+        return self._directory.user_ids[self._row]
+
+    @property
+    def preferred_channels(self) -> List[ChannelType]:
+        packed = int(self._directory.columns["preferred"][self._row])
+        channels = []
+        while packed:
+            channels.append(ChannelType(packed & ((1 << _PREFERENCE_BITS) - 1)))
+            packed >>= _PREFERENCE_BITS
+        return channels
+
+    @property
+    def timezone(self) -> str:
+        directory = self._directory
+        return directory.symbols[int(directory.columns["timezone"][self._row])]
+
+    @property
+    def language(self) -> str:
+        directory = self._directory
+        return directory.symbols[int(directory.columns["language"][self._row])]
+
+    def _dnd_mask(self, column: int) -> int:
+        directory = self._directory
+        schedule = directory.columns["dnd_ids"][self._row]
+        mask = 0
+        for word in reversed(directory.dnd_schedules[schedule, column].tolist()):
+            mask = (mask << 64) | word
+        return mask
+
+    @property
+    def dnd_masks(self) -> Dict[ChannelType, int]:
+        """DND slot bitmasks by channel, as in ``UserPreferences``."""
+        masks = {}
+        for column, channel in enumerate(_CHANNELS):
+            mask = self._dnd_mask(column)
+            if mask:
+                masks[channel] = mask
+        return masks
+
+    def is_dnd_active(self, channel: ChannelType, now: Optional[float] = None) -> bool:
+        """
+        Check if Do Not Disturb is currently active for a channel.
+
+        Args:
+            channel: The channel type to check
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            True if DND is active, False otherwise
+        """
+        column = _COLUMN_OF_VALUE.get(channel.value)
+        mask = self._dnd_mask(column) if column is not None else 0
+        if not mask:
+            return False
+        if now is None:
+            now = get_clock().time()
+        return is_slot_set(mask, local_slot(self.timezone, now))
+
+    def next_allowed_time(
+        self, channel: ChannelType, now: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Get the next time a channel is outside Do Not Disturb.
+
+        Args:
+            channel: The channel type to check
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            ``now`` if DND is not active, the time the current DND period
+            ends otherwise, or None if DND covers the whole day
+        """
+        column = _COLUMN_OF_VALUE.get(channel.value)
+        mask = self._dnd_mask(column) if column is not None else 0
+        if now is None:
+            now = get_clock().time()
+        return next_allowed_time(mask, self.timezone, now)
+
+
+class RecipientView:
+    """Read-only ``RecipientContext`` view of a directory row."""
+
+    __slots__ = ("_directory", "_row")
+
+    def __init__(self, directory: "RecipientDirectory", row: int):
+        self._directory = directory
+        self._row = row
+
+    def _string(self, name: str) -> Optional[str]:
+        return self._directory.strings[name][self._row] or None
+
+    def _enabled(self, channel: ChannelType) -> bool:
+        enabled = self._directory.columns["enabled"][self._row]
+        return bool(enabled & CHANNEL_BITS[channel.name])
+
+    @property
+    def user_id(self) -> str:
+        return self._directory.user_ids[self._row]
+
+    @property
+    def preferences(self) -> Optional[PreferencesView]:
+        status = self._directory.columns["status"][self._row]
+        if not status & STATUS_HAS_PREFERENCES:
+            return None
+        return PreferencesView(self._directory, self._row)
+
+    @property
+    def push_enabled(self) -> bool:
+        return self._enabled(ChannelType.PUSH)
+
+    @property
+    def sms_enabled(self) -> bool:
+        return self._enabled(ChannelType.SMS)
+
+    @property
+    def email_enabled(self) -> bool:
+        return self._enabled(ChannelType.EMAIL)
+
+    @property
+    def push_token(self) -> Optional[str]:
+        return self._string("push_token")
+
+    @property
+    def phone(self) -> Optional[str]:
+        return self._string("phone")
+
+    @property
+    def email(self) -> Optional[str]:
+        return self._string("email")
+
+    @property
+    def device_active(self) -> bool:
+        status = self._directory.columns["status"][self._row]
+        return bool(status & STATUS_DEVICE_ACTIVE)
+
+    @property
+    def last_active(self) -> Optional[float]:
+        last_active = float(self._directory.columns["last_active"][self._row])
+        return None if np.isnan(last_active) else last_active
+
+    def has_channel(self, channel: ChannelType) -> bool:
+        """
+        Check if the recipient has a specific channel available.
+
+        Args:
+            channel: The channel to check
+
+        Returns:
+            True if channel is available, False otherwise
+        """
+        available = self._directory.columns["available"][self._row]
+        return bool(available & CHANNEL_BITS.get(channel.name, 0))
+
+    def get_enabled_channels(self) -> List[ChannelType]:
+        """
+        Get all enabled channels for the recipient.
+
+        Returns:
+            List of enabled channels
+        """
+        available = int(self._directory.columns["available"][self._row])
+        return [
+            channel for channel in _CHANNELS if available & CHANNEL_BITS[channel.name]
+        ]
+
+
+class RecipientDirectory:
+    """Columnar store of recipients, one row per user sorted by user id."""
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        _mmap: Optional[mmap.mmap] = None,
+    ):
+        """
+        Initialize the directory from its columns.
+
+        Use :meth:`from_contexts` to build a directory and :meth:`load` to
+        map a saved one.
+
+        Args:
+            columns: Column arrays by name
+        """
+        self.columns = columns
+        self.strings = {
+            name: StringTable(columns[offsets], columns[data])
+            for name, (offsets, data) in _STRING_TABLES.items()
+        }
+        self.user_ids = self.strings["user_id"]
+        self.symbols = self.strings["symbols"]
+        self.dnd_schedules = columns["dnd_schedules"].reshape(
+            -1, len(_CHANNELS), _DND_WORDS
+        )
+        # Lookup index: sorted user id hashes and the row of each
+        self._hashes = columns["uid_hashes"]
+        self._hash_rows = columns["uid_hash_rows"]
+        self._mmap = _mmap
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __getitem__(self, row: int) -> RecipientView:
+        if not 0 <= row < len(self):
+            raise IndexError("directory row out of range")
+        return RecipientView(self, row)
+
+    def find(self, user_id: str) -> int:
+        """
+        Find the row of a user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Row index, or -1 if the user isn't in the directory
+        """
+        return int(self.rows([user_id])[0])
+
+    def get(self, user_id: str) -> Optional[RecipientView]:
+        """
+        Get a view of a user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            The recipient view, or None if the user isn't in the directory
+        """
+        row = self.find(user_id)
+        return RecipientView(self, row) if row >= 0 else None
+
+    def rows(self, user_ids: Sequence[str]) -> np.ndarray:
+        """
+        Find the rows of many users.
+
+        Args:
+            user_ids: User identifiers
+
+        Returns:
+            int64 array of row indices (-1 for unknown users)
+        """
+        hashes = np.fromiter(
+            map(_user_hash, user_ids), dtype=np.uint64, count=len(user_ids)
+        )
+        positions = np.searchsorted(self._hashes, hashes)
+        rows = np.full(len(user_ids), -1, dtype=np.int64)
+        if not len(self):
+            return rows
+
+        clipped = np.minimum(positions, len(self) - 1)
+        candidates = np.flatnonzero(self._hashes[clipped] == hashes)
+        candidate_rows = self._hash_rows[clipped[candidates]]
+        stored = self.user_ids.take(candidate_rows)
+        for i, row, user_id in zip(
+            candidates.tolist(), candidate_rows.tolist(), stored
+        ):
+            if user_id == user_ids[i]:
+                rows[i] = row
+                continue
+
+            # Hash collision: check the following entries with the same hash
+            position = int(clipped[i]) + 1
+            while position < len(self) and self._hashes[position] == hashes[i]:
+                row = int(self._hash_rows[position])
+                if self.user_ids[row] == user_ids[i]:
+                    rows[i] = row
+                    break
+                position += 1
+        return rows
+
+    def recipient_columns(
+        self,
+        rows: np.ndarray,
+        environment_contexts: Optional[Sequence[Optional[EnvironmentContext]]] = None,
+        now: Optional[float] = None,
+    ) -> RecipientColumns:
+        """
+        Build batch scoring columns for directory rows.
+
+        Equivalent to ``RecipientColumns.from_contexts`` over the rows'
+        views, without creating a Python object per recipient: DND is
+        resolved once per distinct timezone.
+
+        Args:
+            rows: Row indices of the recipients
+            environment_contexts: Environment of each recipient (defaults
+                to an empty environment for everyone; None entries are
+                empty environments too)
+            now: Timestamp DND and recent activity are resolved at
+                (defaults to the default clock)
+
+        Returns:
+            The recipient columns
+        """
+        now = get_clock().time() if now is None else now
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = self.columns
+        count = len(rows)
+        shape = (count, len(_CHANNELS))
+        bits = np.array([CHANNEL_BITS[channel.name] for channel in _CHANNELS])
+
+        available = (columns["available"][rows, None] & bits) != 0
+        status = columns["status"][rows]
+        has_preferences = (status & STATUS_HAS_PREFERENCES) != 0
+
+        # Preference boost from each channel's rank
+        packed = columns["preferred"][rows].astype(np.int64)
+        ranks = [(packed >> (_PREFERENCE_BITS * rank)) & 3 for rank in range(3)]
+        lengths = sum((values > 0).astype(np.int64) for values in ranks)
+        preference_boost = np.zeros(shape)
+        seen = np.zeros(shape, dtype=bool)
+        for rank, values in enumerate(ranks):
+            for value, column in _COLUMN_OF_VALUE.items():
+                # Only a channel's first rank counts, as with list.index
+                selected = (values == value) & ~seen[:, column]
+                boost = 0.3 * (1.0 - rank / np.maximum(lengths[selected], 1))
+                preference_boost[selected, column] = boost
+                seen[:, column] |= selected
+        preference_boost[~has_preferences] = 0.0
+
+        # DND bit test at the local slot of each timezone
+        dnd = np.zeros(shape, dtype=bool)
+        schedules = self.dnd_schedules[columns["dnd_ids"][rows]]
+        timezones = columns["timezone"][rows]
+        for symbol in np.unique(timezones[has_preferences]):
+            selected = has_preferences & (timezones == symbol)
+            slot = local_slot(self.symbols[int(symbol)], now)
+            words = schedules[selected][:, :, slot // 64]
+            dnd[selected] = ((words >> np.uint64(slot % 64)) & np.uint64(1)) == 1
+        dnd_ends = dnd & ~(schedules == _FULL_DAY_WORDS).all(axis=-1)
+
+        last_active = columns["last_active"][rows]
+        with np.errstate(invalid="ignore"):
+            recently_active = (
+                ~np.isnan(last_active) & (last_active != 0) & (now - last_active < 3600)
+            )
+
+        if environment_contexts is None:
+            flags = np.zeros((count, 5), dtype=bool)
+            default_environment = np.ones(count, dtype=bool)
+        else:
+            flags = RecipientColumns.environment_flags(environment_contexts)
+            default_environment = np.array(
+                [environment is None for environment in environment_contexts],
+                dtype=bool,
+            )
+
+        return RecipientColumns(
+            user_ids=self.user_ids.take(rows),
+            available=available,
+            preference_boost=preference_boost,
+            dnd=dnd,
+            dnd_ends=dnd_ends,
+            device_active=(status & STATUS_DEVICE_ACTIVE) != 0,
+            recently_active=recently_active,
+            app_foreground=flags[:, 0],
+            app_background=flags[:, 1],
+            device_constrained=flags[:, 2],
+            offline=flags[:, 3],
+            poor_network=flags[:, 4],
+            default_environment=default_environment,
+            now=now,
+        )
+
+    @classmethod
+    def from_contexts(
+        cls, recipient_contexts: Sequence[RecipientContext]
+    ) -> "RecipientDirectory":
+        """
+        Build a directory from recipient contexts.
+
+        Notification history isn't stored; later contexts replace earlier
+        ones with the same user id.
+
+        Args:
+            recipient_contexts: The recipients
+
+        Returns:
+            The directory
+        """
+        by_user = {recipient.user_id: recipient for recipient in recipient_contexts}
+        recipients = [by_user[user_id] for user_id in sorted(by_user)]
+        count = len(recipients)
+
+        symbols: Dict[str, int] = {}
+        schedules: Dict[Tuple[int, ...], int] = {(0,) * len(_CHANNELS): 0}
+
+        def intern(value: str) -> int:
+            return symbols.setdefault(value, len(symbols))
+
+        timezone = np.zeros(count, dtype="<u2")
+        language = np.zeros(count, dtype="<u2")
+        enabled = np.zeros(count, dtype=np.uint8)
+        available = np.zeros(count, dtype=np.uint8)
+        status = np.zeros(count, dtype=np.uint8)
+        preferred = np.zeros(count, dtype=np.uint8)
+        dnd_ids = np.zeros(count, dtype="<u4")
+        last_active = np.full(count, np.nan, dtype="<f8")
+
+        intern("UTC")
+        intern("en")
+        for row, recipient in enumerate(recipients):
+            for channel in _CHANNELS:
+                bit = CHANNEL_BITS[channel.name]
+                if getattr(recipient, f"{channel.name.lower()}_enabled"):
+                    enabled[row] |= bit
+                if recipient.has_channel(channel):
+                    available[row] |= bit
+            if recipient.device_active:
+                status[row] |= STATUS_DEVICE_ACTIVE
+            if recipient.last_active is not None:
+                last_active[row] = recipient.last_active
+
+            preferences = recipient.preferences
+            if preferences is None:
+                timezone[row] = symbols["UTC"]
+                language[row] = symbols["en"]
+                continue
+
+            status[row] |= STATUS_HAS_PREFERENCES
+            timezone[row] = intern(preferences.timezone)
+            language[row] = intern(preferences.language)
+            packed = 0
+            for rank, channel in enumerate(preferences.preferred_channels[:3]):
+                packed |= channel.value << (_PREFERENCE_BITS * rank)
+            preferred[row] = packed
+            schedule = tuple(
+                preferences.dnd_masks.get(channel, 0) for channel in _CHANNELS
+            )
+            dnd_ids[row] = schedules.setdefault(schedule, len(schedules))
+
+        dnd_schedules = np.zeros((len(schedules), len(_CHANNELS), _DND_WORDS), "<u8")
+        for schedule, index in schedules.items():
+            for column, mask in enumerate(schedule):
+                for word in range(_DND_WORDS):
+                    dnd_schedules[index, column, word] = (mask >> (64 * word)) & (
+                        (1 << 64) - 1
+                    )
+
+        columns = {
+            "timezone": timezone,
+            "language": language,
+            "enabled": enabled,
+            "available": available,
+            "status": status,
+            "preferred": preferred,
+            "dnd_ids": dnd_ids,
+            "last_active": last_active,
+            "dnd_schedules": dnd_schedules.reshape(-1),
+        }
+        strings = {
+            "user_id": [recipient.user_id for recipient in recipients],
+            "push_token": [recipient.push_token for recipient in recipients],
+            "phone": [recipient.phone for recipient in recipients],
+            "email": [recipient.email for recipient in recipients],
+            "symbols": sorted(symbols, key=symbols.get),
+        }
+        hashes = np.fromiter(
+            (_user_hash(user_id) for user_id in strings["user_id"]),
+            dtype="<u8",
+            count=count,
+        )
+        order = np.argsort(hashes, kind="stable")
+        columns["uid_hashes"] = hashes[order]
+        columns["uid_hash_rows"] = order.astype("<i8")
+
+        for name, values in strings.items():
+            table = StringTable.from_strings(values)
+            offsets, data = _STRING_TABLES[name]
+            columns[offsets] = table.offsets
+            columns[data] = table.data
+
+        logger.info(
+            f"Built recipient directory of {count} users "
+            f"({len(symbols)} symbols, {len(schedules)} DND schedules)"
+        )
+        return cls(columns)
+
+    def save(self, path: str) -> str:
+        """
+        Write the directory to disk.
+
+        Columns are laid out after a header and a column table, each
+        aligned to 8 bytes so they can be mapped in place. The file is
+        written to a temporary path and renamed into place.
+
+        Args:
+            path: Destination file path
+
+        Returns:
+            Hex SHA-256 digest of the written payload
+        """
+        names = sorted(self.columns)
+        table_size = _HEADER.size + _COLUMN.size * len(names)
+        entries = []
+        chunks = []
+        offset = table_size
+        for name in names:
+            column = np.ascontiguousarray(self.columns[name])
+            dtype = column.dtype.newbyteorder("<").str
+            column = column.astype(dtype, copy=False)
+            padding = -offset % 8
+            chunks.append(b"\x00" * padding)
+            offset += padding
+            entries.append(
+                _COLUMN.pack(name.encode("ascii"), dtype.encode(), offset, column.size)
+            )
+            chunks.append(column.tobytes())
+            offset += column.nbytes
+
+        payload = b"".join(chunks)
+        digest = hashlib.sha256(payload).digest()
+        header = _HEADER.pack(
+            DIRECTORY_MAGIC,
+            DIRECTORY_FORMAT_VERSION,
+            0,
+            len(names),
+            len(self),
+            len(payload),
+            digest,
+        )
+
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(b"".join(entries))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        logger.info(f"Saved recipient directory of {len(self)} users to {path}")
+        return digest.hex()
+
+    @classmethod
+    def load(cls, path: str, verify: bool = False) -> "RecipientDirectory":
+        """
+        Memory-map a saved directory.
+
+        Columns are read-only views into the mapping, so no copy of the
+        directory is made in the calling process.
+
+        Args:
+            path: Path to the directory file
+            verify: Whether to check the payload against the stored digest
+                (reads the whole file, so off by default)
+
+        Returns:
+            The mapped directory
+
+        Raises:
+            DirectoryFormatError: If the file is malformed, of an
+                unsupported version, or fails checksum verification
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise DirectoryFormatError(f"Directory file {path} is too small")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            _,
+            column_count,
+            user_count,
+            payload_size,
+            digest,
+        ) = _HEADER.unpack_from(mapped, 0)
+
+        if magic != DIRECTORY_MAGIC:
+            raise DirectoryFormatError(f"{path} is not a recipient directory file")
+        if version != DIRECTORY_FORMAT_VERSION:
+            raise DirectoryFormatError(
+                f"Unsupported directory format version: {version}"
+            )
+
+        payload_start = _HEADER.size + _COLUMN.size * column_count
+        if size != payload_start + payload_size:
+            raise DirectoryFormatError(f"Directory file {path} has an unexpected size")
+
+        if verify:
+            view = memoryview(mapped)[payload_start:]
+            try:
+                actual = hashlib.sha256(view).digest()
+            finally:
+                view.release()
+            if actual != digest:
+                raise DirectoryFormatError(f"Checksum mismatch for directory {path}")
+
+        columns = {}
+        for index in range(column_count):
+            name, dtype, offset, count = _COLUMN.unpack_from(
+                mapped, _HEADER.size + _COLUMN.size * index
+            )
+            dtype = np.dtype(dtype.rstrip(b"\x00").decode("ascii"))
+            if offset + count * dtype.itemsize > size:
+                raise DirectoryFormatError(f"Column past the end of {path}")
+            columns[name.rstrip(b"\x00").decode("ascii")] = np.frombuffer(
+                mapped, dtype=dtype, count=count, offset=offset
+            )
+
+        directory = cls(columns, _mmap=mapped)
+        if len(directory) != user_count:
+            raise DirectoryFormatError(f"Directory file {path} has an unexpected size")
+
+        logger.info(f"Mapped recipient directory of {user_count} users from {path}")
+        return directory
@@ -0,0 +1,219 @@
+"""
+Precompiled Do Not Disturb schedules.
+
+A user's DND ranges are compiled once into a bitmask with one bit per
+15-minute slot of the local day, so checking DND is a single bit test. The
+local slot is found from a cached table of UTC offsets per timezone, which
+follows DST transitions because offsets are resolved per 15-minute UTC
+bucket rather than once per timezone. The end of a DND period is found by
+rotating the mask to the current slot and taking its lowest clear bit.
+"""
+
+import functools
+import logging
+import time
+from datetime import datetime, timezone, tzinfo
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    from backports.zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.dnd")
+
+# 15-minute slots per local day
+SLOTS_PER_DAY = 96
+SLOT_SECONDS = 86400 // SLOTS_PER_DAY
+SLOTS_PER_HOUR = SLOTS_PER_DAY // 24
+
+# Every slot set: DND all day
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+
+def compile_dnd_ranges(ranges: Iterable[Tuple[float, float]]) -> int:
+    """
+    Compile (start_hour, end_hour) DND ranges into a slot bitmask.
+
+    Ranges are half-open in local time; a range whose start is after its
+    end wraps past midnight (e.g. (22, 6)). Hours may be fractional with
+    15-minute resolution.
+
+    Args:
+        ranges: (start_hour, end_hour) pairs
+
+    Returns:
+        Bitmask with bit ``i`` set if slot ``i`` of the day is in DND
+    """
+    mask = 0
+    for start_hour, end_hour in ranges:
+        start = round(start_hour * SLOTS_PER_HOUR) % SLOTS_PER_DAY
+        end = round(end_hour * SLOTS_PER_HOUR)
+        if end >= SLOTS_PER_DAY:
+            end = SLOTS_PER_DAY
+        if start <= end:
+            mask |= ((1 << end) - 1) & ~((1 << start) - 1)
+        else:
+            # Overnight range: start to midnight, then midnight to end
+            mask |= FULL_DAY_MASK & ~((1 << start) - 1)
+            mask |= (1 << end) - 1
+    return mask
+
+
+def compile_dnd_schedule(
+    do_not_disturb: Dict[Hashable, Iterable[Tuple[float, float]]],
+) -> Dict[Hashable, int]:
+    """
+    Compile the DND ranges of every channel.
+
+    Args:
+        do_not_disturb: Mapping of channels to (start_hour, end_hour) ranges
+
+    Returns:
+        Mapping of channels to slot bitmasks (channels without DND omitted)
+    """
+    masks = {}
+    for channel, ranges in do_not_disturb.items():
+        mask = compile_dnd_ranges(ranges)
+        if mask:
+            masks[channel] = mask
+    return masks
+
+
+class DndSchedule:
+    """
+    Compiled bitmasks of a DND ranges dict, kept in sync with its content.
+
+    The ranges are compared with those last compiled on every read, so
+    editing the dict in place takes effect like replacing it.
+    """
+
+    __slots__ = ("_key", "_masks")
+
+    def __init__(self):
+        self._key: Optional[Tuple] = None
+        self._masks: Dict[Hashable, int] = {}
+
+    def masks(
+        self, do_not_disturb: Dict[Hashable, Iterable[Tuple[float, float]]]
+    ) -> Dict[Hashable, int]:
+        """
+        Get the bitmasks of the ranges, recompiling them if they changed.
+
+        Args:
+            do_not_disturb: Mapping of channels to (start_hour, end_hour) ranges
+
+        Returns:
+            Mapping of channels to slot bitmasks (channels without DND omitted)
+        """
+        key = tuple(
+            (channel, tuple(map(tuple, ranges)))
+            for channel, ranges in do_not_disturb.items()
+        )
+        if key != self._key:
+            self._masks = compile_dnd_schedule(do_not_disturb)
+            self._key = key
+        return self._masks
+
+
+@functools.lru_cache(maxsize=None)
+def _zone(name: str) -> tzinfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {name!r}, using UTC")
+        return timezone.utc
+
+
+@functools.lru_cache(maxsize=65536)
+def _utc_offset(name: str, bucket: int) -> int:
+    """UTC offset in seconds of a timezone during a 15-minute UTC bucket."""
+    instant = datetime.fromtimestamp(bucket * SLOT_SECONDS, tz=timezone.utc)
+    return int(instant.astimezone(_zone(name)).utcoffset().total_seconds())
+
+
+def utc_offset(tz_name: str, timestamp: float) -> int:
+    """
+    Get the UTC offset of a timezone at an instant.
+
+    Offsets are cached per 15-minute UTC bucket, which all DST transitions
+    fall on.
+
+    Args:
+        tz_name: IANA timezone name
+        timestamp: Unix timestamp
+
+    Returns:
+        Offset in seconds
+    """
+    return _utc_offset(tz_name, int(timestamp // SLOT_SECONDS))
+
+
+def local_slot(tz_name: str, timestamp: Optional[float] = None) -> int:
+    """
+    Get the 15-minute slot of the local day at an instant.
+
+    Args:
+        tz_name: IANA timezone name
+        timestamp: Unix timestamp (defaults to time.time())
+
+    Returns:
+        Slot index in [0, SLOTS_PER_DAY)
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    local = timestamp + utc_offset(tz_name, timestamp)
+    return int(local // SLOT_SECONDS) % SLOTS_PER_DAY
+
+
+def is_slot_set(mask: int, slot: int) -> bool:
+    """Check whether a slot is set in a DND bitmask."""
+    return (mask >> slot) & 1 == 1
+
+
+def next_allowed_time(
+    mask: int, tz_name: str, timestamp: Optional[float] = None
+) -> Optional[float]:
+    """
+    Get the first instant at or after a time that is outside a DND mask.
+
+    The slots left in the current DND period are counted with bit
+    operations on the mask rotated to the current slot; only if a DST
+    transition falls inside the period are the slots stepped through.
+
+    Args:
+        mask: DND slot bitmask
+        tz_name: IANA timezone name
+        timestamp: Unix timestamp (defaults to time.time())
+
+    Returns:
+        ``timestamp`` itself if DND is not active then, the start of the
+        first slot after the DND period otherwise, or None if the mask
+        covers the whole day
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    mask &= FULL_DAY_MASK
+    if mask == FULL_DAY_MASK:
+        return None
+
+    offset = utc_offset(tz_name, timestamp)
+    local = timestamp + offset
+    slot = int(local // SLOT_SECONDS) % SLOTS_PER_DAY
+    if not is_slot_set(mask, slot):
+        return timestamp
+
+    # Rotate so bit 0 is the current slot, then find the first clear bit
+    rotated = ((mask >> slot) | (mask << (SLOTS_PER_DAY - slot))) & FULL_DAY_MASK
+    clear = ~rotated & FULL_DAY_MASK
+    slots = (clear & -clear).bit_length() - 1
+    end = (local // SLOT_SECONDS + slots) * SLOT_SECONDS - offset
+    if utc_offset(tz_name, end) == offset:
+        return end
+
+    # A DST transition falls inside the period: step through the slots
+    instant = (timestamp // SLOT_SECONDS + 1) * SLOT_SECONDS
+    while is_slot_set(mask, local_slot(tz_name, instant)):
+        instant += SLOT_SECONDS
+    return instant
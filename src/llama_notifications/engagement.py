@@ -0,0 +1,348 @@
+"""
+Per-user engagement statistics from delivery receipts.
+
+Delivered, opened and clicked receipts are counted per user in a histogram
+over the 168 hours of the week, stored as rows of one fixed-size ``float32``
+array. Counts decay exponentially with a configurable half-life using
+forward decay: an event is added with weight ``2 ** ((t - landmark) /
+half_life)`` instead of shrinking every count as time passes, so recording a
+receipt touches one cell and reading a user's engagement is O(1). Ratios of
+counts need no decay at all; only the smoothing prior is converted to the
+stored units when read. The landmark moves forward (rescaling the array
+once) before the weights could overflow.
+
+Hours are hours of the UTC week, so the best hour of a user is an instant
+that can be scheduled directly, without the user's timezone.
+"""
+
+import logging
+import math
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .clock import get_clock
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.engagement")
+
+HOURS_PER_WEEK = 168
+
+# Unix time 0 was a Thursday; shift so hour 0 is Monday 00:00 UTC
+_EPOCH_HOUR_OF_WEEK = 72
+
+# Move the landmark once weights reach 2 ** this many half-lives
+_MAX_HALF_LIVES = 64
+
+# Rows allocated before the first growth
+_INITIAL_ROWS = 1024
+
+
+class ReceiptEvent(Enum):
+    """Kinds of delivery receipts."""
+
+    DELIVERED = 0
+    OPENED = 1
+    CLICKED = 2
+
+
+def hour_of_week(timestamp: float) -> int:
+    """
+    Get the hour of the UTC week of an instant.
+
+    Args:
+        timestamp: Unix timestamp
+
+    Returns:
+        Hour in [0, 168), 0 being Monday 00:00-01:00 UTC
+    """
+    return (int(timestamp // 3600) + _EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+
+
+class EngagementStore:
+    """Decayed per-user, per-hour-of-week receipt histograms."""
+
+    def __init__(
+        self,
+        half_life_days: float = 14.0,
+        max_users: int = 100_000,
+        prior_weight: float = 2.0,
+        landmark: Optional[float] = None,
+    ):
+        """
+        Initialize an empty store.
+
+        Each user takes ``3 * 168 * 4`` bytes; the array grows by doubling
+        up to ``max_users`` rows, after which the least recently updated
+        user is evicted.
+
+        Args:
+            half_life_days: Time for a receipt's weight to halve
+            max_users: Maximum number of users kept
+            prior_weight: Deliveries' worth of the neutral 0.5 prior mixed
+                into every engagement rate, so users with few receipts stay
+                near the default
+            landmark: Reference time of the forward-decay weights
+                (defaults to the default clock)
+        """
+        if half_life_days <= 0:
+            raise ValueError("half_life_days must be positive")
+        if max_users < 1:
+            raise ValueError("max_users must be at least 1")
+        if prior_weight < 0:
+            raise ValueError("prior_weight must be non-negative")
+
+        self.half_life = half_life_days * 86400.0
+        self.max_users = max_users
+        self.prior_weight = prior_weight
+        self.landmark = get_clock().time() if landmark is None else landmark
+
+        rows = min(_INITIAL_ROWS, max_users)
+        # (user row, event, hour of week) counts, scaled by the landmark weight
+        self._counts = np.zeros((rows, len(ReceiptEvent), HOURS_PER_WEEK), np.float32)
+        # Per-user totals over the week, kept alongside for O(1) reads
+        self._totals = np.zeros((rows, len(ReceiptEvent)), np.float64)
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _weight(self, timestamp: float) -> float:
+        """Forward-decay weight of an event (lock must be held)."""
+        half_lives = (timestamp - self.landmark) / self.half_life
+        if half_lives > _MAX_HALF_LIVES:
+            # Rescale everything to a new landmark before weights overflow
+            shift = math.floor(half_lives)
+            self._counts *= np.float32(2.0**-shift)
+            self._totals *= 2.0**-shift
+            self.landmark += shift * self.half_life
+            half_lives -= shift
+        return 2.0**half_lives
+
+    def _row(self, user_id: str) -> int:
+        """Get or allocate the row of a user (lock must be held)."""
+        row = self._rows.get(user_id)
+        if row is not None:
+            self._rows.move_to_end(user_id)
+            return row
+
+        if len(self._rows) < len(self._counts):
+            row = len(self._rows)
+        elif len(self._counts) < self.max_users:
+            rows = min(2 * len(self._counts), self.max_users)
+            self._counts = np.concatenate(
+                [self._counts, np.zeros_like(self._counts[: rows - len(self._counts)])]
+            )
+            self._totals = np.concatenate(
+                [self._totals, np.zeros_like(self._totals[: rows - len(self._totals)])]
+            )
+            row = len(self._rows)
+        else:
+            _, row = self._rows.popitem(last=False)
+            self._counts[row] = 0.0
+            self._totals[row] = 0.0
+            self._evictions += 1
+
+        self._rows[user_id] = row
+        return row
+
+    def record(
+        self,
+        user_id: str,
+        event: ReceiptEvent,
+        timestamp: Optional[float] = None,
+        count: int = 1,
+    ) -> None:
+        """
+        Record a delivery receipt.
+
+        Args:
+            user_id: User identifier
+            event: Kind of receipt
+            timestamp: Time of the event (defaults to the default clock)
+            count: Number of events
+        """
+        if timestamp is None:
+            timestamp = get_clock().time()
+
+        with self._lock:
+            weight = count * self._weight(timestamp)
+            row = self._row(user_id)
+            self._counts[row, event.value, hour_of_week(timestamp)] += weight
+            self._totals[row, event.value] += weight
+
+    def record_many(self, receipts: Iterable[Tuple[str, ReceiptEvent, float]]) -> int:
+        """
+        Record a batch of delivery receipts.
+
+        Args:
+            receipts: (user_id, event, timestamp) tuples
+
+        Returns:
+            Number of receipts recorded
+        """
+        recorded = 0
+        with self._lock:
+            for user_id, event, timestamp in receipts:
+                weight = self._weight(timestamp)
+                row = self._row(user_id)
+                self._counts[row, event.value, hour_of_week(timestamp)] += weight
+                self._totals[row, event.value] += weight
+                recorded += 1
+
+        logger.debug(f"Recorded {recorded} receipts for {len(self._rows)} users")
+        return recorded
+
+    def _smoothing(self, now: float) -> float:
+        """Prior weight in stored units at ``now`` (lock must be held)."""
+        return self.prior_weight * 2.0 ** ((now - self.landmark) / self.half_life)
+
+    @staticmethod
+    def _rate(delivered, opened, clicked, prior, smoothing: float):
+        """Smoothed engagement rate: opens and clicks per two deliveries."""
+        rate = (opened + clicked + 2 * prior * smoothing) / (
+            2 * (delivered + smoothing)
+        )
+        return np.clip(rate, 0.0, 1.0)
+
+    def engagement(
+        self, user_id: str, now: Optional[float] = None, default: float = 0.5
+    ) -> float:
+        """
+        Get a user's engagement: decayed opens and clicks per delivery.
+
+        A user who opens and clicks everything scores 1.0; the rate is
+        smoothed toward 0.5 by ``prior_weight`` deliveries.
+
+        Args:
+            user_id: User identifier
+            now: Current timestamp (defaults to the default clock)
+            default: Value for users without receipts
+
+        Returns:
+            Engagement in [0, 1]
+        """
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return default
+            delivered, opened, clicked = self._totals[row].tolist()
+            smoothing = self._smoothing(now)
+        return float(self._rate(delivered, opened, clicked, 0.5, smoothing))
+
+    def engagement_many(
+        self,
+        user_ids: Sequence[Optional[str]],
+        now: Optional[float] = None,
+        default: float = 0.5,
+    ) -> np.ndarray:
+        """
+        Get the engagement of many users.
+
+        Args:
+            user_ids: User identifiers (None for unknown users)
+            now: Current timestamp (defaults to the default clock)
+            default: Value for users without receipts
+
+        Returns:
+            Array of engagements in [0, 1]
+        """
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            rows = np.array(
+                [self._rows.get(user_id, -1) for user_id in user_ids], dtype=np.int64
+            )
+            totals = self._totals[np.maximum(rows, 0)]
+            smoothing = self._smoothing(now)
+        rates = self._rate(totals[:, 0], totals[:, 1], totals[:, 2], 0.5, smoothing)
+        return np.where(rows >= 0, rates, default)
+
+    def hourly_engagement(
+        self, user_id: str, now: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Get a user's engagement in each hour of the week.
+
+        Each hour is smoothed toward the user's overall engagement.
+
+        Args:
+            user_id: User identifier
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            Array of 168 engagements, or None for users without receipts
+        """
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return None
+            delivered, opened, clicked = self._counts[row].astype(np.float64)
+            totals = self._totals[row].tolist()
+            smoothing = self._smoothing(now)
+        overall = float(self._rate(*totals, 0.5, smoothing))
+        return self._rate(delivered, opened, clicked, overall, smoothing)
+
+    def best_time(
+        self,
+        user_id: str,
+        now: Optional[float] = None,
+        horizon_hours: int = 24,
+        deadline: Optional[float] = None,
+    ) -> float:
+        """
+        Get the start of the user's most engaging hour within a horizon.
+
+        Args:
+            user_id: User identifier
+            now: Current timestamp (defaults to the default clock)
+            horizon_hours: Number of hours ahead to consider, including
+                the current one
+            deadline: Latest acceptable delivery time
+
+        Returns:
+            ``now`` if the current hour is best or the user has no
+            receipts, otherwise the start of the best hour (the earliest
+            one on ties)
+        """
+        if now is None:
+            now = get_clock().time()
+        hourly = self.hourly_engagement(user_id, now)
+        if hourly is None:
+            return now
+
+        hours = max(1, min(horizon_hours, HOURS_PER_WEEK))
+        if deadline is not None:
+            hours = max(1, min(hours, int((deadline - now) // 3600) + 1))
+        current = hour_of_week(now)
+        window = hourly[(current + np.arange(hours)) % HOURS_PER_WEEK]
+        offset = int(np.argmax(window))
+        if offset == 0:
+            return now
+        return (now // 3600 + offset) * 3600
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get store statistics.
+
+        Returns:
+            Dictionary with the number of users, allocated rows and users
+            evicted at capacity
+        """
+        return {
+            "users": len(self._rows),
+            "rows": len(self._counts),
+            "evictions": self._evictions,
+        }
@@ -0,0 +1,307 @@
+"""
+Per-channel notification history.
+
+Each channel keeps its recent notifications in a fixed-capacity ring buffer
+of parallel compact arrays (timestamp, id, priority) in time order, so the
+memory per recipient is bounded however many notifications they receive.
+Window queries locate their start by binary search, and counts over a
+sliding window ("notifications in the last hour") are kept by a per-window
+boundary that only moves forward, so repeated counts cost O(1) amortized.
+"""
+
+import heapq
+import logging
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional
+
+from .clock import get_clock
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.history")
+
+# Notifications kept per channel
+DEFAULT_HISTORY_CAPACITY = 256
+
+
+class HistoryRing:
+    """Fixed-capacity, time-ordered ring buffer of one channel's notifications."""
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_CAPACITY):
+        """
+        Initialize an empty ring.
+
+        Args:
+            capacity: Maximum number of notifications kept; the oldest are
+                overwritten once it is reached
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._priorities = array("b", bytes(capacity))
+        self._ids: List[Optional[str]] = [None] * capacity
+        self._start = 0
+        self._size = 0
+        # Total notifications ever appended; entry i of the ring has
+        # sequence number _appended - _size + i
+        self._appended = 0
+        # Sliding-window counters: window seconds -> [cutoff, boundary seq]
+        self._windows: Dict[float, List[float]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _slot(self, index: int) -> int:
+        return (self._start + index) % self.capacity
+
+    def timestamp_at(self, index: int) -> float:
+        """Timestamp of the ``index``-th oldest notification in the ring."""
+        return self._timestamps[self._slot(index)]
+
+    def append(self, timestamp: float, notification_id: str, priority: int = 0) -> None:
+        """
+        Record a notification.
+
+        Notifications normally arrive in time order; a late one is inserted
+        at its place, at the cost of shifting the newer entries.
+
+        Args:
+            timestamp: Time the notification was sent
+            notification_id: Notification identifier
+            priority: Priority level (0-3)
+        """
+        if self._size and timestamp < self.timestamp_at(self._size - 1):
+            self._insert(timestamp, notification_id, priority)
+            return
+
+        if self._size == self.capacity:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        else:
+            slot = self._slot(self._size)
+            self._size += 1
+        self._timestamps[slot] = timestamp
+        self._ids[slot] = notification_id
+        self._priorities[slot] = priority
+        self._appended += 1
+
+    def _insert(self, timestamp: float, notification_id: str, priority: int) -> None:
+        """Insert an out-of-order notification, keeping the ring sorted."""
+        entries = list(self._entries(0))
+        position = self.bisect(timestamp, right=True)
+        entries.insert(position, (timestamp, notification_id, priority))
+        entries = entries[-self.capacity :]
+
+        self._start = 0
+        self._size = len(entries)
+        for slot, (ts, nid, prio) in enumerate(entries):
+            self._timestamps[slot] = ts
+            self._ids[slot] = nid
+            self._priorities[slot] = prio
+        self._appended += 1
+        # Boundaries are sequence numbers, which the insert shifted
+        self._windows.clear()
+
+    def bisect(self, timestamp: float, right: bool = False) -> int:
+        """
+        Find the ring index of the first notification at or after a time.
+
+        Args:
+            timestamp: The time to search for
+            right: Return the index after notifications at exactly ``timestamp``
+
+        Returns:
+            Index in [0, len(ring)]
+        """
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            value = self.timestamp_at(middle)
+            if value < timestamp or (right and value == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _entries(self, first: int) -> Iterator[tuple]:
+        for index in range(first, self._size):
+            slot = self._slot(index)
+            yield self._timestamps[slot], self._ids[slot], self._priorities[slot]
+
+    def since(self, cutoff: float) -> List[Dict[str, Any]]:
+        """
+        Get the notifications sent at or after a time.
+
+        Args:
+            cutoff: Earliest timestamp to include
+
+        Returns:
+            Notifications in time order, as dicts with ``timestamp``,
+            ``notification_id`` and ``priority``
+        """
+        return [
+            {"timestamp": ts, "notification_id": nid, "priority": prio}
+            for ts, nid, prio in self._entries(self.bisect(cutoff))
+        ]
+
+    def count_since(self, cutoff: float) -> int:
+        """
+        Count the notifications sent at or after a time.
+
+        Args:
+            cutoff: Earliest timestamp to include
+
+        Returns:
+            Number of notifications (at most the ring capacity)
+        """
+        return self._size - self.bisect(cutoff)
+
+    def count_window(self, seconds: float, now: Optional[float] = None) -> int:
+        """
+        Count the notifications sent within a sliding window.
+
+        Each window length keeps the sequence number of its oldest
+        notification, which moves forward as time passes, so counting the
+        same window repeatedly costs O(1) amortized. If time goes backwards
+        the boundary is found again by binary search.
+
+        Args:
+            seconds: Window length
+            now: End of the window (defaults to the default clock)
+
+        Returns:
+            Number of notifications (at most the ring capacity)
+        """
+        if now is None:
+            now = get_clock().time()
+        cutoff = now - seconds
+        oldest = self._appended - self._size
+
+        window = self._windows.get(seconds)
+        if window is None or cutoff < window[0]:
+            window = [cutoff, oldest + self.bisect(cutoff)]
+            self._windows[seconds] = window
+        else:
+            window[0] = cutoff
+            boundary = max(int(window[1]), oldest)
+            while boundary < self._appended and (
+                self.timestamp_at(boundary - oldest) < cutoff
+            ):
+                boundary += 1
+            window[1] = boundary
+
+        return self._appended - int(window[1])
+
+
+class NotificationHistory:
+    """Recent notifications of one recipient, in one ring per channel."""
+
+    def __init__(
+        self,
+        history: Optional[Mapping[Hashable, Iterable[Dict[str, Any]]]] = None,
+        capacity: int = DEFAULT_HISTORY_CAPACITY,
+    ):
+        """
+        Initialize the history.
+
+        Args:
+            history: Optional initial notifications by channel, as dicts
+                with ``timestamp`` and optionally ``notification_id`` and
+                ``priority``
+            capacity: Notifications kept per channel
+        """
+        self.capacity = capacity
+        self._rings: Dict[Hashable, HistoryRing] = {}
+
+        for channel, notifications in (history or {}).items():
+            for notification in sorted(
+                notifications, key=lambda n: n.get("timestamp", 0)
+            ):
+                self.record(
+                    channel,
+                    notification.get("timestamp", 0),
+                    notification.get("notification_id", ""),
+                    notification.get("priority", 0),
+                )
+
+    def __len__(self) -> int:
+        return sum(len(ring) for ring in self._rings.values())
+
+    def channels(self) -> List[Hashable]:
+        """Channels with recorded notifications."""
+        return list(self._rings)
+
+    def ring(self, channel: Hashable) -> Optional[HistoryRing]:
+        """Ring buffer of a channel, or None if nothing was recorded on it."""
+        return self._rings.get(channel)
+
+    def record(
+        self,
+        channel: Hashable,
+        timestamp: float,
+        notification_id: str,
+        priority: int = 0,
+    ) -> None:
+        """
+        Record a notification sent on a channel.
+
+        Args:
+            channel: The channel it was sent on
+            timestamp: Time it was sent
+            notification_id: Notification identifier
+            priority: Priority level (0-3)
+        """
+        ring = self._rings.get(channel)
+        if ring is None:
+            ring = self._rings[channel] = HistoryRing(self.capacity)
+        ring.append(timestamp, notification_id, priority)
+
+    def since(
+        self, cutoff: float, channel: Optional[Hashable] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the notifications sent at or after a time.
+
+        Args:
+            cutoff: Earliest timestamp to include
+            channel: Optional channel to filter by
+
+        Returns:
+            Notifications in time order (merged across channels if no
+            channel is given)
+        """
+        if channel is not None:
+            ring = self._rings.get(channel)
+            return ring.since(cutoff) if ring else []
+
+        return list(
+            heapq.merge(
+                *(ring.since(cutoff) for ring in self._rings.values()),
+                key=lambda n: n["timestamp"],
+            )
+        )
+
+    def count_window(
+        self,
+        seconds: float,
+        channel: Optional[Hashable] = None,
+        now: Optional[float] = None,
+    ) -> int:
+        """
+        Count the notifications sent within a sliding window.
+
+        Args:
+            seconds: Window length
+            channel: Optional channel to filter by
+            now: End of the window (defaults to the default clock)
+
+        Returns:
+            Number of notifications
+        """
+        if now is None:
+            now = get_clock().time()
+        if channel is not None:
+            ring = self._rings.get(channel)
+            return ring.count_window(seconds, now) if ring else 0
+        return sum(ring.count_window(seconds, now) for ring in self._rings.values())
@@ -0,0 +1,204 @@
+"""
+On-disk model format for the notification ML components.
+
+This module defines a small, versioned binary format for the spam network
+weights: a fixed 64-byte header followed by the raw little-endian float32
+tensors. Files are opened with ``mmap`` so that pre-forked workers share a
+single physical copy of the weights through the page cache, and the payload
+is verified against a SHA-256 digest stored in the header.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.model_store")
+
+# File magic and current format version
+MODEL_MAGIC = b"LNSPAMW\x00"
+MODEL_FORMAT_VERSION = 1
+
+# Supported payload dtypes
+DTYPE_FLOAT32 = 1
+
+# magic, version, dtype, input_size, hidden_size, output_size, payload bytes, sha256
+_HEADER = struct.Struct("<8sHHIIIQ32s")
+HEADER_SIZE = _HEADER.size
+
+# Order in which tensors are laid out after the header
+TENSOR_ORDER = ("w1", "b1", "w2", "b2")
+
+
+class ModelFormatError(ValueError):
+    """Raised when a model file is malformed, unsupported or corrupted."""
+
+
+def _tensor_shapes(
+    input_size: int, hidden_size: int, output_size: int
+) -> Dict[str, Tuple[int, ...]]:
+    """Return the shape of every tensor for the given layer sizes."""
+    return {
+        "w1": (input_size, hidden_size),
+        "b1": (hidden_size,),
+        "w2": (hidden_size, output_size),
+        "b2": (output_size,),
+    }
+
+
+@dataclass
+class MappedWeights:
+    """Weights backed by a read-only memory map of a model file."""
+
+    path: str
+    version: int
+    input_size: int
+    hidden_size: int
+    output_size: int
+    checksum: str
+    tensors: Dict[str, np.ndarray]
+    _mmap: Optional[mmap.mmap] = None
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.tensors[name]
+
+
+def save_weights(path: str, weights: Dict[str, Any]) -> str:
+    """
+    Write spam network weights to disk in the versioned model format.
+
+    The file is written to a temporary path and renamed into place, so
+    workers mapping the previous version never observe a partial file.
+
+    Args:
+        path: Destination file path
+        weights: Mapping with ``w1``, ``b1``, ``w2`` and ``b2`` tensors
+
+    Returns:
+        Hex SHA-256 digest of the written payload
+    """
+    tensors = {
+        name: np.ascontiguousarray(np.asarray(weights[name]), dtype="<f4")
+        for name in TENSOR_ORDER
+    }
+    input_size, hidden_size = tensors["w1"].shape
+    output_size = tensors["w2"].shape[1]
+
+    expected = _tensor_shapes(input_size, hidden_size, output_size)
+    for name in TENSOR_ORDER:
+        if tensors[name].shape != expected[name]:
+            raise ModelFormatError(
+                f"Tensor {name} has shape {tensors[name].shape}, "
+                f"expected {expected[name]}"
+            )
+
+    payload = b"".join(tensors[name].tobytes() for name in TENSOR_ORDER)
+    digest = hashlib.sha256(payload).digest()
+    header = _HEADER.pack(
+        MODEL_MAGIC,
+        MODEL_FORMAT_VERSION,
+        DTYPE_FLOAT32,
+        input_size,
+        hidden_size,
+        output_size,
+        len(payload),
+        digest,
+    )
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    logger.info(f"Saved spam model weights to {path}")
+    return digest.hex()
+
+
+def load_weights(path: str, verify: bool = True) -> MappedWeights:
+    """
+    Memory-map a model file and expose its tensors as read-only arrays.
+
+    The returned arrays are views into a shared read-only mapping, so no
+    copy of the weights is made in the calling process.
+
+    Args:
+        path: Path to the model file
+        verify: Whether to check the payload against the stored digest
+
+    Returns:
+        The mapped weights
+
+    Raises:
+        ModelFormatError: If the file is malformed, of an unsupported
+            version, or fails checksum verification
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER_SIZE:
+            raise ModelFormatError(f"Model file {path} is too small")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (
+        magic,
+        version,
+        dtype_code,
+        input_size,
+        hidden_size,
+        output_size,
+        payload_size,
+        digest,
+    ) = _HEADER.unpack_from(mapped, 0)
+
+    if magic != MODEL_MAGIC:
+        raise ModelFormatError(f"{path} is not a spam model file")
+    if version != MODEL_FORMAT_VERSION:
+        raise ModelFormatError(f"Unsupported model format version: {version}")
+    if dtype_code != DTYPE_FLOAT32:
+        raise ModelFormatError(f"Unsupported model dtype code: {dtype_code}")
+
+    shapes = _tensor_shapes(input_size, hidden_size, output_size)
+    expected_size = sum(int(np.prod(shape)) for shape in shapes.values()) * 4
+    if payload_size != expected_size or size != HEADER_SIZE + payload_size:
+        raise ModelFormatError(f"Model file {path} has an unexpected size")
+
+    if verify:
+        view = memoryview(mapped)[HEADER_SIZE:]
+        try:
+            actual = hashlib.sha256(view).digest()
+        finally:
+            view.release()
+        if actual != digest:
+            raise ModelFormatError(f"Checksum mismatch for model file {path}")
+
+    tensors = {}
+    offset = HEADER_SIZE
+    for name in TENSOR_ORDER:
+        count = int(np.prod(shapes[name]))
+        tensors[name] = np.frombuffer(
+            mapped, dtype="<f4", count=count, offset=offset
+        ).reshape(shapes[name])
+        offset += count * 4
+
+    logger.info(
+        f"Mapped spam model weights from {path} "
+        f"(v{version}, {input_size}x{hidden_size}x{output_size})"
+    )
+    return MappedWeights(
+        path=path,
+        version=version,
+        input_size=input_size,
+        hidden_size=hidden_size,
+        output_size=output_size,
+        checksum=digest.hex(),
+        tensors=tensors,
+        _mmap=mapped,
+    )
@@ -0,0 +1,290 @@
+"""
+MinHash-LSH near-duplicate index for campaign-level spam detection.
+
+Coordinated spam campaigns vary a word or two per message, so exact content
+matching misses them. This module keeps a streaming MinHash-LSH index over
+recent notification bodies, groups near-duplicates into clusters, and lets
+the spam filter boost or short-circuit messages that belong to a cluster
+whose volume crosses a threshold within the time window.
+"""
+
+import hashlib
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .clock import get_clock
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.near_duplicate")
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Largest prime below 2**32, used for the universal hash permutations
+_PRIME = np.uint64(4294967291)
+
+
+def _token_hash(token: str) -> int:
+    """Stable 32-bit hash of a token (independent of PYTHONHASHSEED)."""
+    return int.from_bytes(
+        hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little"
+    )
+
+
+class MinHasher:
+    """Computes MinHash signatures over the word sets of texts."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        """
+        Initialize the hasher.
+
+        Args:
+            num_perm: Number of hash permutations (signature length)
+            seed: Seed for the permutation coefficients, shared by all
+                processes so signatures are comparable across workers
+        """
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, 2**32 - 5, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 2**32 - 5, size=num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text: The text to hash
+
+        Returns:
+            uint32 array of length ``num_perm``
+        """
+        words = set(_TOKEN_PATTERN.findall(text.lower()))
+        if not words:
+            return np.full(self.num_perm, 2**32 - 1, dtype=np.uint32)
+
+        hashes = np.array([_token_hash(word) for word in words], dtype=np.uint64)
+        permuted = (hashes[:, np.newaxis] * self._a + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two MinHash signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+@dataclass
+class ClusterMatch:
+    """Result of observing a message in the near-duplicate index."""
+
+    cluster_id: int
+    size: int
+    is_campaign: bool
+    cached_verdict: Optional[Tuple[bool, float]] = None
+
+
+class _Cluster:
+    """Live members and cached verdict of a near-duplicate cluster."""
+
+    __slots__ = ("size", "verdict")
+
+    def __init__(self):
+        self.size = 0
+        self.verdict: Optional[Tuple[bool, float]] = None
+
+
+class NearDuplicateIndex:
+    """
+    Streaming MinHash-LSH index over recent notification contents.
+
+    Signatures are split into bands of ``num_perm // bands`` rows; messages
+    sharing any band are candidates and are confirmed by their estimated
+    Jaccard similarity. Entries older than ``window_seconds`` are expired
+    lazily, and the index never holds more than ``max_entries`` messages.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        similarity_threshold: float = 0.7,
+        window_seconds: float = 3600.0,
+        volume_threshold: int = 50,
+        score_boost: float = 0.3,
+        max_entries: int = 100000,
+    ):
+        """
+        Initialize the near-duplicate index.
+
+        Args:
+            num_perm: MinHash signature length
+            bands: Number of LSH bands the signature is split into
+            similarity_threshold: Minimum estimated Jaccard similarity for
+                two messages to be near-duplicates
+            window_seconds: How long messages stay in the index
+            volume_threshold: Cluster size at which a campaign is flagged
+            score_boost: Spam score added for members of a campaign
+            max_entries: Upper bound on indexed messages
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.similarity_threshold = similarity_threshold
+        self.window_seconds = window_seconds
+        self.volume_threshold = volume_threshold
+        self.score_boost = score_boost
+        self.max_entries = max_entries
+
+        self._buckets: Dict[Tuple[int, bytes], Set[int]] = {}
+        # entry id -> (signature, cluster id)
+        self._entries: Dict[int, Tuple[np.ndarray, int]] = {}
+        self._order: Deque[Tuple[float, int]] = deque()
+        self._clusters: Dict[int, _Cluster] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, content: Any) -> np.ndarray:
+        """
+        Compute the MinHash signature of a content's title and body.
+
+        Args:
+            content: Object with ``title`` and ``body`` attributes
+
+        Returns:
+            The MinHash signature
+        """
+        return self.hasher.signature(f"{content.title} {content.body}")
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _remove(self, entry_id: int) -> None:
+        signature, cluster_id = self._entries.pop(entry_id)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+        cluster = self._clusters[cluster_id]
+        cluster.size -= 1
+        if cluster.size <= 0:
+            del self._clusters[cluster_id]
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Drop entries that fell out of the time window or over capacity.
+
+        Args:
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            Number of entries removed
+        """
+        now = get_clock().time() if now is None else now
+        cutoff = now - self.window_seconds
+        removed = 0
+        while self._order and (
+            self._order[0][0] < cutoff or len(self._order) > self.max_entries
+        ):
+            _, entry_id = self._order.popleft()
+            self._remove(entry_id)
+            removed += 1
+        return removed
+
+    def find_cluster(self, signature: np.ndarray) -> Optional[int]:
+        """
+        Find the cluster of the most similar indexed near-duplicate.
+
+        Args:
+            signature: The MinHash signature to look up
+
+        Returns:
+            Cluster id, or None if no near-duplicate is indexed
+        """
+        best_cluster = None
+        best_similarity = self.similarity_threshold
+        seen = set()
+        for key in self._band_keys(signature):
+            for entry_id in self._buckets.get(key, ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                candidate, cluster_id = self._entries[entry_id]
+                similarity = estimate_similarity(signature, candidate)
+                if similarity >= best_similarity:
+                    best_similarity = similarity
+                    best_cluster = cluster_id
+                    if similarity == 1.0:
+                        return best_cluster
+        return best_cluster
+
+    def observe(self, content: Any, now: Optional[float] = None) -> ClusterMatch:
+        """
+        Index a message and report the cluster it joined.
+
+        Args:
+            content: Object with ``title`` and ``body`` attributes
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            The cluster match for the message
+        """
+        now = get_clock().time() if now is None else now
+        self.expire(now)
+
+        signature = self.signature(content)
+        cluster_id = self.find_cluster(signature)
+        if cluster_id is None:
+            cluster_id = self._next_id
+            self._clusters[cluster_id] = _Cluster()
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (signature, cluster_id)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(entry_id)
+        self._order.append((now, entry_id))
+
+        cluster = self._clusters[cluster_id]
+        cluster.size += 1
+        is_campaign = cluster.size >= self.volume_threshold
+        if is_campaign and cluster.size == self.volume_threshold:
+            logger.warning(
+                f"Near-duplicate cluster {cluster_id} reached {cluster.size} "
+                f"messages within {self.window_seconds:.0f}s"
+            )
+
+        return ClusterMatch(
+            cluster_id=cluster_id,
+            size=cluster.size,
+            is_campaign=is_campaign,
+            cached_verdict=cluster.verdict if is_campaign else None,
+        )
+
+    def record_verdict(self, cluster_id: int, is_spam: bool, score: float) -> None:
+        """
+        Cache a verdict for a campaign cluster.
+
+        Later members of the cluster reuse it instead of being scored.
+
+        Args:
+            cluster_id: The cluster to update
+            is_spam: The spam verdict
+            score: The spam score
+        """
+        cluster = self._clusters.get(cluster_id)
+        if cluster is not None and cluster.size >= self.volume_threshold:
+            cluster.verdict = (is_spam, score)
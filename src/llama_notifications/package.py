@@ -24,34 +24,11 @@ from datetime import datetime, timedelta
 from enum import Enum, auto
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-# Simulated imports for MLX and security components
-try:
-    import mlx.core as mx
-
-    MLX_AVAILABLE = True
-except ImportError:
-    MLX_AVAILABLE = False
-
-    # Create a minimal simulation of MLX for environments without it
-    class MXSimulation:
-        def __init__(self):
-            pass
-
-        def array(self, data):
-            return data
-
-        def random(self):
-            class Random:
-                def normal(self, shape):
-                    import numpy as np
-
-                    return np.random.normal(size=shape)
-
-            return Random()
-
-    class mx:
-        core = MXSimulation()
+import numpy as np
 
+from .backend import MLX_AVAILABLE, get_backend
+from .clock import Clock, get_clock
+from .dnd import DndSchedule, is_slot_set, local_slot
 
 # Configure logging
 logging.basicConfig(
@@ -111,16 +88,23 @@ class UserPreferences:
     language: str = "en"
     timezone: str = "UTC"
 
-    def is_dnd_active(self, channel: ChannelType) -> bool:
+    _dnd_schedule: DndSchedule = field(
+        default_factory=DndSchedule, init=False, repr=False, compare=False
+    )
+
+    @property
+    def dnd_masks(self) -> Dict[ChannelType, int]:
+        """DND slot bitmasks by channel, following edits of the ranges."""
+        return self._dnd_schedule.masks(self.do_not_disturb)
+
+    def is_dnd_active(self, channel: ChannelType, now: Optional[float] = None) -> bool:
         """Check if Do Not Disturb is currently active for a channel."""
-        if channel not in self.do_not_disturb:
+        mask = self.dnd_masks.get(channel)
+        if not mask:
             return False
-
-        now = datetime.now().hour
-        for start, end in self.do_not_disturb.get(channel, []):
-            if start <= now < end:
-                return True
-        return False
+        if now is None:
+            now = get_clock().time()
+        return is_slot_set(mask, local_slot(self.timezone, now))
 
 
 @dataclass
@@ -187,7 +171,7 @@ class NotificationResult:
 
     notification_id: str
     status: DeliveryStatus
-    timestamp: datetime = field(default_factory=datetime.now)
+    timestamp: datetime = field(default_factory=lambda: get_clock().now())
     channel: Optional[ChannelType] = None
     error: Optional[str] = None
     receipt_id: Optional[str] = None
@@ -276,19 +260,11 @@ class EncryptionService:
             Encrypted data
         """
         if MLX_AVAILABLE:
-            # Convert data and key to numerical values for MLX processing
-            data_bytes = data.encode("utf-8")
-            key_bytes = key.encode("utf-8")
-
-            # Create MLX arrays
-            data_array = mx.array([b for b in data_bytes])
-            key_array = mx.array([b for b in key_bytes])
-
-            # Simulate MLX operation (in real implementation, would use actual MLX crypto ops)
-            processed = data_array  # Placeholder for actual MLX operations
+            # Simulate accelerated operation (in real implementation, would use actual MLX crypto ops)
+            processed = data.encode("utf-8")  # Placeholder for actual MLX operations
 
             # Convert back to string
-            return base64.b64encode(bytes(processed)).decode("utf-8")
+            return base64.b64encode(processed).decode("utf-8")
         else:
             # Fallback if MLX not available - simple simulation
             return base64.b64encode(
@@ -434,6 +410,7 @@ class SpamFilter:
         """Initialize the spam filter."""
         self.model_loaded = False
         self.weights = None
+        self.backend = get_backend()
 
     def _load_model(self):
         """Load the spam filtering model."""
@@ -442,14 +419,7 @@ class SpamFilter:
 
         # In a real implementation, this would load actual model weights
         # This is a simulation for illustration
-        if MLX_AVAILABLE:
-            # Simulate loading MLX model weights
-            self.weights = mx.random.normal((100, 10))
-        else:
-            # Fallback to simple simulation
-            import numpy as np
-
-            self.weights = np.random.normal(size=(100, 10))
+        self.weights = self.backend.to_numpy(self.backend.normal((100, 10)))
 
         self.model_loaded = True
         logger.info("Loaded spam filtering model")
@@ -514,20 +484,10 @@ class SpamFilter:
 
         # Classify using simulated model
         # In a real implementation, this would use actual model inference
-        if MLX_AVAILABLE:
-            # Simulated MLX computation
-            features_mx = mx.array(features)
-            # Simple matrix multiplication as an illustrative placeholder
-            # Real implementation would use a proper neural net architecture
-            result = features_mx @ self.weights
-            score = float(sum(result) / len(result))
-        else:
-            # Simple fallback simulation
-            import numpy as np
-
-            features_np = np.array(features)
-            result = features_np @ self.weights
-            score = float(sum(result) / len(result))
+        # Simple matrix multiplication as an illustrative placeholder
+        # Real implementation would use a proper neural net architecture
+        result = np.array(features) @ self.weights
+        score = float(sum(result) / len(result))
 
         # Normalize score between 0 and 1
         normalized_score = 1.0 / (1.0 + np.exp(-score))  # Sigmoid
@@ -554,20 +514,11 @@ class PriorityRouter:
 
         # In a real implementation, this would load actual model weights
         # This is a simulation for illustration
-        if MLX_AVAILABLE:
-            # Simulate model weights
-            self.features = {
-                "time_sensitivity": mx.array([0.8, 0.5, 0.2]),
-                "user_engagement": mx.array([0.6, 0.4, 0.3]),
-                "content_importance": mx.array([0.9, 0.7, 0.5]),
-            }
-        else:
-            # Fallback
-            self.features = {
-                "time_sensitivity": [0.8, 0.5, 0.2],
-                "user_engagement": [0.6, 0.4, 0.3],
-                "content_importance": [0.9, 0.7, 0.5],
-            }
+        self.features = {
+            "time_sensitivity": [0.8, 0.5, 0.2],
+            "user_engagement": [0.6, 0.4, 0.3],
+            "content_importance": [0.9, 0.7, 0.5],
+        }
 
         self.model_loaded = True
         logger.info("Loaded priority routing model")
@@ -617,6 +568,15 @@ class PriorityRouter:
 class ContextAnalyzer:
     """Analyzes context for optimal notification delivery."""
 
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        Initialize the context analyzer.
+
+        Args:
+            clock: Clock for DND checks (defaults to the default clock)
+        """
+        self.clock = clock or get_clock()
+
     def get_optimal_channels(
         self, request: NotificationRequest, available_channels: List[ChannelType]
     ) -> List[Tuple[ChannelType, float]]:
@@ -644,6 +604,9 @@ class ContextAnalyzer:
                     scores.append((channel, 0.5))
             return sorted(scores, key=lambda x: x[1], reverse=True)
 
+        # Read the clock once so every channel sees the same time
+        now = self.clock.time()
+
         # Consider user preferences
         for channel in available_channels:
             base_score = 0.5
@@ -653,7 +616,7 @@ class ContextAnalyzer:
                 base_score += 0.3
 
             # Reduce score if in DND
-            if user_prefs.is_dnd_active(channel):
+            if user_prefs.is_dnd_active(channel, now):
                 base_score -= 0.8
 
             # Channel-specific adjustments
@@ -740,14 +703,17 @@ class ChannelProvider(ABC):
 class PushNotificationProvider(ChannelProvider):
     """Provider for push notifications."""
 
-    def __init__(self, service_name: str = "firebase"):
+    def __init__(self, service_name: str = "firebase", clock: Optional[Clock] = None):
         """
         Initialize the push notification provider.
 
         Args:
             service_name: The push service to use (e.g., 'firebase', 'apns')
+            clock: Clock for send and status timestamps (defaults to the
+                default clock)
         """
         self.service_name = service_name
+        self.clock = clock or get_clock()
         self.credential_manager = CredentialManager()
         self.initialized = False
         self.sent_notifications = {}  # For simulation tracking
@@ -797,13 +763,14 @@ class PushNotificationProvider(ChannelProvider):
 
         success = random.random() > 0.05  # 95% success rate
 
+        sent_at = self.clock.now()
         if success:
             status = DeliveryStatus.SENT
             error = None
             receipt_id = str(uuid.uuid4())
             self.sent_notifications[request.notification_id] = {
                 "status": status,
-                "timestamp": datetime.now(),
+                "timestamp": sent_at,
                 "receipt_id": receipt_id,
             }
         else:
@@ -814,6 +781,7 @@ class PushNotificationProvider(ChannelProvider):
         return NotificationResult(
             notification_id=request.notification_id,
             status=status,
+            timestamp=sent_at,
             channel=ChannelType.PUSH,
             error=error,
             receipt_id=receipt_id,
@@ -830,7 +798,7 @@ class PushNotificationProvider(ChannelProvider):
         notification = self.sent_notifications[notification_id]
 
         # Simulate status progression over time
-        elapsed = (datetime.now() - notification["timestamp"]).total_seconds()
+        elapsed = (self.clock.now() - notification["timestamp"]).total_seconds()
 
         if elapsed > 30:  # After 30 seconds, consider it delivered
             return DeliveryStatus.DELIVERED
@@ -841,14 +809,17 @@ class PushNotificationProvider(ChannelProvider):
 class SMSProvider(ChannelProvider):
     """Provider for SMS notifications."""
 
-    def __init__(self, service_name: str = "twilio"):
+    def __init__(self, service_name: str = "twilio", clock: Optional[Clock] = None):
         """
         Initialize the SMS provider.
 
         Args:
             service_name: The SMS service to use (e.g., 'twilio')
+            clock: Clock for send and status timestamps (defaults to the
+                default clock)
         """
         self.service_name = service_name
+        self.clock = clock or get_clock()
         self.credential_manager = CredentialManager()
         self.initialized = False
         self.sent_notifications = {}  # For simulation tracking
@@ -899,13 +870,14 @@ class SMSProvider(ChannelProvider):
 
         success = random.random() > 0.02  # 98% success rate
 
+        sent_at = self.clock.now()
         if success:
             status = DeliveryStatus.SENT
             error = None
             receipt_id = str(uuid.uuid4())
             self.sent_notifications[request.notification_id] = {
                 "status": status,
-                "timestamp": datetime.now(),
+                "timestamp": sent_at,
                 "receipt_id": receipt_id,
             }
         else:
@@ -916,6 +888,7 @@ class SMSProvider(ChannelProvider):
         return NotificationResult(
             notification_id=request.notification_id,
             status=status,
+            timestamp=sent_at,
             channel=ChannelType.SMS,
             error=error,
             receipt_id=receipt_id,
@@ -932,7 +905,7 @@ class SMSProvider(ChannelProvider):
         notification = self.sent_notifications[notification_id]
 
         # Simulate status progression over time
-        elapsed = (datetime.now() - notification["timestamp"]).total_seconds()
+        elapsed = (self.clock.now() - notification["timestamp"]).total_seconds()
 
         if elapsed > 20:  # After 20 seconds, consider it delivered
             return DeliveryStatus.DELIVERED
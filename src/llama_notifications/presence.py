@@ -0,0 +1,252 @@
+"""
+Device presence from heartbeat events.
+
+Devices report heartbeats (app state, network, battery) at a high rate. The
+presence store ingests them in bulk and keeps the last value per device, so
+the context analyzer can fill in device activity and environment without
+the caller looking them up per request.
+
+Reads are lock-free: each user maps to an immutable tuple of their devices'
+last heartbeats, most recent first, and writers replace the whole tuple in
+one dict assignment. A reader therefore sees either the old or the new
+devices of a user, never a partial update. Writers serialize on a lock and
+collapse a batch to one update per user. Heartbeats older than
+``stale_after`` no longer count as presence, and devices not heard from for
+``retain_seconds`` are dropped by :meth:`PresenceStore.purge`.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from .clock import get_clock
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.presence")
+
+
+class Heartbeat(NamedTuple):
+    """State reported by a device; None fields keep the device's last value."""
+
+    user_id: str
+    device_id: str
+    timestamp: float
+    app_state: Optional[str] = None
+    network_type: Optional[str] = None
+    network_quality: Optional[float] = None
+    battery_level: Optional[float] = None
+    low_power_mode: Optional[bool] = None
+
+
+# Fields carried over from the previous heartbeat when a new one omits them
+_STATE_FIELDS = Heartbeat._fields[3:]
+
+
+def _merge(previous: Heartbeat, heartbeat: Heartbeat) -> Heartbeat:
+    """Fill the fields a heartbeat omits from the device's previous one."""
+    missing = {
+        name: getattr(previous, name)
+        for name in _STATE_FIELDS
+        if getattr(heartbeat, name) is None
+    }
+    return heartbeat._replace(**missing) if missing else heartbeat
+
+
+class PresenceStore:
+    """Last heartbeat per device, readable without locks."""
+
+    def __init__(
+        self,
+        stale_after: float = 300.0,
+        retain_seconds: float = 86400.0,
+        max_users: int = 1_000_000,
+    ):
+        """
+        Initialize an empty store.
+
+        Args:
+            stale_after: Seconds after which a heartbeat no longer shows
+                the device as active
+            retain_seconds: Seconds after which a silent device is dropped
+                by ``purge``
+            max_users: Maximum number of users kept; the users heard from
+                least recently are dropped beyond it
+        """
+        if stale_after <= 0:
+            raise ValueError("stale_after must be positive")
+        if retain_seconds < stale_after:
+            raise ValueError("retain_seconds must be at least stale_after")
+        if max_users < 1:
+            raise ValueError("max_users must be at least 1")
+
+        self.stale_after = stale_after
+        self.retain_seconds = retain_seconds
+        self.max_users = max_users
+        # User id -> devices' last heartbeats, most recent first; users are
+        # kept in the order they were last heard from
+        self._users: "OrderedDict[str, Tuple[Heartbeat, ...]]" = OrderedDict()
+        self._ingested = 0
+        self._out_of_order = 0
+        self._evictions = 0
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def ingest(self, heartbeats: Iterable[Heartbeat]) -> int:
+        """
+        Ingest a batch of heartbeats.
+
+        Heartbeats may arrive out of order; one older than the device's
+        current value is ignored.
+
+        Args:
+            heartbeats: The heartbeats, in any order
+
+        Returns:
+            Number of heartbeats applied
+        """
+        applied = 0
+        with self._write_lock:
+            updates: Dict[str, Dict[str, Heartbeat]] = {}
+            for heartbeat in heartbeats:
+                devices = updates.get(heartbeat.user_id)
+                if devices is None:
+                    devices = updates[heartbeat.user_id] = {
+                        device.device_id: device
+                        for device in self._users.get(heartbeat.user_id, ())
+                    }
+                previous = devices.get(heartbeat.device_id)
+                if previous is not None:
+                    if heartbeat.timestamp < previous.timestamp:
+                        self._out_of_order += 1
+                        continue
+                    heartbeat = _merge(previous, heartbeat)
+                devices[heartbeat.device_id] = heartbeat
+                applied += 1
+
+            # One atomic assignment per user publishes the new devices
+            for user_id, devices in updates.items():
+                self._users[user_id] = tuple(
+                    sorted(devices.values(), key=lambda d: d.timestamp, reverse=True)
+                )
+                self._users.move_to_end(user_id)
+            self._ingested += applied
+
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._evictions += 1
+
+        logger.debug(f"Ingested {applied} heartbeats for {len(updates)} users")
+        return applied
+
+    def record(self, heartbeat: Heartbeat) -> bool:
+        """
+        Ingest a single heartbeat.
+
+        Args:
+            heartbeat: The heartbeat
+
+        Returns:
+            True if it was applied
+        """
+        return self.ingest((heartbeat,)) == 1
+
+    def devices(self, user_id: str) -> Tuple[Heartbeat, ...]:
+        """
+        Get the last heartbeat of each of a user's devices.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Heartbeats, most recent first (empty if the user is unknown)
+        """
+        return self._users.get(user_id, ())
+
+    def latest(self, user_id: str) -> Optional[Heartbeat]:
+        """
+        Get the most recent heartbeat of any of a user's devices.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            The heartbeat, or None if the user is unknown
+        """
+        devices = self._users.get(user_id)
+        return devices[0] if devices else None
+
+    def is_fresh(self, heartbeat: Heartbeat, now: Optional[float] = None) -> bool:
+        """
+        Check whether a heartbeat still shows its device as active.
+
+        Args:
+            heartbeat: The heartbeat
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            True if it is at most ``stale_after`` seconds old
+        """
+        if now is None:
+            now = get_clock().time()
+        return now - heartbeat.timestamp <= self.stale_after
+
+    def is_active(self, user_id: str, now: Optional[float] = None) -> bool:
+        """
+        Check whether any of a user's devices sent a fresh heartbeat.
+
+        Args:
+            user_id: User identifier
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            True if the user has an active device
+        """
+        heartbeat = self.latest(user_id)
+        return heartbeat is not None and self.is_fresh(heartbeat, now)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """
+        Drop devices not heard from for ``retain_seconds``.
+
+        Args:
+            now: Current timestamp (defaults to the default clock)
+
+        Returns:
+            Number of devices dropped
+        """
+        if now is None:
+            now = get_clock().time()
+        cutoff = now - self.retain_seconds
+
+        dropped = 0
+        with self._write_lock:
+            for user_id, devices in list(self._users.items()):
+                if devices[-1].timestamp >= cutoff:
+                    continue
+                kept = tuple(device for device in devices if device.timestamp >= cutoff)
+                dropped += len(devices) - len(kept)
+                if kept:
+                    self._users[user_id] = kept
+                else:
+                    del self._users[user_id]
+
+        logger.debug(f"Purged {dropped} silent devices")
+        return dropped
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get presence statistics.
+
+        Returns:
+            Dictionary with the number of users, heartbeats applied,
+            out-of-order heartbeats ignored and users evicted at capacity
+        """
+        return {
+            "users": len(self._users),
+            "ingested": self._ingested,
+            "out_of_order": self._out_of_order,
+            "evictions": self._evictions,
+        }
@@ -6,36 +6,23 @@ based on content analysis, user engagement patterns, and contextual factors.
 It uses MLX acceleration when available for improved performance.
 """
 
+import functools
 import logging
+import math
 import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
-# Try to import MLX
-try:
-    import mlx.core as mx
-    import mlx.nn as nn
-
-    MLX_AVAILABLE = True
-except ImportError:
-    MLX_AVAILABLE = False
-    # Create minimal simulation for environments without MLX
-    import numpy as np
-
-    class MXSimulation:
-        def array(self, data):
-            return np.array(data)
-
-        def random(self):
-            class Random:
-                def normal(self, shape):
-                    return np.random.normal(size=shape)
-
-            return Random()
-
-    class mx:
-        core = MXSimulation()
+import numpy as np
 
+from .backend import Backend, get_backend
+from .batch import RequestBatch
+from .clock import Clock, get_clock
+from .engagement import EngagementStore
+from .quantiles import P2Quantile
 
 # Configure logging
 logger = logging.getLogger("llama_notifications.ml.priority")
@@ -50,6 +37,127 @@ class Priority(Enum):
     URGENT = 3
 
 
+# Fixed order of priority features in dense rows and weight vectors
+FEATURE_NAMES = (
+    "explicit_priority",
+    "urgency_keywords",
+    "time_references",
+    "time_sensitivity",
+    "user_engagement",
+    "content_importance",
+    "user_relationship",
+    "is_time_critical",
+    "is_security_related",
+    "is_safety_related",
+    "business_impact",
+    "app_active",
+    "recent_interaction",
+)
+
+# Scores above each threshold map to NORMAL, HIGH and URGENT respectively
+PRIORITY_THRESHOLDS = (0.3, 0.6, 0.8)
+
+_TIME_CRITICAL = FEATURE_NAMES.index("is_time_critical")
+
+_PRIORITIES = tuple(Priority)
+
+# Context-provided features and their values when a request doesn't set them
+_CONTEXT_DEFAULTS = {
+    "time_sensitivity": 0.5,
+    "user_engagement": 0.5,
+    "content_importance": 0.5,
+    "user_relationship": 0.5,
+    "is_time_critical": 0.0,
+    "is_security_related": 0.0,
+    "is_safety_related": 0.0,
+    "business_impact": 0.5,
+    "app_active": 0.0,
+    "recent_interaction": 0.0,
+}
+
+# Time references: relative ("in 5 minutes"), clock times ("today at 9",
+# "by 14:30") and bare "due" phrases. "due " only consumes itself so that a
+# following "in 5 minutes" or "by 14:30" is still matched.
+TIME_REFERENCE_PATTERN = re.compile(
+    r"in (?P<amount>\d+) (?P<unit>minutes?|mins?|hours?|hrs?|seconds?|secs?)"
+    r"|today at (?P<today_hour>\d+)(?::(?P<today_minute>\d{2}))?"
+    r"|by (?P<by_hour>\d+):(?P<by_minute>\d+)"
+    r"|(?P<due>due )(?=in|at|by)"
+)
+
+_TIME_UNITS = {"m": "minutes", "h": "hours", "s": "seconds"}
+
+
+def explicit_priority(priority_from_context: Any) -> float:
+    """
+    Normalize an explicit priority from request context to [0, 1].
+
+    Args:
+        priority_from_context: Number, priority name or None
+
+    Returns:
+        The normalized priority (0.0 if unset, NaN if unrecognized)
+    """
+    if priority_from_context is None:
+        return 0.0
+    if isinstance(priority_from_context, (int, float)):
+        return min(float(priority_from_context), 1.0)
+    if (
+        isinstance(priority_from_context, str)
+        and priority_from_context.upper() in Priority.__members__
+    ):
+        priority_enum = Priority[priority_from_context.upper()]
+        return float(priority_enum.value) / 3.0  # Normalize to [0,1]
+    return math.nan
+
+
+class TextFeatures(NamedTuple):
+    """Priority features derived only from a notification's title and body."""
+
+    urgency_keywords: float
+    time_references: float
+    # Deadlines relative to the time of evaluation, see resolve_deadline
+    deadline_specs: Tuple[tuple, ...]
+
+
+def resolve_deadline(
+    specs: Sequence[tuple], now: Optional[datetime] = None
+) -> Optional[datetime]:
+    """
+    Resolve parsed time references into the earliest absolute deadline.
+
+    Args:
+        specs: Deadline specs from ``ContextFeatureExtractor.parse_time_references``
+        now: Reference time (defaults to the default clock)
+
+    Returns:
+        The earliest deadline, or None if there are no specs (amounts too
+        large to represent as a date set no deadline)
+    """
+    if not specs:
+        return None
+    if now is None:
+        now = get_clock().now()
+
+    deadline = None
+    for kind, first, second in specs:
+        if kind == "in":
+            try:
+                candidate = now + timedelta(**{first: second})
+            except (OverflowError, ValueError):
+                # "in 99999999999 minutes" is beyond any representable date
+                continue
+        else:
+            candidate = now.replace(hour=first, minute=second, second=0, microsecond=0)
+            # "by 9:00" after 9:00 refers to the next day
+            if kind == "by" and candidate < now:
+                candidate += timedelta(days=1)
+
+        if deadline is None or candidate < deadline:
+            deadline = candidate
+    return deadline
+
+
 class NotificationRequest:
     """Simplified request class for the priority router."""
 
@@ -81,8 +189,26 @@ class NotificationRequest:
 class ContextFeatureExtractor:
     """Extracts features from notification context for priority routing."""
 
-    def __init__(self):
-        """Initialize the feature extractor."""
+    def __init__(
+        self,
+        cache_size: int = 4096,
+        engagement_store: Optional[EngagementStore] = None,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        Initialize the feature extractor.
+
+        Args:
+            cache_size: Number of distinct titles and bodies whose text
+                features are kept in an LRU cache (0 disables caching)
+            engagement_store: Optional receipt statistics that provide
+                ``user_engagement`` for requests whose context doesn't set it
+            clock: Clock that relative deadlines are resolved against
+                (defaults to the default clock)
+        """
+        self.engagement_store = engagement_store
+        self.clock = clock or get_clock()
+
         # Keywords indicating urgency
         self.urgency_keywords = {
             "urgent",
@@ -103,119 +229,357 @@ class ContextFeatureExtractor:
             "expires",
         }
 
-        # Patterns for time references
-        self.time_patterns = [
-            re.compile(r"in \d+ (minute|minutes|min|mins)"),
-            re.compile(r"in \d+ (hour|hours|hr|hrs)"),
-            re.compile(r"in \d+ (second|seconds|sec|secs)"),
-            re.compile(r"today at \d+"),
-            re.compile(r"by \d+:\d+"),
-            re.compile(r"due (in|at|by)"),
-        ]
+        # Single alternation over all kinds of time references
+        self.time_pattern = TIME_REFERENCE_PATTERN
 
-    def extract_features(self, request: NotificationRequest) -> Dict[str, float]:
+        # Repeated templates share their text work; context features are
+        # cheap and recombined per request
+        self.text_features = functools.lru_cache(maxsize=cache_size)(
+            self._compute_text_features
+        )
+
+    def parse_time_references(self, text: str) -> Tuple[int, Tuple[tuple, ...]]:
         """
-        Extract priority-related features from the notification request.
+        Find time references in lowercased text in a single regex pass.
 
         Args:
-            request: The notification request
+            text: Lowercased notification text
 
         Returns:
-            Dictionary of feature names to values
+            Tuple of (number of distinct kinds of time reference, deadline
+            specs to resolve against a reference time with
+            ``resolve_deadline``)
+        """
+        kinds = set()
+        specs = []
+        for match in self.time_pattern.finditer(text):
+            if match.group("due"):
+                kinds.add("due")
+            elif match.group("amount"):
+                unit = _TIME_UNITS[match.group("unit")[0]]
+                kinds.add(unit)
+                specs.append(("in", unit, int(match.group("amount"))))
+            elif match.group("today_hour"):
+                kinds.add("today")
+                hour = int(match.group("today_hour"))
+                minute = int(match.group("today_minute") or 0)
+                if hour <= 23 and minute <= 59:
+                    specs.append(("today", hour, minute))
+            else:
+                kinds.add("by")
+                hour = int(match.group("by_hour"))
+                minute = int(match.group("by_minute"))
+                if hour <= 23 and minute <= 59:
+                    specs.append(("by", hour, minute))
+
+        return len(kinds), tuple(specs)
+
+    def scan_time_references(
+        self, text: str, now: Optional[datetime] = None
+    ) -> Tuple[int, Optional[datetime]]:
         """
-        features = {}
+        Find time references in lowercased text and resolve the deadline.
 
-        # Extract text features
-        title = request.content_title.lower()
-        body = request.content_body.lower()
-        combined_text = f"{title} {body}"
+        Args:
+            text: Lowercased notification text
+            now: Reference time for relative deadlines (defaults to the
+                extractor's clock, read only if a deadline is found)
 
-        # Check for explicit priority in context
-        priority_from_context = request.context.get("priority", None)
-        if priority_from_context is not None:
-            if isinstance(priority_from_context, (int, float)):
-                features["explicit_priority"] = min(float(priority_from_context), 1.0)
-            elif (
-                isinstance(priority_from_context, str)
-                and priority_from_context.upper() in Priority.__members__
-            ):
-                priority_enum = Priority[priority_from_context.upper()]
-                features["explicit_priority"] = (
-                    float(priority_enum.value) / 3.0
-                )  # Normalize to [0,1]
-        else:
-            features["explicit_priority"] = 0.0
+        Returns:
+            Tuple of (number of distinct kinds of time reference, earliest
+            absolute deadline or None)
+        """
+        kinds, specs = self.parse_time_references(text)
+        if specs and now is None:
+            now = self.clock.now()
+        return kinds, resolve_deadline(specs, now)
+
+    def _compute_text_features(self, title: str, body: str) -> TextFeatures:
+        """Compute the text-derived features of a title and body."""
+        combined_text = f"{title.lower()} {body.lower()}"
 
         # Urgency keywords
         urgency_count = sum(
             1 for word in combined_text.split() if word in self.urgency_keywords
         )
-        features["urgency_keywords"] = min(urgency_count / 5.0, 1.0)  # Cap at 1.0
 
         # Time sensitivity
-        time_references = sum(
-            1
-            for pattern in self.time_patterns
-            if pattern.search(combined_text) is not None
+        time_references, deadline_specs = self.parse_time_references(combined_text)
+
+        return TextFeatures(
+            urgency_keywords=min(urgency_count / 5.0, 1.0),  # Cap at 1.0
+            time_references=min(time_references / 3.0, 1.0),  # Cap at 1.0
+            deadline_specs=deadline_specs,
         )
-        features["time_references"] = min(time_references / 3.0, 1.0)  # Cap at 1.0
+
+    def extract_features_into(
+        self,
+        request: NotificationRequest,
+        row,
+        now: Optional[datetime] = None,
+    ) -> Optional[datetime]:
+        """
+        Write priority-related features into a preallocated row.
+
+        Values are written in ``FEATURE_NAMES`` order. A feature that can't
+        be determined is written as NaN and carries no weight in scoring.
+
+        Args:
+            request: The notification request
+            row: Writable float array of length ``len(FEATURE_NAMES)``
+            now: Reference time for relative deadlines (defaults to the
+                extractor's clock, read only if a deadline is found)
+
+        Returns:
+            The earliest deadline mentioned in the text, or None
+        """
+        context = request.context
+
+        # Text features are cached per title and body
+        text_features = self.text_features(request.content_title, request.content_body)
+
+        # Check for explicit priority in context
+        row[0] = explicit_priority(context.get("priority", None))
+
+        row[1] = text_features.urgency_keywords
+        row[2] = text_features.time_references
 
         # Context-provided features
-        features["time_sensitivity"] = float(
-            request.context.get("time_sensitivity", 0.5)
-        )
-        features["user_engagement"] = float(request.context.get("user_engagement", 0.5))
-        features["content_importance"] = float(
-            request.context.get("content_importance", 0.5)
-        )
-        features["user_relationship"] = float(
-            request.context.get("user_relationship", 0.5)
-        )
+        row[3] = float(context.get("time_sensitivity", 0.5))
+        engagement = context.get("user_engagement")
+        if engagement is None:
+            engagement = (
+                self.engagement_store.engagement(request.recipient_id)
+                if self.engagement_store is not None
+                else 0.5
+            )
+        row[4] = float(engagement)
+        row[5] = float(context.get("content_importance", 0.5))
+        row[6] = float(context.get("user_relationship", 0.5))
 
         # Check for explicit time criticality
-        features["is_time_critical"] = (
-            1.0 if request.context.get("is_time_critical", False) else 0.0
-        )
+        row[7] = 1.0 if context.get("is_time_critical", False) else 0.0
 
         # Security and safety related
-        features["is_security_related"] = (
-            1.0 if request.context.get("is_security_related", False) else 0.0
-        )
-        features["is_safety_related"] = (
-            1.0 if request.context.get("is_safety_related", False) else 0.0
-        )
+        row[8] = 1.0 if context.get("is_security_related", False) else 0.0
+        row[9] = 1.0 if context.get("is_safety_related", False) else 0.0
 
         # Business impact
-        features["business_impact"] = float(request.context.get("business_impact", 0.5))
+        row[10] = float(context.get("business_impact", 0.5))
 
         # App usage context
-        features["app_active"] = (
-            1.0 if request.context.get("app_active", False) else 0.0
-        )
-        features["recent_interaction"] = (
-            1.0 if request.context.get("recent_interaction", False) else 0.0
-        )
+        row[11] = 1.0 if context.get("app_active", False) else 0.0
+        row[12] = 1.0 if context.get("recent_interaction", False) else 0.0
+
+        # Validate and normalize all features to [0,1] (NaN is kept)
+        np.clip(row, 0.0, 1.0, out=row)
+
+        if text_features.deadline_specs and now is None:
+            now = self.clock.now()
+        return resolve_deadline(text_features.deadline_specs, now)
+
+    def extract_features(self, request: NotificationRequest) -> Dict[str, float]:
+        """
+        Extract priority-related features from the notification request.
+
+        Args:
+            request: The notification request
+
+        Returns:
+            Dictionary of feature names to values
+        """
+        row = np.empty(len(FEATURE_NAMES))
+        self.extract_features_into(request, row)
+        return {
+            name: float(value)
+            for name, value in zip(FEATURE_NAMES, row)
+            if not math.isnan(value)
+        }
+
+
+@dataclass
+class PriorityResult:
+    """Outcome of scoring one notification, with the inputs to explain it."""
+
+    priority: Priority
+    score: float
+    # Features in FEATURE_NAMES order (NaN where missing)
+    features: np.ndarray
+    weights: np.ndarray
+    # Earliest deadline parsed from the text
+    deadline: Optional[datetime] = None
+
+    @property
+    def feature_values(self) -> Dict[str, float]:
+        """Feature values by name, without missing features."""
+        return {
+            name: float(value)
+            for name, value in zip(FEATURE_NAMES, self.features)
+            if not math.isnan(value)
+        }
+
+    @property
+    def contributions(self) -> Dict[str, float]:
+        """Share of the weighted feature sum contributed by each feature."""
+        present = ~np.isnan(self.features)
+        contributions = np.where(present, self.features * self.weights, 0.0)
+        total = contributions.sum()
+
+        # Normalize contributions
+        if total > 0:
+            contributions = contributions / total
+
+        return {
+            name: float(contribution)
+            for name, contribution, is_present in zip(
+                FEATURE_NAMES, contributions, present
+            )
+            if is_present
+        }
+
+    def top_factors(self, count: int = 3) -> List[Tuple[str, float]]:
+        """
+        Get the features contributing most to the score.
+
+        Args:
+            count: Number of factors to return
+
+        Returns:
+            List of (feature name, contribution) tuples, largest first
+        """
+        return sorted(self.contributions.items(), key=lambda x: x[1], reverse=True)[
+            :count
+        ]
 
-        # Validate and normalize all features to [0,1]
-        for key in features:
-            features[key] = max(0.0, min(features[key], 1.0))
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert to the explanation dictionary of ``explain_priority``.
+
+        Returns:
+            Dictionary with priority, score, deadline, features,
+            contributions and top factors
+        """
+        contributions = self.contributions
+        return {
+            "priority": self.priority.name,
+            "score": self.score,
+            "deadline": self.deadline,
+            "features": self.feature_values,
+            "contributions": contributions,
+            "top_factors": sorted(
+                contributions.items(), key=lambda x: x[1], reverse=True
+            )[:3],
+        }
 
-        return features
+
+class ThresholdCalibrator:
+    """
+    Recalibrates priority thresholds to target lane proportions.
+
+    Live scores feed three streaming P² quantile estimators, one per
+    threshold. Every ``window`` scores the estimates become the new
+    thresholds and estimation restarts, so the thresholds follow shifts in
+    the traffic mix with constant memory.
+    """
+
+    def __init__(
+        self,
+        target_shares: Sequence[float] = (0.5, 0.3, 0.15, 0.05),
+        window: int = 10000,
+    ):
+        """
+        Initialize the calibrator.
+
+        Args:
+            target_shares: Desired share of LOW, NORMAL, HIGH and URGENT
+                notifications among scored (not time-critical) notifications
+            window: Number of scores per recalibration
+        """
+        if len(target_shares) != len(Priority) or any(
+            share <= 0 for share in target_shares
+        ):
+            raise ValueError("target_shares needs a positive share per priority")
+
+        total = float(sum(target_shares))
+        cumulative = np.cumsum(target_shares)[:-1] / total
+        self.target_shares = tuple(share / total for share in target_shares)
+        self.quantiles = tuple(float(q) for q in cumulative)
+        self.window = window
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._estimators = [P2Quantile(q) for q in self.quantiles]
+        self.count = 0
+
+    def observe(self, score: float) -> Optional[Tuple[float, ...]]:
+        """
+        Add a live priority score.
+
+        Args:
+            score: The weighted priority score
+
+        Returns:
+            New thresholds when the observation completes a window,
+            otherwise None
+        """
+        with self._lock:
+            for estimator in self._estimators:
+                estimator.add(score)
+            self.count += 1
+            if self.count < self.window:
+                return None
+
+            thresholds = self.estimate()
+            self._reset()
+            return thresholds
+
+    def estimate(self) -> Tuple[float, ...]:
+        """
+        Get the thresholds estimated from the current window.
+
+        Returns:
+            Non-decreasing NORMAL, HIGH and URGENT thresholds
+        """
+        values = [estimator.value() for estimator in self._estimators]
+        return tuple(float(value) for value in np.maximum.accumulate(values))
 
 
 class PriorityRouter:
     """MLX-accelerated priority routing for notifications."""
 
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        backend: Optional[Backend] = None,
+        calibrator: Optional[ThresholdCalibrator] = None,
+        engagement_store: Optional[EngagementStore] = None,
+        clock: Optional[Clock] = None,
+    ):
         """
         Initialize the priority router.
 
         Args:
             model_path: Optional path to model weights file
+            backend: Numeric backend (defaults to the process-wide backend)
+            calibrator: Optional calibrator that periodically moves the
+                priority thresholds to keep lane proportions on target
+            engagement_store: Optional receipt statistics that provide
+                ``user_engagement`` for requests whose context doesn't set it
+            clock: Clock that deadlines in the text are resolved against
+                (defaults to the default clock)
         """
-        self.feature_extractor = ContextFeatureExtractor()
+        self.clock = clock or get_clock()
+        self.feature_extractor = ContextFeatureExtractor(
+            engagement_store=engagement_store, clock=self.clock
+        )
         self.model_loaded = False
         self.feature_weights = None
+        self.weight_vector = None
+        self.thresholds = np.array(PRIORITY_THRESHOLDS)
+        self.calibrator = calibrator
+        self.backend = backend or get_backend()
+        self._weighted_mean = self.backend.weighted_mean
 
         # Initialize or load model
         self._initialize_model(model_path)
@@ -242,75 +606,94 @@ class PriorityRouter:
 
         # In a real implementation, these weights would be learned from data
         # These are simplified default weights for demonstration
-        if MLX_AVAILABLE:
-            # Create MLX arrays for weights
-            self.feature_weights = {
-                "explicit_priority": mx.array([2.0]),
-                "urgency_keywords": mx.array([1.2]),
-                "time_references": mx.array([1.0]),
-                "time_sensitivity": mx.array([1.5]),
-                "user_engagement": mx.array([0.8]),
-                "content_importance": mx.array([1.0]),
-                "user_relationship": mx.array([0.7]),
-                "is_time_critical": mx.array([2.5]),
-                "is_security_related": mx.array([2.0]),
-                "is_safety_related": mx.array([2.0]),
-                "business_impact": mx.array([1.0]),
-                "app_active": mx.array([0.3]),
-                "recent_interaction": mx.array([0.5]),
-            }
-        else:
-            # Use regular Python dictionary with float values
-            self.feature_weights = {
-                "explicit_priority": 2.0,
-                "urgency_keywords": 1.2,
-                "time_references": 1.0,
-                "time_sensitivity": 1.5,
-                "user_engagement": 0.8,
-                "content_importance": 1.0,
-                "user_relationship": 0.7,
-                "is_time_critical": 2.5,
-                "is_security_related": 2.0,
-                "is_safety_related": 2.0,
-                "business_impact": 1.0,
-                "app_active": 0.3,
-                "recent_interaction": 0.5,
-            }
+        self.feature_weights = {
+            "explicit_priority": 2.0,
+            "urgency_keywords": 1.2,
+            "time_references": 1.0,
+            "time_sensitivity": 1.5,
+            "user_engagement": 0.8,
+            "content_importance": 1.0,
+            "user_relationship": 0.7,
+            "is_time_critical": 2.5,
+            "is_security_related": 2.0,
+            "is_safety_related": 2.0,
+            "business_impact": 1.0,
+            "app_active": 0.3,
+            "recent_interaction": 0.5,
+        }
+        self.weight_vector = np.array(
+            [self.feature_weights.get(name, 0.0) for name in FEATURE_NAMES]
+        )
 
         self.model_loaded = True
 
-    def _calculate_weighted_score(self, features: Dict[str, float]) -> float:
+    def _score_row(self, row) -> float:
         """
-        Calculate weighted priority score.
+        Calculate the weighted priority score of a feature row.
 
         Args:
-            features: Extracted features
+            row: Features in ``FEATURE_NAMES`` order
 
         Returns:
             Priority score
         """
-        score = 0.0
-        total_weight = 0.0
+        weights = self.weight_vector
+        present = ~np.isnan(row)
+        if not present.all():
+            row, weights = row[present], weights[present]
 
-        for feature_name, feature_value in features.items():
-            if feature_name in self.feature_weights:
-                weight = self.feature_weights[feature_name]
+        # Normalized by total weight (0.5, i.e. NORMAL, if no weights)
+        return float(self._weighted_mean(row, weights))
 
-                if MLX_AVAILABLE and isinstance(weight, type(mx.array([0]))):
-                    weight_value = float(weight[0])
-                else:
-                    weight_value = float(weight)
+    def _score_matrix(self, features: np.ndarray) -> np.ndarray:
+        """
+        Calculate weighted priority scores of a (batch, features) matrix.
 
-                score += feature_value * weight_value
-                total_weight += weight_value
+        Args:
+            features: Feature rows in ``FEATURE_NAMES`` order
 
-        # Normalize by total weight
-        if total_weight > 0:
-            normalized_score = score / total_weight
-        else:
-            normalized_score = 0.5  # Default to NORMAL if no weights
+        Returns:
+            Array of priority scores
+        """
+        present = ~np.isnan(features)
+        if present.all():
+            total = self.weight_vector.sum()
+            if total <= 0:
+                return np.full(len(features), 0.5)
+            return features @ self.weight_vector / total
+
+        weights = np.where(present, self.weight_vector, 0.0)
+        totals = weights.sum(axis=1)
+        weighted = np.einsum("ij,ij->i", np.where(present, features, 0.0), weights)
+        return np.where(totals > 0, weighted / np.where(totals > 0, totals, 1.0), 0.5)
+
+    def set_thresholds(self, thresholds: Sequence[float]) -> None:
+        """
+        Replace the NORMAL, HIGH and URGENT score thresholds.
+
+        The thresholds are swapped as one array, so concurrent calls see
+        either the old or the new set.
+
+        Args:
+            thresholds: Three non-decreasing score thresholds
+        """
+        thresholds = np.array(thresholds, dtype=np.float64)
+        if thresholds.shape != (len(Priority) - 1,) or np.any(np.diff(thresholds) < 0):
+            raise ValueError(f"Invalid priority thresholds: {thresholds}")
+
+        self.thresholds = thresholds
+        logger.info(f"Priority thresholds set to {thresholds.round(4).tolist()}")
+
+    def _observe_scores(self, scores: Sequence[float]) -> None:
+        """Feed scores to the calibrator and apply recalibrated thresholds."""
+        for score in scores:
+            thresholds = self.calibrator.observe(score)
+            if thresholds is not None:
+                self.set_thresholds(thresholds)
 
-        return normalized_score
+    def _bucket(self, score: float) -> Priority:
+        """Map a score to its priority level."""
+        return _PRIORITIES[int(np.digitize(score, self.thresholds, right=True))]
 
     def calculate_priority(self, request: NotificationRequest) -> Priority:
         """
@@ -333,77 +716,153 @@ class PriorityRouter:
             )
             return Priority.URGENT
 
-        # Extract features
-        features = self.feature_extractor.extract_features(request)
-
-        # Calculate score
-        score = self._calculate_weighted_score(features)
-
-        # Determine priority based on score
-        if score > 0.8:
-            priority = Priority.URGENT
-        elif score > 0.6:
-            priority = Priority.HIGH
-        elif score > 0.3:
-            priority = Priority.NORMAL
-        else:
-            priority = Priority.LOW
+        result = self.evaluate_priority(request)
 
         logger.debug(
-            f"Calculated priority for {request.notification_id}: {priority.name} (score: {score:.4f})"
+            f"Calculated priority for {request.notification_id}: {result.priority.name} (score: {result.score:.4f})"
         )
-        return priority
+        return result.priority
 
-    def explain_priority(self, request: NotificationRequest) -> Dict[str, Any]:
+    def calculate_priority_batch(
+        self, requests: Sequence[NotificationRequest]
+    ) -> List[Priority]:
         """
-        Explain the priority calculation.
+        Calculate priorities for several notifications at once.
+
+        Features are extracted into one dense matrix, so scoring is a single
+        matrix-vector product.
 
         Args:
-            request: The notification request
+            requests: The notification requests
 
         Returns:
-            Dictionary with explanation of priority calculation
+            List of priority levels in input order
         """
         # Make sure model is initialized
         if not self.model_loaded:
             self._initialize_model()
 
-        # Extract features
-        features = self.feature_extractor.extract_features(request)
+        if not requests:
+            return []
 
-        # Calculate priority
-        priority = self.calculate_priority(request)
+        features = np.empty((len(requests), len(FEATURE_NAMES)))
+        for row, request in zip(features, requests):
+            self.feature_extractor.extract_features_into(request, row)
 
-        # Calculate feature contributions
-        contributions = {}
-        total_contribution = 0.0
+        return self._prioritize_matrix(features)
 
-        for feature_name, feature_value in features.items():
-            if feature_name in self.feature_weights:
-                weight = self.feature_weights[feature_name]
+    def calculate_priority_columns(self, batch: RequestBatch) -> List[Priority]:
+        """
+        Calculate priorities for a columnar request batch.
 
-                if MLX_AVAILABLE and isinstance(weight, type(mx.array([0]))):
-                    weight_value = float(weight[0])
-                else:
-                    weight_value = float(weight)
+        Context features are taken from the batch's NumPy columns; only the
+        (cached) text features and explicit priorities are read per request.
 
-                contribution = feature_value * weight_value
-                contributions[feature_name] = contribution
-                total_contribution += contribution
+        Args:
+            batch: The request batch
 
-        # Normalize contributions
-        if total_contribution > 0:
-            for feature_name in contributions:
-                contributions[feature_name] /= total_contribution
-
-        # Create explanation
-        explanation = {
-            "priority": priority.name,
-            "features": features,
-            "contributions": contributions,
-            "top_factors": sorted(
-                contributions.items(), key=lambda x: x[1], reverse=True
-            )[:3],
-        }
+        Returns:
+            List of priority levels in batch order
+        """
+        # Make sure model is initialized
+        if not self.model_loaded:
+            self._initialize_model()
+
+        if not len(batch):
+            return []
+
+        features = np.empty((len(batch), len(FEATURE_NAMES)))
+        text_features = self.feature_extractor.text_features
+        for i, (title, body, context) in enumerate(
+            zip(batch.titles, batch.bodies, batch.contexts)
+        ):
+            text = text_features(title, body)
+            features[i, 0] = explicit_priority(context.get("priority", None))
+            features[i, 1] = text.urgency_keywords
+            features[i, 2] = text.time_references
+
+        defaults = dict(_CONTEXT_DEFAULTS)
+        engagement_store = self.feature_extractor.engagement_store
+        if engagement_store is not None:
+            defaults["user_engagement"] = engagement_store.engagement_many(
+                batch.user_ids or [None] * len(batch)
+            )
+        for name, default in defaults.items():
+            features[:, FEATURE_NAMES.index(name)] = batch.column(name, default)
+        np.clip(features, 0.0, 1.0, out=features)
+
+        return self._prioritize_matrix(features)
+
+    def _prioritize_matrix(self, features: np.ndarray) -> List[Priority]:
+        """Score and bucket a (batch, features) matrix."""
+        scores = self._score_matrix(features)
+        buckets = np.digitize(scores, self.thresholds, right=True)
+
+        # Time-critical notifications are always URGENT
+        time_critical = features[:, _TIME_CRITICAL] == 1.0
+        buckets[time_critical] = Priority.URGENT.value
 
-        return explanation
+        if self.calibrator is not None:
+            self._observe_scores(scores[~time_critical])
+
+        return [_PRIORITIES[bucket] for bucket in buckets]
+
+    def evaluate_priority(
+        self, request: NotificationRequest, now: Optional[datetime] = None
+    ) -> PriorityResult:
+        """
+        Score a notification and keep what is needed to explain the score.
+
+        Features are extracted once; the result carries the score, the
+        priority bucket and the per-feature contributions.
+
+        Args:
+            request: The notification request
+            now: Reference time for deadlines in the text (defaults to the
+                router's clock)
+
+        Returns:
+            The priority result
+        """
+        result = self._evaluate(request, now)
+        if self.calibrator is not None and not result.features[_TIME_CRITICAL]:
+            self._observe_scores((result.score,))
+        return result
+
+    def _evaluate(
+        self, request: NotificationRequest, now: Optional[datetime] = None
+    ) -> PriorityResult:
+        """Evaluate a request without feeding the calibrator."""
+        # Make sure model is initialized
+        if not self.model_loaded:
+            self._initialize_model()
+
+        row = np.empty(len(FEATURE_NAMES))
+        deadline = self.feature_extractor.extract_features_into(request, row, now)
+
+        score = self._score_row(row)
+        if row[_TIME_CRITICAL] == 1.0:
+            priority = Priority.URGENT
+        else:
+            priority = self._bucket(score)
+
+        return PriorityResult(
+            priority=priority,
+            score=score,
+            features=row,
+            weights=self.weight_vector,
+            deadline=deadline,
+        )
+
+    def explain_priority(self, request: NotificationRequest) -> Dict[str, Any]:
+        """
+        Explain the priority calculation.
+
+        Args:
+            request: The notification request
+
+        Returns:
+            Dictionary with explanation of priority calculation
+        """
+        # Audited samples are not fed to the threshold calibrator again
+        return self._evaluate(request).to_dict()
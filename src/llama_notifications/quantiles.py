@@ -0,0 +1,102 @@
+"""
+Streaming quantile estimation.
+
+Implements the P² algorithm (Jain and Chlamtac, 1985), which tracks a single
+quantile of a stream with five markers: constant memory and constant time
+per observation, without storing the observations.
+"""
+
+import math
+from typing import List
+
+
+class P2Quantile:
+    """P² estimator of one quantile of a stream."""
+
+    def __init__(self, quantile: float):
+        """
+        Initialize the estimator.
+
+        Args:
+            quantile: The quantile to track, in (0, 1)
+        """
+        if not 0 < quantile < 1:
+            raise ValueError("quantile must be in (0, 1)")
+
+        self.quantile = quantile
+        self.count = 0
+        # Marker heights, actual positions and desired positions
+        self._heights: List[float] = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0.0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4.0]
+        self._increments = [0.0, quantile / 2, quantile, (1 + quantile) / 2, 1.0]
+
+    def add(self, value: float) -> None:
+        """
+        Add an observation.
+
+        Args:
+            value: The observed value
+        """
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        # Find the cell of the value, extending the extremes if needed
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        positions = self._positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (
+                offset <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i]
+                    )
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        """Piecewise-parabolic prediction of marker ``i`` moved by ``step``."""
+        q, n = self._heights, self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> float:
+        """
+        Get the current quantile estimate.
+
+        Returns:
+            The estimate (NaN before the first observation)
+        """
+        if self.count == 0:
+            return math.nan
+        if self.count <= 5:
+            # Exact quantile of the few observations seen so far
+            index = min(int(self.quantile * self.count), self.count - 1)
+            return self._heights[index]
+        return self._heights[2]
@@ -0,0 +1,270 @@
+"""
+Per-sender reputation store for the spam filter.
+
+This module keeps exponentially decayed per-sender counters (message volume,
+spam verdicts and a short-horizon burst rate) in a fixed-capacity open
+addressing hash table backed by NumPy arrays. Memory stays bounded no matter
+how many senders are seen: when a probe window is full, the least active
+sender in it is evicted.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.reputation")
+
+
+@dataclass
+class SenderReputation:
+    """Decayed reputation statistics of one sender."""
+
+    volume: float
+    spam: float
+    burst: float
+    spam_rate: float
+    reputation: float
+
+
+def _sender_hash(sender_id: str) -> int:
+    """Stable non-zero 64-bit hash of a sender id."""
+    value = int.from_bytes(
+        hashlib.blake2b(sender_id.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+    return value or 1
+
+
+class SenderReputationStore:
+    """
+    Bounded hash table of exponentially decayed sender counters.
+
+    Each slot stores a 64-bit sender hash and float32 counters, so an entry
+    costs 28 bytes. Counters are decayed lazily when a slot is touched.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 65536,
+        half_life_seconds: float = 86400.0,
+        burst_half_life_seconds: float = 300.0,
+        trust_threshold: float = 0.95,
+        min_volume: float = 20.0,
+        max_burst: float = 100.0,
+        prior_volume: float = 2.0,
+        prior_spam: float = 1.0,
+        sender_keys: Sequence[str] = ("sender_id", "tenant_id"),
+        max_probe: int = 8,
+    ):
+        """
+        Initialize the reputation store.
+
+        Args:
+            capacity: Number of slots (rounded up to a power of two)
+            half_life_seconds: Half-life of the volume and spam counters
+            burst_half_life_seconds: Half-life of the burst counter
+            trust_threshold: Minimum reputation for a sender to be trusted
+            min_volume: Minimum decayed volume before a sender can be trusted
+            max_burst: Burst counter above which trust is withheld
+            prior_volume: Pseudo-count of messages for smoothing spam rates
+            prior_spam: Pseudo-count of spam for smoothing spam rates
+            sender_keys: Metadata keys holding the sender id, in order
+            max_probe: Maximum number of slots probed per lookup
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+
+        self.capacity = size
+        self.half_life_seconds = half_life_seconds
+        self.burst_half_life_seconds = burst_half_life_seconds
+        self.trust_threshold = trust_threshold
+        self.min_volume = min_volume
+        self.max_burst = max_burst
+        self.prior_volume = prior_volume
+        self.prior_spam = prior_spam
+        self.sender_keys = tuple(sender_keys)
+        self.max_probe = max_probe
+
+        self._mask = size - 1
+        self._keys = np.zeros(size, dtype=np.uint64)
+        self._volume = np.zeros(size, dtype=np.float32)
+        self._spam = np.zeros(size, dtype=np.float32)
+        self._burst = np.zeros(size, dtype=np.float32)
+        self._updated = np.zeros(size, dtype=np.float64)
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._keys))
+
+    def sender_id(self, content: Any) -> Optional[str]:
+        """
+        Get the sender id of a notification content from its metadata.
+
+        Args:
+            content: Object with a ``metadata`` dict
+
+        Returns:
+            The sender id, or None if the content carries none
+        """
+        metadata = content.metadata
+        for key in self.sender_keys:
+            value = metadata.get(key)
+            if value:
+                return str(value)
+        return None
+
+    def _find(self, key: int, create: bool, now: float) -> Optional[int]:
+        """Locate (or claim) the slot for a sender hash."""
+        start = key & self._mask
+        victim = None
+        victim_volume = math.inf
+        for i in range(self.max_probe):
+            slot = (start + i) & self._mask
+            slot_key = int(self._keys[slot])
+            if slot_key == key:
+                return slot
+            if slot_key == 0:
+                if not create:
+                    return None
+                self._claim(slot, key, now)
+                return slot
+            volume = self._decayed(slot, now)[0]
+            if volume < victim_volume:
+                victim, victim_volume = slot, volume
+
+        if not create:
+            return None
+
+        # Probe window is full: evict its least active sender
+        self.evictions += 1
+        self._claim(victim, key, now)
+        return victim
+
+    def _claim(self, slot: int, key: int, now: float) -> None:
+        self._keys[slot] = key
+        self._volume[slot] = 0.0
+        self._spam[slot] = 0.0
+        self._burst[slot] = 0.0
+        self._updated[slot] = now
+
+    def _decayed(self, slot: int, now: float):
+        """Return the (volume, spam, burst) counters of a slot decayed to now."""
+        elapsed = max(now - float(self._updated[slot]), 0.0)
+        decay = math.pow(0.5, elapsed / self.half_life_seconds)
+        burst_decay = math.pow(0.5, elapsed / self.burst_half_life_seconds)
+        return (
+            float(self._volume[slot]) * decay,
+            float(self._spam[slot]) * decay,
+            float(self._burst[slot]) * burst_decay,
+        )
+
+    def record(
+        self, sender_id: str, is_spam: bool, now: Optional[float] = None
+    ) -> None:
+        """
+        Record a spam verdict for a sender.
+
+        Args:
+            sender_id: The sender or tenant id
+            is_spam: Whether the message was judged spam
+            now: Current timestamp (defaults to time.time())
+        """
+        now = time.time() if now is None else now
+        slot = self._find(_sender_hash(sender_id), True, now)
+        volume, spam, burst = self._decayed(slot, now)
+
+        self._volume[slot] = volume + 1.0
+        self._spam[slot] = spam + (1.0 if is_spam else 0.0)
+        self._burst[slot] = burst + 1.0
+        self._updated[slot] = now
+
+    def record_volume(self, sender_id: str, now: Optional[float] = None) -> None:
+        """
+        Record a message without a verdict, e.g. one accepted on trust.
+
+        The message counts toward the sender's volume and burst rate, but
+        the smoothed spam rate is kept, so unjudged messages can't build
+        trust while a burst still withdraws it.
+
+        Args:
+            sender_id: The sender or tenant id
+            now: Current timestamp (defaults to time.time())
+        """
+        now = time.time() if now is None else now
+        slot = self._find(_sender_hash(sender_id), True, now)
+        volume, spam, burst = self._decayed(slot, now)
+
+        spam_rate = (spam + self.prior_spam) / (volume + self.prior_volume)
+        self._volume[slot] = volume + 1.0
+        self._spam[slot] = (
+            spam_rate * (volume + 1.0 + self.prior_volume) - self.prior_spam
+        )
+        self._burst[slot] = burst + 1.0
+        self._updated[slot] = now
+
+    def get(
+        self, sender_id: str, now: Optional[float] = None
+    ) -> Optional[SenderReputation]:
+        """
+        Get the decayed reputation of a sender.
+
+        Args:
+            sender_id: The sender or tenant id
+            now: Current timestamp (defaults to time.time())
+
+        Returns:
+            The sender's reputation, or None if the sender is unknown
+        """
+        now = time.time() if now is None else now
+        slot = self._find(_sender_hash(sender_id), False, now)
+        if slot is None:
+            return None
+
+        volume, spam, burst = self._decayed(slot, now)
+        spam_rate = (spam + self.prior_spam) / (volume + self.prior_volume)
+        return SenderReputation(
+            volume=volume,
+            spam=spam,
+            burst=burst,
+            spam_rate=spam_rate,
+            reputation=1.0 - spam_rate,
+        )
+
+    def is_trusted(self, sender_id: str, now: Optional[float] = None) -> bool:
+        """
+        Check whether a sender is trusted enough to skip model inference.
+
+        A sender is trusted with enough history, a reputation above the
+        threshold and no current volume spike.
+
+        Args:
+            sender_id: The sender or tenant id
+            now: Current timestamp (defaults to time.time())
+
+        Returns:
+            True if the sender is trusted, False otherwise
+        """
+        return self.trusts(self.get(sender_id, now))
+
+    def trusts(self, reputation: Optional[SenderReputation]) -> bool:
+        """
+        Check whether already fetched reputation statistics are trusted.
+
+        Args:
+            reputation: Result of :meth:`get`
+
+        Returns:
+            True if the statistics meet the trust criteria, False otherwise
+        """
+        return (
+            reputation is not None
+            and reputation.volume >= self.min_volume
+            and reputation.reputation >= self.trust_threshold
+            and reputation.burst <= self.max_burst
+        )
@@ -0,0 +1,283 @@
+"""
+Dispatch queue for outgoing notifications.
+
+Notifications wait in one lane per priority level. Higher lanes are always
+drained first; within a lane, notifications with the earliest deadline leave
+first, so time-bound notifications are sent before their deadline passes
+even when the queue is backed up. Notifications without a deadline follow in
+arrival order.
+
+Deferred notifications (e.g. waiting for Do Not Disturb to end) wait in a
+separate heap ordered by release time and join their lane once the queue's
+clock reaches it. Deferring a batch spreads the release times over a jitter
+window, so notifications deferred to the same instant don't all wake at once.
+With an engagement store, low-priority notifications can also be deferred to
+the recipient's most engaging hour.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import random
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .clock import Clock, get_clock
+from .engagement import EngagementStore
+from .priority import Priority, PriorityResult
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.scheduler")
+
+# Lanes from highest to lowest priority
+_LANE_ORDER = sorted(Priority, key=lambda priority: priority.value, reverse=True)
+
+
+class DispatchQueue:
+    """Priority lanes ordered earliest-deadline-first."""
+
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        seed: Optional[int] = None,
+        engagement_store: Optional[EngagementStore] = None,
+    ):
+        """
+        Initialize an empty queue.
+
+        Args:
+            clock: Clock that releases deferred notifications (defaults to
+                the default clock)
+            seed: Seed of the random generator for deferral jitter
+            engagement_store: Optional receipt statistics that enable
+                ``push_at_best_hour``
+        """
+        self.clock = clock or get_clock()
+        self.engagement_store = engagement_store
+        self._lanes: Dict[Priority, List[Tuple[float, int, Any]]] = {
+            priority: [] for priority in _LANE_ORDER
+        }
+        # Deferred notifications: (release time, sequence, item, priority, deadline)
+        self._deferred: List[Tuple[float, int, Any, Priority, float]] = []
+        self._sequence = itertools.count()
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values()) + len(self._deferred)
+
+    def push(
+        self,
+        item: Any,
+        priority: Priority,
+        deadline: Optional[datetime] = None,
+    ) -> None:
+        """
+        Add a notification to its priority lane.
+
+        Args:
+            item: The notification to dispatch
+            priority: Priority lane
+            deadline: Time by which the notification should be sent
+        """
+        key = deadline.timestamp() if deadline is not None else math.inf
+        heapq.heappush(self._lanes[priority], (key, next(self._sequence), item))
+
+    def defer(
+        self,
+        item: Any,
+        priority: Priority,
+        release_at: float,
+        deadline: Optional[datetime] = None,
+    ) -> None:
+        """
+        Hold a notification back until a time.
+
+        Args:
+            item: The notification to dispatch
+            priority: Priority lane it joins when released
+            release_at: Timestamp at which it becomes ready
+            deadline: Time by which the notification should be sent
+        """
+        key = deadline.timestamp() if deadline is not None else math.inf
+        heapq.heappush(
+            self._deferred, (release_at, next(self._sequence), item, priority, key)
+        )
+
+    def defer_many(
+        self,
+        entries: Iterable[
+            Union[
+                Tuple[Any, Priority, float],
+                Tuple[Any, Priority, float, Optional[datetime]],
+            ]
+        ],
+        jitter_seconds: float = 0.0,
+    ) -> None:
+        """
+        Hold a batch of notifications back, spreading their release times.
+
+        Entries deferred to the same time are released over the following
+        ``jitter_seconds``: entry k of n at a random point of the k-th of n
+        equal sub-intervals, so wake-ups are spread evenly and never move
+        earlier than requested. Jitter never moves a release past the
+        entry's deadline.
+
+        Args:
+            entries: (item, priority, release time) tuples, optionally
+                followed by the deadline as in ``defer``
+            jitter_seconds: Length of the window release times are spread over
+        """
+        groups: Dict[float, List[Tuple[Any, Priority, Optional[datetime]]]] = {}
+        for item, priority, release_at, *deadline in entries:
+            groups.setdefault(release_at, []).append(
+                (item, priority, deadline[0] if deadline else None)
+            )
+
+        for release_at, group in groups.items():
+            width = jitter_seconds / len(group)
+            for k, (item, priority, deadline) in enumerate(group):
+                offset = (k + self._random.random()) * width if width else 0.0
+                if deadline is not None:
+                    offset = min(offset, max(deadline.timestamp() - release_at, 0.0))
+                self.defer(item, priority, release_at + offset, deadline)
+
+        logger.debug(
+            f"Deferred {sum(len(group) for group in groups.values())} "
+            f"notifications to {len(groups)} release times"
+        )
+
+    def push_at_best_hour(
+        self,
+        item: Any,
+        priority: Priority,
+        user_id: str,
+        deadline: Optional[datetime] = None,
+        horizon_hours: int = 24,
+    ) -> Optional[float]:
+        """
+        Queue a notification for the recipient's most engaging hour.
+
+        HIGH and URGENT notifications, recipients without receipts and
+        queues without an engagement store are queued right away.
+
+        Args:
+            item: The notification to dispatch
+            priority: Priority lane
+            user_id: Recipient user identifier
+            deadline: Time by which the notification should be sent; it is
+                never deferred past it
+            horizon_hours: Number of hours ahead to consider
+
+        Returns:
+            The release time if the notification was deferred, else None
+        """
+        store = self.engagement_store
+        if store is None or priority.value >= Priority.HIGH.value:
+            self.push(item, priority, deadline)
+            return None
+
+        now = self.clock.time()
+        release_at = store.best_time(
+            user_id,
+            now,
+            horizon_hours,
+            deadline.timestamp() if deadline is not None else None,
+        )
+        if release_at <= now:
+            self.push(item, priority, deadline)
+            return None
+        self.defer(item, priority, release_at, deadline)
+        return release_at
+
+    def release(self, now: Optional[float] = None) -> int:
+        """
+        Move deferred notifications whose release time has come to their lanes.
+
+        Args:
+            now: Current timestamp (defaults to the queue's clock)
+
+        Returns:
+            Number of notifications released
+        """
+        if now is None:
+            now = self.clock.time()
+
+        released = 0
+        deferred = self._deferred
+        while deferred and deferred[0][0] <= now:
+            _, sequence, item, priority, key = heapq.heappop(deferred)
+            heapq.heappush(self._lanes[priority], (key, sequence, item))
+            released += 1
+        return released
+
+    def next_release_time(self) -> Optional[float]:
+        """
+        Get the time the next deferred notification becomes ready.
+
+        Returns:
+            Earliest release time, or None if nothing is deferred
+        """
+        return self._deferred[0][0] if self._deferred else None
+
+    def deferred_count(self) -> int:
+        """
+        Get the number of notifications not yet released.
+
+        Returns:
+            Number of deferred notifications
+        """
+        return len(self._deferred)
+
+    def push_result(self, item: Any, result: PriorityResult) -> None:
+        """
+        Add a notification using its priority evaluation.
+
+        Args:
+            item: The notification to dispatch
+            result: Result of ``PriorityRouter.evaluate_priority``
+        """
+        self.push(item, result.priority, result.deadline)
+
+    def pop(self) -> Any:
+        """
+        Remove the next notification to dispatch.
+
+        Deferred notifications whose release time has come are released
+        first.
+
+        Returns:
+            The most urgent notification
+
+        Raises:
+            IndexError: If no notification is ready
+        """
+        self.release()
+        for priority in _LANE_ORDER:
+            lane = self._lanes[priority]
+            if lane:
+                return heapq.heappop(lane)[2]
+        raise IndexError("pop from an empty dispatch queue")
+
+    def peek(self) -> Optional[Any]:
+        """
+        Get the next notification to dispatch without removing it.
+
+        Returns:
+            The most urgent notification, or None if no notification is ready
+        """
+        self.release()
+        for priority in _LANE_ORDER:
+            lane = self._lanes[priority]
+            if lane:
+                return lane[0][2]
+        return None
+
+    def lane_sizes(self) -> Dict[str, int]:
+        """
+        Get the number of queued notifications per priority lane.
+
+        Returns:
+            Dictionary mapping priority names to queue lengths
+        """
+        return {priority.name: len(lane) for priority, lane in self._lanes.items()}
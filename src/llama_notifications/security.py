@@ -22,6 +22,8 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, Optional, Tuple
 
+from .backend import MLX_AVAILABLE, get_backend
+
 # Try importing cryptography packages
 try:
     from cryptography.hazmat.primitives import hashes, padding, serialization
@@ -33,32 +35,6 @@ try:
 except ImportError:
     CRYPTOGRAPHY_AVAILABLE = False
 
-# Try importing MLX for accelerated crypto
-try:
-    import mlx.core as mx
-
-    MLX_AVAILABLE = True
-except ImportError:
-    MLX_AVAILABLE = False
-
-    # Create a minimal simulation of MLX
-    class MXSimulation:
-        def array(self, data):
-            return data
-
-        def random(self):
-            class Random:
-                def normal(self, shape):
-                    import numpy as np
-
-                    return np.random.normal(size=shape)
-
-            return Random()
-
-    class mx:
-        core = MXSimulation()
-
-
 # Configure logging
 logger = logging.getLogger("llama_notifications.security")
 
@@ -169,6 +145,11 @@ class EncryptionService:
         """Initialize the encryption service."""
         self.credential_manager = CredentialManager()
 
+        # The key mixing step has always been applied when MLX is installed.
+        # Tie it to MLX availability rather than to the selected backend so
+        # derived keys don't change when a different backend is chosen.
+        self._mix_key = get_backend().add_bytes if MLX_AVAILABLE else None
+
     def _generate_key(self, seed: str, length: int = 32) -> bytes:
         """
         Generate a key from a seed string.
@@ -187,17 +168,11 @@ class EncryptionService:
         # Otherwise derive key from seed
         key = hashlib.sha256(seed.encode()).digest()
 
-        # Use MLX for additional processing if available
-        if MLX_AVAILABLE:
-            # Convert to MLX array
-            key_array = mx.array([b for b in key])
-
+        # Additional accelerated processing when available
+        if self._mix_key is not None:
             # Perform some operations (simplified for illustration)
             # In a real implementation, would use proper MLX crypto primitives
-            key_array = key_array + 1  # Simple operation for illustration
-
-            # Convert back to bytes
-            key = bytes([int(b) % 256 for b in key_array])
+            key = self._mix_key(key, 1)
 
         return key[:length]
 
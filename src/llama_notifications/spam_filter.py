@@ -7,35 +7,23 @@ It leverages MLX acceleration when available for improved performance.
 """
 
 import logging
+import os
 import re
+import time
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
 
-# Try to import MLX
-try:
-    import mlx.core as mx
-    import mlx.nn as nn
+import numpy as np
 
-    MLX_AVAILABLE = True
-except ImportError:
-    MLX_AVAILABLE = False
-    # Create minimal simulation for environments without MLX
-    import numpy as np
-
-    class MXSimulation:
-        def array(self, data):
-            return np.array(data)
-
-        def random(self):
-            class Random:
-                def normal(self, shape):
-                    return np.random.normal(size=shape)
-
-            return Random()
-
-    class mx:
-        core = MXSimulation()
+from .backend import Backend, get_backend
+from .batch import RequestBatch
+from .model_store import ModelFormatError, load_weights, save_weights
+from .near_duplicate import ClusterMatch, NearDuplicateIndex
+from .reputation import SenderReputation, SenderReputationStore
 
+if TYPE_CHECKING:
+    from .spam_pool import SpamFeaturePool
 
 # Configure logging
 logger = logging.getLogger("llama_notifications.ml.spam_filter")
@@ -94,12 +82,19 @@ class SpamFeatureExtractor:
             r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
         )
 
-    def extract_features(self, content: NotificationContent) -> List[float]:
+    def extract_features(
+        self,
+        content: NotificationContent,
+        title_lower: Optional[str] = None,
+        body_lower: Optional[str] = None,
+    ) -> List[float]:
         """
         Extract features from notification content for spam detection.
 
         Args:
             content: The notification content to analyze
+            title_lower: Lowercased title, if already computed
+            body_lower: Lowercased body, if already computed
 
         Returns:
             List of numerical features for spam detection
@@ -111,8 +106,12 @@ class SpamFeatureExtractor:
         features.append(min(len(content.body) / 1000, 1.0))
 
         # Word count features
-        title_words = content.title.lower().split()
-        body_words = content.body.lower().split()
+        if title_lower is None:
+            title_lower = content.title.lower()
+        if body_lower is None:
+            body_lower = content.body.lower()
+        title_words = title_lower.split()
+        body_words = body_lower.split()
         features.append(min(len(title_words) / 20, 1.0))
         features.append(min(len(body_words) / 200, 1.0))
 
@@ -206,53 +205,103 @@ class SimpleNeuralNetwork:
     In a real system, this would use a properly trained neural network.
     """
 
-    def __init__(self, input_size: int = 32, hidden_size: int = 16):
+    def __init__(
+        self,
+        input_size: int = 32,
+        hidden_size: int = 16,
+        backend: Optional[Backend] = None,
+    ):
         """
         Initialize the neural network.
 
         Args:
             input_size: Number of input features
             hidden_size: Size of hidden layer
+            backend: Numeric backend (defaults to the process-wide backend)
         """
         self.input_size = input_size
         self.hidden_size = hidden_size
         self.output_size = 1
-
-        # Initialize weights
-        if MLX_AVAILABLE:
-            # Use MLX for weight initialization
-            rng = mx.random.normal
-            self.w1 = rng((input_size, hidden_size))
-            self.b1 = mx.zeros((hidden_size,))
-            self.w2 = rng((hidden_size, self.output_size))
-            self.b2 = mx.zeros((self.output_size,))
-        else:
-            # Use NumPy as fallback
-            self.w1 = np.random.normal(0, 0.1, (input_size, hidden_size))
-            self.b1 = np.zeros((hidden_size,))
-            self.w2 = np.random.normal(0, 0.1, (hidden_size, self.output_size))
-            self.b2 = np.zeros((self.output_size,))
+        self.backend = backend or get_backend()
+
+        # Bind kernels once so forward passes don't branch on the backend
+        self._mlp = self.backend.mlp
+        self._mlp_batch = self.backend.mlp_batch
+
+        # Initialize weights. They are held in a single tuple so that
+        # set_weights swaps all of them at once while other threads score.
+        self._params = (
+            self.backend.normal((input_size, hidden_size), 0.1),
+            self.backend.zeros((hidden_size,)),
+            self.backend.normal((hidden_size, self.output_size), 0.1),
+            self.backend.zeros((self.output_size,)),
+        )
 
         self.initialized = True
-        logger.info("Initialized simple neural network for spam detection")
+        logger.info(
+            f"Initialized simple neural network for spam detection "
+            f"({self.backend.name} backend)"
+        )
 
-    def _sigmoid(self, x):
-        """Sigmoid activation function."""
-        if MLX_AVAILABLE:
-            # Use MLX implementation
-            return 1.0 / (1.0 + mx.exp(-x))
-        else:
-            # Use NumPy implementation
-            return 1.0 / (1.0 + np.exp(-x))
-
-    def _relu(self, x):
-        """ReLU activation function."""
-        if MLX_AVAILABLE:
-            # Use MLX implementation
-            return mx.maximum(0, x)
-        else:
-            # Use NumPy implementation
-            return np.maximum(0, x)
+    @property
+    def w1(self):
+        return self._params[0]
+
+    @property
+    def b1(self):
+        return self._params[1]
+
+    @property
+    def w2(self):
+        return self._params[2]
+
+    @property
+    def b2(self):
+        return self._params[3]
+
+    def set_weights(self, weights: Any) -> None:
+        """
+        Replace the network weights.
+
+        With the NumPy backend, memory-mapped arrays are used as-is so that
+        the weights stay shared with other processes mapping the same file.
+        The swap is atomic: concurrent forward passes see either the old or
+        the new weights, never a mix.
+
+        Args:
+            weights: Mapping with ``w1``, ``b1``, ``w2`` and ``b2`` tensors
+        """
+        w1 = weights["w1"]
+        if w1.shape[0] != self.input_size:
+            raise ValueError(
+                f"Expected {self.input_size} input features, got {w1.shape[0]}"
+            )
+
+        asarray = self.backend.asarray
+        params = (
+            asarray(weights["w1"]),
+            asarray(weights["b1"]),
+            asarray(weights["w2"]),
+            asarray(weights["b2"]),
+        )
+        self.hidden_size = w1.shape[1]
+        self._params = params
+
+    def get_weights(self) -> Dict[str, np.ndarray]:
+        """
+        Get the current network weights as NumPy arrays.
+
+        Returns:
+            Mapping with ``w1``, ``b1``, ``w2`` and ``b2`` tensors
+        """
+        to_numpy = self.backend.to_numpy
+        w1, b1, w2, b2 = self._params
+        return {
+            "w1": to_numpy(w1),
+            "b1": to_numpy(b1),
+            "w2": to_numpy(w2),
+            "b2": to_numpy(b2),
+        }
 
     def forward(self, x):
         """
@@ -264,46 +313,290 @@ class SimpleNeuralNetwork:
         Returns:
             Network output (spam score)
         """
-        if MLX_AVAILABLE:
-            # Convert to MLX array if not already
-            if not isinstance(x, type(mx.array([0]))):
-                x = mx.array(x)
+        return self._mlp(x, *self._params)
+
+    def forward_batch(self, x) -> np.ndarray:
+        """
+        Forward pass for a batch of feature rows.
+
+        Args:
+            x: Input features with shape (batch, input_size)
+
+        Returns:
+            Array of spam scores with shape (batch,)
+        """
+        return self._mlp_batch(x, *self._params)
+
 
-            # Forward pass
-            hidden = self._relu(mx.matmul(x, self.w1) + self.b1)
-            output = self._sigmoid(mx.matmul(hidden, self.w2) + self.b2)
+class InferenceMode(Enum):
+    """Numeric precision used for spam network inference."""
+
+    FLOAT64 = "float64"
+    FLOAT32 = "float32"
+    INT8 = "int8"
+
+
+def _tensor_scale(x: np.ndarray) -> float:
+    """Symmetric per-tensor int8 scale for an array."""
+    max_abs = float(np.max(np.abs(x))) if x.size else 0.0
+    return max_abs / 127.0 if max_abs > 0 else 1.0
+
+
+def _quantize(x: np.ndarray, scale: float) -> np.ndarray:
+    """Quantize an array to int8 with the given scale."""
+    return np.clip(np.rint(x / scale), -127, 127).astype(np.int8)
+
+
+class QuantizedNetwork:
+    """
+    Reduced-precision inference wrapper around SimpleNeuralNetwork.
+
+    FLOAT32 mode casts the weights once and runs the forward pass in single
+    precision. INT8 mode quantizes weights and activations symmetrically
+    with one scale per tensor and accumulates the matrix products in int32.
+    Activation scales come from :meth:`calibrate`; until then the input
+    scale assumes features in [0, 1] and the hidden scale is computed per
+    batch.
+    """
+
+    def __init__(
+        self, network: SimpleNeuralNetwork, mode: InferenceMode = InferenceMode.INT8
+    ):
+        """
+        Initialize the quantized network.
 
-            # Convert to scalar
-            return float(output[0])
+        Args:
+            network: The full-precision network to derive weights from
+            mode: FLOAT32 or INT8
+        """
+        if mode == InferenceMode.FLOAT64:
+            raise ValueError("QuantizedNetwork requires FLOAT32 or INT8 mode")
+
+        self.network = network
+        self.mode = mode
+        self.input_scale = 1.0 / 127.0
+        self.hidden_scale = None
+        self.calibrated = False
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Re-derive the reduced-precision weights from the network."""
+        weights = self.network.get_weights()
+        self.b1 = weights["b1"].astype(np.float32)
+        self.b2 = weights["b2"].astype(np.float32)
+
+        if self.mode == InferenceMode.FLOAT32:
+            self.w1 = weights["w1"].astype(np.float32, copy=False)
+            self.w2 = weights["w2"].astype(np.float32, copy=False)
+        else:
+            self.w1_scale = _tensor_scale(weights["w1"])
+            self.w2_scale = _tensor_scale(weights["w2"])
+            self.w1 = _quantize(weights["w1"], self.w1_scale)
+            self.w2 = _quantize(weights["w2"], self.w2_scale)
+
+    def calibrate(self, sample_features) -> Dict[str, float]:
+        """
+        Calibrate activation scales over a representative sample batch.
+
+        Args:
+            sample_features: Feature rows with shape (batch, input_size)
+
+        Returns:
+            Dictionary of the calibrated per-tensor scales
+        """
+        x = np.asarray(sample_features, dtype=np.float64)
+        weights = self.network.get_weights()
+        hidden = np.maximum(0, x @ weights["w1"] + weights["b1"])
+
+        self.input_scale = _tensor_scale(x)
+        self.hidden_scale = _tensor_scale(hidden)
+        self.calibrated = True
+
+        scales = {"input": self.input_scale, "hidden": self.hidden_scale}
+        if self.mode == InferenceMode.INT8:
+            scales.update({"w1": self.w1_scale, "w2": self.w2_scale})
+        logger.info(f"Calibrated {self.mode.value} spam network: {scales}")
+        return scales
+
+    def forward_batch(self, x) -> np.ndarray:
+        """
+        Forward pass for a batch of feature rows.
+
+        Args:
+            x: Input features with shape (batch, input_size)
+
+        Returns:
+            Array of spam scores with shape (batch,)
+        """
+        if self.mode == InferenceMode.FLOAT32:
+            x = np.asarray(x, dtype=np.float32)
+            hidden = np.maximum(0, x @ self.w1 + self.b1)
+            logits = hidden @ self.w2 + self.b2
+        else:
+            x_q = _quantize(np.asarray(x, dtype=np.float32), self.input_scale)
+            acc = np.matmul(x_q, self.w1, dtype=np.int32)
+            hidden = np.maximum(
+                0, acc.astype(np.float32) * (self.input_scale * self.w1_scale) + self.b1
+            )
+
+            hidden_scale = self.hidden_scale or _tensor_scale(hidden)
+            h_q = _quantize(hidden, hidden_scale)
+            acc = np.matmul(h_q, self.w2, dtype=np.int32)
+            logits = acc.astype(np.float32) * (hidden_scale * self.w2_scale) + self.b2
+
+        return (1.0 / (1.0 + np.exp(-logits)))[:, 0]
+
+    def forward(self, x) -> float:
+        """
+        Forward pass for a single feature row.
+
+        Args:
+            x: Input features
+
+        Returns:
+            Network output (spam score)
+        """
+        return float(self.forward_batch(np.asarray(x)[np.newaxis, :])[0])
+
+
+def compare_inference_modes(
+    network: SimpleNeuralNetwork,
+    sample_features,
+    threshold: float = 0.7,
+    repeats: int = 5,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare accuracy and throughput of every inference mode.
+
+    Accuracy is measured against the float64 network on the same sample.
+
+    Args:
+        network: The full-precision network
+        sample_features: Feature rows with shape (batch, input_size)
+        threshold: Spam threshold used to measure verdict agreement
+        repeats: Number of timed passes per mode
+
+    Returns:
+        Dictionary mapping mode names to accuracy and speed metrics
+    """
+    x = np.asarray(sample_features, dtype=np.float64)
+    reference = network.forward_batch(x)
+
+    report = {}
+    for mode in InferenceMode:
+        if mode == InferenceMode.FLOAT64:
+            scorer = network
         else:
-            # NumPy implementation
-            if not isinstance(x, np.ndarray):
-                x = np.array(x)
+            scorer = QuantizedNetwork(network, mode)
+            scorer.calibrate(x)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            scores = scorer.forward_batch(x)
+        elapsed = max(time.perf_counter() - start, 1e-9)
+
+        errors = np.abs(np.asarray(scores, dtype=np.float64) - reference)
+        report[mode.value] = {
+            "mean_abs_error": float(errors.mean()) if len(x) else 0.0,
+            "max_abs_error": float(errors.max()) if len(x) else 0.0,
+            "verdict_agreement": (
+                float(np.mean((scores > threshold) == (reference > threshold)))
+                if len(x)
+                else 1.0
+            ),
+            "rows_per_second": len(x) * repeats / elapsed,
+        }
 
-            # Forward pass
-            hidden = self._relu(np.dot(x, self.w1) + self.b1)
-            output = self._sigmoid(np.dot(hidden, self.w2) + self.b2)
+    return report
 
-            # Convert to scalar
-            return float(output[0])
+
+# Common spam phrases checked by the rule stage of the cascade
+SPAM_PHRASES = (
+    "double your money",
+    "get rich quick",
+    "work from home",
+    "earn extra cash",
+    "limited time offer",
+    "act now",
+    "exclusive deal",
+    "congratulations you won",
+)
+
+# Names of the cascade stages, in evaluation order
+CASCADE_STAGES = ("campaign", "phrase_rule", "reputation", "clean_rule", "model")
+
+
+@dataclass
+class CascadeConfig:
+    """Configuration of the cheap-rule-first spam cascade."""
+
+    enabled: bool = True
+    # Content at or below this length with no links, media, buttons or
+    # spam phrases is accepted without running the model
+    clean_max_length: int = 160
+    clean_score: float = 0.05
+    # Content matching at least this many spam phrases is rejected
+    # without running the model
+    spam_phrase_hits: int = 2
+    spam_score: float = 0.95
+    # Score added to model output for established senders, scaled by
+    # their smoothed spam rate
+    sender_spam_weight: float = 0.3
 
 
 class SpamFilter:
     """Neural network based spam filter for notifications."""
 
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        verify_checksum: bool = True,
+        lazy: bool = True,
+        model_reload_seconds: Optional[float] = None,
+        inference_mode: Union[str, InferenceMode] = InferenceMode.FLOAT64,
+        near_duplicate_index: Optional[NearDuplicateIndex] = None,
+        cascade: Optional[CascadeConfig] = None,
+        reputation_store: Optional[SenderReputationStore] = None,
+        feature_pool: Optional["SpamFeaturePool"] = None,
+    ):
         """
         Initialize the spam filter.
 
         Args:
             model_path: Optional path to pre-trained model weights
+            verify_checksum: Whether to verify the model file checksum on load
+            lazy: Defer loading the model file until the first check
+            model_reload_seconds: If set, check the model file this often
+                and remap it when a new version has been published
+            inference_mode: Numeric precision for inference
+                ('float64', 'float32' or 'int8')
+            near_duplicate_index: Optional index of recent contents used to
+                detect coordinated campaigns of near-identical messages
+            cascade: Configuration of the rule stages run before the model
+            reputation_store: Optional per-sender reputation store; trusted
+                senders skip the model and every verdict updates it
+            feature_pool: Optional process pool used to extract features of
+                large batches in parallel
         """
         self.feature_extractor = SpamFeatureExtractor()
         self.model = SimpleNeuralNetwork()
-        self.model_loaded = True
+        self.inference_mode = InferenceMode(inference_mode)
+        self.scorer = self._build_scorer()
+        self.near_duplicate_index = near_duplicate_index
+        self.cascade = cascade or CascadeConfig()
+        self.reputation_store = reputation_store
+        self.feature_pool = feature_pool
+        self.stage_exits = {stage: 0 for stage in CASCADE_STAGES}
+        self.model_path = model_path
+        self.verify_checksum = verify_checksum
+        self.model_weights = None
+        self.model_loaded = model_path is None
+        self.model_reload_seconds = model_reload_seconds
+        self._model_mtime = None
+        self._next_reload_check = 0.0
 
         # Load model weights if provided
-        if model_path:
+        if model_path and not lazy:
             self._load_weights(model_path)
 
         logger.info("Spam filter initialized")
@@ -312,6 +605,9 @@ class SpamFilter:
         """
         Load model weights from file.
 
+        The file is memory-mapped, so workers forked after loading (or
+        loading the same file independently) share one physical copy.
+
         Args:
             model_path: Path to model weights file
 
@@ -319,13 +615,393 @@ class SpamFilter:
             True if successful, False otherwise
         """
         try:
-            # In a real implementation, this would load actual weights
-            # This is just a simulation
             logger.info(f"Loading spam filter weights from {model_path}")
+            mtime = os.stat(model_path).st_mtime
+            weights = load_weights(model_path, verify=self.verify_checksum)
+            self.publish_weights(weights)
+            self.model_weights = weights
+            self._model_mtime = mtime
             return True
-        except Exception as e:
+        except (OSError, ModelFormatError, ValueError) as e:
             logger.error(f"Failed to load spam filter weights: {e}")
             return False
+        finally:
+            # Don't retry a failing file on every check
+            self.model_loaded = True
+
+    def _build_scorer(self):
+        """Create the inference object for the configured mode."""
+        if self.inference_mode == InferenceMode.FLOAT64:
+            return self.model
+        return QuantizedNetwork(self.model, self.inference_mode)
+
+    def publish_weights(self, weights: Any) -> None:
+        """
+        Atomically replace the weights used for scoring.
+
+        Concurrent checks keep running and see either the old or the new
+        weights. Calibrated activation scales of reduced-precision modes are
+        carried over.
+
+        Args:
+            weights: Mapping with ``w1``, ``b1``, ``w2`` and ``b2`` tensors
+        """
+        self.model.set_weights(weights)
+
+        previous = self.scorer
+        if isinstance(previous, QuantizedNetwork):
+            scorer = QuantizedNetwork(self.model, self.inference_mode)
+            scorer.input_scale = previous.input_scale
+            scorer.hidden_scale = previous.hidden_scale
+            scorer.calibrated = previous.calibrated
+            self.scorer = scorer
+
+    def _ensure_model(self) -> None:
+        """Load the configured model file on first use."""
+        if not self.model_loaded:
+            self._load_weights(self.model_path)
+        elif self.model_path and self.model_reload_seconds is not None:
+            self._reload_if_changed()
+
+    def _reload_if_changed(self) -> None:
+        """Remap the model file if a newer version was published."""
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self.model_reload_seconds
+
+        try:
+            mtime = os.stat(self.model_path).st_mtime
+        except OSError:
+            return
+        if mtime != self._model_mtime:
+            self._load_weights(self.model_path)
+
+    def preload(self) -> bool:
+        """
+        Load the model file eagerly.
+
+        Call this in a pre-fork parent process so that the mapping is
+        inherited by every worker.
+
+        Returns:
+            True if the configured weights are loaded, False otherwise
+        """
+        self._ensure_model()
+        return self.model_weights is not None
+
+    def save_weights(self, model_path: str) -> str:
+        """
+        Save the current model weights in the on-disk model format.
+
+        Args:
+            model_path: Destination path
+
+        Returns:
+            Hex SHA-256 digest of the saved weights
+        """
+        return save_weights(model_path, self.model.get_weights())
+
+    def _extract_feature_matrix(
+        self, contents: Sequence[NotificationContent]
+    ) -> np.ndarray:
+        """Extract a (batch, features) matrix for several contents."""
+        if self.feature_pool is not None:
+            return self.feature_pool.extract(contents)
+
+        matrix = np.zeros((len(contents), self.model.input_size), dtype=np.float64)
+        for i, content in enumerate(contents):
+            matrix[i] = self.feature_extractor.extract_features(content)
+        return matrix
+
+    def calibrate(
+        self, sample_contents: Sequence[NotificationContent]
+    ) -> Dict[str, float]:
+        """
+        Calibrate reduced-precision inference over a sample of traffic.
+
+        Args:
+            sample_contents: Representative notification contents
+
+        Returns:
+            Dictionary of calibrated scales (empty in float64 mode)
+        """
+        self._ensure_model()
+        if not isinstance(self.scorer, QuantizedNetwork):
+            return {}
+        return self.scorer.calibrate(self._extract_feature_matrix(sample_contents))
+
+    def inference_report(
+        self, sample_contents: Sequence[NotificationContent], repeats: int = 5
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Report accuracy versus speed of every inference mode on a sample.
+
+        Args:
+            sample_contents: Representative notification contents
+            repeats: Number of timed passes per mode
+
+        Returns:
+            Dictionary mapping mode names to accuracy and speed metrics
+        """
+        self._ensure_model()
+        return compare_inference_modes(
+            self.model,
+            self._extract_feature_matrix(sample_contents),
+            repeats=repeats,
+        )
+
+    def _count_phrase_hits(
+        self,
+        content: NotificationContent,
+        title_lower: Optional[str] = None,
+        body_lower: Optional[str] = None,
+    ) -> int:
+        """
+        Count known spam phrases in the title and body.
+
+        Args:
+            content: The notification content
+            title_lower: Lowercased title, if already computed
+            body_lower: Lowercased body, if already computed
+
+        Returns:
+            Number of phrases found
+        """
+        if title_lower is None:
+            title_lower = content.title.lower()
+        if body_lower is None:
+            body_lower = content.body.lower()
+        return sum(
+            1
+            for phrase in SPAM_PHRASES
+            if phrase in title_lower or phrase in body_lower
+        )
+
+    def _sender_reputation(
+        self, content: NotificationContent
+    ) -> Tuple[Optional[str], Optional[SenderReputation]]:
+        """Look up the sender of content in the reputation store."""
+        if self.reputation_store is None:
+            return None, None
+        sender = self.reputation_store.sender_id(content)
+        if sender is None:
+            return None, None
+        return sender, self.reputation_store.get(sender)
+
+    def _record_sender(
+        self, sender: Optional[str], is_spam: bool, stage: Optional[str] = None
+    ) -> None:
+        """Feed a verdict back into the reputation store."""
+        if sender is None:
+            return
+        if stage == "reputation":
+            # A verdict taken on trust says nothing new about the sender,
+            # but the message still counts toward its volume and bursts
+            self.reputation_store.record_volume(sender)
+        else:
+            self.reputation_store.record(sender, is_spam)
+
+    def _run_rules(
+        self,
+        content: NotificationContent,
+        match: Optional[ClusterMatch],
+        reputation: Optional[SenderReputation] = None,
+        lowered: Tuple[Optional[str], Optional[str]] = (None, None),
+    ) -> Tuple[Optional[Tuple[bool, float]], int, Optional[str]]:
+        """
+        Run the cheap stages of the cascade.
+
+        Stages are ordered by cost: the cached campaign verdict, an O(len)
+        phrase scan that both rejects obvious spam and feeds the model
+        stage, the sender's reputation, then structural checks that accept
+        short plain text. The phrase rule runs before the reputation stage
+        so a trusted sender's text is still checked.
+
+        Args:
+            content: The notification content
+            match: Near-duplicate cluster match for the content, if any
+            reputation: Reputation of the content's sender, if known
+            lowered: Lowercased title and body, if already computed
+
+        Returns:
+            Tuple of (early verdict or None, spam phrase hits, name of the
+            deciding stage or None)
+        """
+        if match is not None and match.cached_verdict is not None:
+            self.stage_exits["campaign"] += 1
+            return match.cached_verdict, 0, "campaign"
+
+        phrase_hits = self._count_phrase_hits(content, *lowered)
+
+        cascade = self.cascade
+        if not cascade.enabled or (match is not None and match.is_campaign):
+            return None, phrase_hits, None
+
+        if phrase_hits >= cascade.spam_phrase_hits:
+            self.stage_exits["phrase_rule"] += 1
+            return (True, cascade.spam_score), phrase_hits, "phrase_rule"
+
+        if self.reputation_store is not None and self.reputation_store.trusts(
+            reputation
+        ):
+            self.stage_exits["reputation"] += 1
+            return (False, cascade.clean_score), phrase_hits, "reputation"
+
+        if (
+            phrase_hits == 0
+            and not content.action_buttons
+            and not content.media_urls
+            and len(content.title) + len(content.body) <= cascade.clean_max_length
+        ):
+            text = f"{content.title} {content.body}".lower()
+            if "http" not in text and "www." not in text:
+                self.stage_exits["clean_rule"] += 1
+                return (False, cascade.clean_score), phrase_hits, "clean_rule"
+
+        return None, phrase_hits, None
+
+    def _score_from_model(
+        self,
+        model_score: float,
+        phrase_hits: int,
+        match: Optional[ClusterMatch],
+        reputation: Optional[SenderReputation] = None,
+    ) -> float:
+        """Combine the model score with phrase, sender and campaign signals."""
+        self.stage_exits["model"] += 1
+
+        # Rule-based additions (for demonstration)
+        # These would normally be learned by the model
+        spam_score = model_score + 0.2 * phrase_hits
+
+        # Established senders carry their spam history
+        if (
+            reputation is not None
+            and reputation.volume >= self.reputation_store.min_volume
+        ):
+            spam_score += self.cascade.sender_spam_weight * reputation.spam_rate
+
+        spam_score = min(spam_score, 1.0)
+        return self._apply_campaign_boost(match, spam_score)
+
+    def get_cascade_stats(self) -> Dict[str, Any]:
+        """
+        Get per-stage exit counters of the spam cascade.
+
+        Returns:
+            Dictionary with exit counts per stage, the total number of
+            checks and the fraction that skipped the model
+        """
+        total = sum(self.stage_exits.values())
+        skipped = total - self.stage_exits["model"]
+        return {
+            "exits": dict(self.stage_exits),
+            "total": total,
+            "model_skip_rate": skipped / total if total else 0.0,
+        }
+
+    def _observe_campaign(self, content: NotificationContent) -> Optional[ClusterMatch]:
+        """Record content in the near-duplicate index, if configured."""
+        if self.near_duplicate_index is None:
+            return None
+        return self.near_duplicate_index.observe(content)
+
+    def _apply_campaign_boost(
+        self, match: Optional[ClusterMatch], spam_score: float
+    ) -> float:
+        """Boost the score of a campaign member and cache the cluster verdict."""
+        if match is None or not match.is_campaign:
+            return spam_score
+
+        spam_score = min(spam_score + self.near_duplicate_index.score_boost, 1.0)
+        self.near_duplicate_index.record_verdict(
+            match.cluster_id, spam_score > 0.7, spam_score
+        )
+        return spam_score
+
+    def is_spam_batch(
+        self, contents: Sequence[NotificationContent]
+    ) -> List[Tuple[bool, float]]:
+        """
+        Check several notification contents with one batched forward pass.
+
+        Args:
+            contents: The notification contents to check
+
+        Returns:
+            List of (is_spam, confidence_score) tuples in input order
+        """
+        return self._check_batch(contents)
+
+    def is_spam_columns(self, batch: RequestBatch) -> List[Tuple[bool, float]]:
+        """
+        Check the contents of a columnar request batch.
+
+        Reuses the batch's lowercased text for the phrase rules and the
+        feature extraction.
+
+        Args:
+            batch: The request batch
+
+        Returns:
+            List of (is_spam, confidence_score) tuples in batch order
+        """
+        return self._check_batch(batch.contents, batch.titles_lower, batch.bodies_lower)
+
+    def _check_batch(
+        self,
+        contents: Sequence[NotificationContent],
+        titles_lower: Optional[Sequence[str]] = None,
+        bodies_lower: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[bool, float]]:
+        """Run the cascade over a batch and score what the rules leave."""
+        self._ensure_model()
+        if not contents:
+            return []
+
+        if titles_lower is None or bodies_lower is None:
+            lowered = [(None, None)] * len(contents)
+        else:
+            lowered = list(zip(titles_lower, bodies_lower))
+
+        results: List[Optional[Tuple[bool, float]]] = [None] * len(contents)
+        matches = [self._observe_campaign(content) for content in contents]
+        senders = [self._sender_reputation(content) for content in contents]
+
+        # Only contents the rule stages can't decide reach the model
+        pending = []
+        phrase_hits = {}
+        stages: List[Optional[str]] = [None] * len(contents)
+        for i, content in enumerate(contents):
+            verdict, phrase_hits[i], stages[i] = self._run_rules(
+                content, matches[i], senders[i][1], lowered[i]
+            )
+            if verdict is not None:
+                results[i] = verdict
+            else:
+                pending.append(i)
+
+        if pending:
+            if self.feature_pool is not None:
+                features = self._extract_feature_matrix([contents[i] for i in pending])
+            else:
+                features = np.zeros((len(pending), self.model.input_size))
+                extract = self.feature_extractor.extract_features
+                for row, i in enumerate(pending):
+                    features[row] = extract(contents[i], *lowered[i])
+
+            scores = self.scorer.forward_batch(features)
+            for i, score in zip(pending, scores):
+                spam_score = self._score_from_model(
+                    float(score), phrase_hits[i], matches[i], senders[i][1]
+                )
+                results[i] = (spam_score > 0.7, spam_score)
+
+        for (sender, _), (is_spam, _), stage in zip(senders, results, stages):
+            self._record_sender(sender, is_spam, stage)
+
+        return results
 
     def is_spam(self, content: NotificationContent) -> Tuple[bool, float]:
         """
@@ -337,38 +1013,27 @@ class SpamFilter:
         Returns:
             Tuple of (is_spam, confidence_score)
         """
-        # Extract features
-        features = self.feature_extractor.extract_features(content)
+        self._ensure_model()
 
-        # Run through model
-        spam_score = self.model.forward(features)
+        # Cheap rule stages first; only ambiguous content reaches the model
+        match = self._observe_campaign(content)
+        sender, reputation = self._sender_reputation(content)
+        verdict, phrase_hits, stage = self._run_rules(content, match, reputation)
 
-        # Rule-based additions (for demonstration)
-        # These would normally be learned by the model
-        title_lower = content.title.lower()
-        body_lower = content.body.lower()
-
-        # Check for common spam phrases
-        spam_phrases = [
-            "double your money",
-            "get rich quick",
-            "work from home",
-            "earn extra cash",
-            "limited time offer",
-            "act now",
-            "exclusive deal",
-            "congratulations you won",
-        ]
+        if verdict is None:
+            # Extract features
+            features = self.feature_extractor.extract_features(content)
 
-        for phrase in spam_phrases:
-            if phrase in title_lower or phrase in body_lower:
-                spam_score += 0.2
+            # Run through model
+            spam_score = self._score_from_model(
+                self.scorer.forward(features), phrase_hits, match, reputation
+            )
 
-        # Cap score at 1.0
-        spam_score = min(spam_score, 1.0)
+            # Determine spam status (threshold can be adjusted)
+            verdict = (spam_score > 0.7, spam_score)
 
-        # Determine spam status (threshold can be adjusted)
-        is_spam = spam_score > 0.7
+        is_spam, spam_score = verdict
+        self._record_sender(sender, is_spam, stage)
 
         if is_spam:
             logger.warning(f"Spam detected: {content.title} (score: {spam_score:.4f})")
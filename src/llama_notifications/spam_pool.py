@@ -0,0 +1,156 @@
+"""
+Process-pool feature extraction for large spam scoring batches.
+
+Spam feature extraction is pure-Python string work that holds the GIL, so
+threads can't parallelize it. :class:`SpamFeaturePool` partitions a batch of
+contents across worker processes; each worker writes its feature rows
+straight into a shared-memory matrix, so results are never pickled and the
+parent runs a single vectorized forward pass over the filled matrix.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .spam_filter import NotificationContent, SpamFeatureExtractor
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.spam_pool")
+
+# Feature extractor of the current worker process
+_worker_extractor: Optional[SpamFeatureExtractor] = None
+
+
+def _init_worker() -> None:
+    """Create the worker's feature extractor once."""
+    global _worker_extractor
+    _worker_extractor = SpamFeatureExtractor()
+
+
+def _extract_into(
+    shm_name: str,
+    shape: Tuple[int, int],
+    start: int,
+    contents: List[NotificationContent],
+) -> int:
+    """
+    Write feature rows for a chunk of contents into shared memory.
+
+    Args:
+        shm_name: Name of the shared memory block holding the matrix
+        shape: Shape of the full feature matrix
+        start: Row index of the first content in the chunk
+        contents: Contents of the chunk
+
+    Returns:
+        Number of rows written
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        for offset, content in enumerate(contents):
+            matrix[start + offset] = _worker_extractor.extract_features(content)
+        del matrix
+    finally:
+        shm.close()
+    return len(contents)
+
+
+class SpamFeaturePool:
+    """Extracts spam feature matrices in a pool of worker processes."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        min_batch_size: int = 512,
+        input_size: int = 32,
+    ):
+        """
+        Initialize the pool.
+
+        Worker processes are started on the first batch large enough to
+        use them.
+
+        Args:
+            workers: Number of worker processes (defaults to the CPU count)
+            min_batch_size: Smaller batches are extracted in-process, where
+                dispatch overhead would outweigh the speedup
+            input_size: Number of features per row
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.min_batch_size = min_batch_size
+        self.input_size = input_size
+        self._extractor = SpamFeatureExtractor()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "SpamFeaturePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _extract_serial(self, contents: Sequence[NotificationContent]) -> np.ndarray:
+        matrix = np.zeros((len(contents), self.input_size), dtype=np.float64)
+        for i, content in enumerate(contents):
+            matrix[i] = self._extractor.extract_features(content)
+        return matrix
+
+    def extract(self, contents: Sequence[NotificationContent]) -> np.ndarray:
+        """
+        Extract a (batch, features) matrix for several contents.
+
+        Args:
+            contents: The notification contents
+
+        Returns:
+            Feature matrix in input order
+        """
+        if self.workers < 2 or len(contents) < self.min_batch_size:
+            return self._extract_serial(contents)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker
+            )
+
+        shape = (len(contents), self.input_size)
+        shm = shared_memory.SharedMemory(
+            create=True, size=shape[0] * shape[1] * np.dtype(np.float64).itemsize
+        )
+        try:
+            # One contiguous chunk per worker keeps dispatch overhead fixed
+            chunk = -(-len(contents) // self.workers)
+            futures = [
+                self._executor.submit(
+                    _extract_into,
+                    shm.name,
+                    shape,
+                    start,
+                    list(contents[start : start + chunk]),
+                )
+                for start in range(0, len(contents), chunk)
+            ]
+            for future in futures:
+                future.result()
+
+            shared = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            matrix = shared.copy()
+            del shared
+            return matrix
+        except Exception as e:
+            logger.error(f"Parallel feature extraction failed: {e}")
+            self.close()
+            return self._extract_serial(contents)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,312 @@
+"""
+Online training of the spam network from user feedback.
+
+Production signals such as "reported as spam" or "opened" are submitted to
+an :class:`OnlineSpamTrainer`. Submitting only enqueues the content; a
+background thread extracts features into a fixed-size ring buffer, runs
+vectorized minibatch SGD on a private copy of the weights, and periodically
+publishes the result to the spam filter (and optionally to a model file for
+other processes) without stopping scoring. The thread sleeps in proportion
+to the time it spends training, keeping its CPU share bounded.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from .model_store import save_weights
+from .spam_filter import NotificationContent, SpamFilter
+
+# Configure logging
+logger = logging.getLogger("llama_notifications.ml.spam_training")
+
+
+class FeedbackBuffer:
+    """Fixed-capacity ring buffer of labeled feature rows."""
+
+    def __init__(self, capacity: int, input_size: int):
+        """
+        Initialize the buffer.
+
+        Args:
+            capacity: Maximum number of rows kept (oldest are overwritten)
+            input_size: Number of features per row
+        """
+        self.capacity = capacity
+        self.features = np.zeros((capacity, input_size), dtype=np.float32)
+        self.labels = np.zeros(capacity, dtype=np.float32)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, features, label: float) -> None:
+        """
+        Add a labeled row, overwriting the oldest row when full.
+
+        Args:
+            features: Feature row
+            label: 1.0 for spam, 0.0 for legitimate
+        """
+        self.features[self._next] = features
+        self.labels[self._next] = label
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def sample(self, batch_size: int, rng: np.random.RandomState):
+        """
+        Draw a random minibatch.
+
+        Args:
+            batch_size: Number of rows
+            rng: Random number generator
+
+        Returns:
+            Tuple of (features, labels) arrays
+        """
+        indices = rng.randint(0, self._size, size=batch_size)
+        return self.features[indices], self.labels[indices]
+
+
+def sgd_step(
+    weights: Dict[str, np.ndarray],
+    x: np.ndarray,
+    y: np.ndarray,
+    learning_rate: float,
+    weight_decay: float = 0.0,
+) -> float:
+    """
+    Apply one minibatch SGD step to the spam network in place.
+
+    Uses binary cross-entropy on the sigmoid output of the
+    ReLU hidden layer network.
+
+    Args:
+        weights: Mutable mapping with ``w1``, ``b1``, ``w2`` and ``b2``
+        x: Feature matrix with shape (batch, input_size)
+        y: Labels with shape (batch,)
+        learning_rate: SGD step size
+        weight_decay: L2 penalty applied to the weight matrices
+
+    Returns:
+        Mean loss on the minibatch before the update
+    """
+    w1, b1, w2, b2 = weights["w1"], weights["b1"], weights["w2"], weights["b2"]
+    batch = len(x)
+
+    # Forward
+    pre_hidden = x @ w1 + b1
+    hidden = np.maximum(0, pre_hidden)
+    logits = (hidden @ w2 + b2)[:, 0]
+    probs = 1.0 / (1.0 + np.exp(-logits))
+
+    eps = 1e-7
+    loss = -np.mean(y * np.log(probs + eps) + (1 - y) * np.log(1 - probs + eps))
+
+    # Backward
+    d_logits = ((probs - y) / batch)[:, np.newaxis]
+    grad_w2 = hidden.T @ d_logits + weight_decay * w2
+    grad_b2 = d_logits.sum(axis=0)
+    d_hidden = (d_logits @ w2.T) * (pre_hidden > 0)
+    grad_w1 = x.T @ d_hidden + weight_decay * w1
+    grad_b1 = d_hidden.sum(axis=0)
+
+    w1 -= learning_rate * grad_w1
+    b1 -= learning_rate * grad_b1
+    w2 -= learning_rate * grad_w2
+    b2 -= learning_rate * grad_b2
+
+    return float(loss)
+
+
+class OnlineSpamTrainer:
+    """Background minibatch trainer for a spam filter's network."""
+
+    def __init__(
+        self,
+        spam_filter: SpamFilter,
+        capacity: int = 10000,
+        batch_size: int = 64,
+        learning_rate: float = 0.05,
+        weight_decay: float = 1e-4,
+        min_samples: int = 256,
+        publish_every: int = 50,
+        max_cpu_share: float = 0.1,
+        publish_path: Optional[str] = None,
+        max_pending: int = 10000,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize the trainer.
+
+        Args:
+            spam_filter: The filter whose weights are trained and published
+            capacity: Ring buffer size in labeled rows
+            batch_size: Minibatch size
+            learning_rate: SGD step size
+            weight_decay: L2 penalty on weight matrices
+            min_samples: Rows required before training starts
+            publish_every: Publish weights after this many SGD steps
+            max_cpu_share: Upper bound on the fraction of one core used
+                by the training thread
+            publish_path: Optional model file to write on each publish so
+                other processes can pick up new weights
+            max_pending: Maximum queued feedback events before new ones
+                are dropped
+            seed: Seed for minibatch sampling
+        """
+        if not 0 < max_cpu_share <= 1:
+            raise ValueError("max_cpu_share must be in (0, 1]")
+
+        self.spam_filter = spam_filter
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.weight_decay = weight_decay
+        self.min_samples = min_samples
+        self.publish_every = publish_every
+        self.max_cpu_share = max_cpu_share
+        self.publish_path = publish_path
+
+        self.buffer = FeedbackBuffer(capacity, spam_filter.model.input_size)
+        self._pending: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._rng = np.random.RandomState(seed)
+        self._weights = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.steps = 0
+        self.publishes = 0
+        self.dropped = 0
+        self.last_loss: Optional[float] = None
+
+    def submit_feedback(self, content: NotificationContent, is_spam: bool) -> bool:
+        """
+        Submit a labeled example without blocking.
+
+        Args:
+            content: The notification content the feedback refers to
+            is_spam: True if the user reported spam, False for positive
+                engagement such as opening the notification
+
+        Returns:
+            True if queued, False if dropped because the queue is full
+        """
+        try:
+            self._pending.put_nowait((content, 1.0 if is_spam else 0.0))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def report_spam(self, content: NotificationContent) -> bool:
+        """Record that a user reported the content as spam."""
+        return self.submit_feedback(content, True)
+
+    def report_opened(self, content: NotificationContent) -> bool:
+        """Record that a user opened the content."""
+        return self.submit_feedback(content, False)
+
+    def _drain(self) -> int:
+        """Move queued feedback into the ring buffer."""
+        extract = self.spam_filter.feature_extractor.extract_features
+        drained = 0
+        while True:
+            try:
+                content, label = self._pending.get_nowait()
+            except queue.Empty:
+                return drained
+            self.buffer.append(extract(content), label)
+            drained += 1
+
+    def train_step(self) -> Optional[float]:
+        """
+        Ingest pending feedback and run one SGD step.
+
+        Returns:
+            Minibatch loss, or None if there is not enough data yet
+        """
+        self._drain()
+        if len(self.buffer) < self.min_samples:
+            return None
+
+        if self._weights is None:
+            # Train on a private float64 copy; scoring keeps the published one
+            self._weights = {
+                name: np.array(value, dtype=np.float64)
+                for name, value in self.spam_filter.model.get_weights().items()
+            }
+
+        x, y = self.buffer.sample(self.batch_size, self._rng)
+        self.last_loss = sgd_step(
+            self._weights,
+            x.astype(np.float64),
+            y.astype(np.float64),
+            self.learning_rate,
+            self.weight_decay,
+        )
+        self.steps += 1
+
+        if self.steps % self.publish_every == 0:
+            self.publish()
+        return self.last_loss
+
+    def publish(self) -> None:
+        """Publish a snapshot of the trained weights to scoring."""
+        if self._weights is None:
+            return
+
+        snapshot = {name: value.copy() for name, value in self._weights.items()}
+        self.spam_filter.publish_weights(snapshot)
+        if self.publish_path:
+            save_weights(self.publish_path, snapshot)
+
+        self.publishes += 1
+        logger.info(
+            f"Published spam weights after {self.steps} steps "
+            f"(loss: {self.last_loss:.4f})"
+        )
+
+    def _run(self) -> None:
+        # Sleep long enough after each step that training uses at most
+        # max_cpu_share of a core
+        idle_factor = (1.0 - self.max_cpu_share) / self.max_cpu_share
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            try:
+                loss = self.train_step()
+            except Exception as e:
+                logger.error(f"Spam training step failed: {e}")
+                loss = None
+            elapsed = time.perf_counter() - start
+
+            delay = elapsed * idle_factor if loss is not None else 0.5
+            self._stop.wait(max(delay, 0.001))
+
+    def start(self) -> None:
+        """Start the background training thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="spam-trainer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, publish: bool = True) -> None:
+        """
+        Stop the background training thread.
+
+        Args:
+            publish: Whether to publish the latest weights before returning
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if publish:
+            self.publish()
@@ -0,0 +1,94 @@
+"""
+Tests for the numeric backend registry.
+
+This module checks that every available backend computes the same kernels
+so components behave identically whichever backend is selected.
+"""
+
+import numpy as np
+import pytest
+
+from llama_notifications.backend import (
+    Backend,
+    available_backends,
+    benchmark_backends,
+    create_backend,
+)
+from llama_notifications.priority import NotificationRequest, PriorityRouter
+from llama_notifications.spam_filter import SimpleNeuralNetwork
+
+
+@pytest.fixture
+def weights():
+    """Create spam network sized weights."""
+    rng = np.random.RandomState(7)
+    return {
+        "w1": rng.normal(0, 0.1, (32, 16)),
+        "b1": rng.normal(0, 0.1, 16),
+        "w2": rng.normal(0, 0.1, (16, 1)),
+        "b2": rng.normal(0, 0.1, 1),
+    }
+
+
+class TestBackends:
+    """Tests for backend kernels."""
+
+    def test_numpy_and_python_available(self):
+        """Test that the always-available backends are registered."""
+        names = available_backends()
+        assert "numpy" in names
+        assert "python" in names
+
+    def test_base_is_abstract(self):
+        """Test that a backend must implement every kernel."""
+        with pytest.raises(TypeError):
+            Backend()
+
+    def test_unknown_backend(self):
+        """Test that unknown backend names are rejected."""
+        with pytest.raises(ValueError):
+            create_backend("fortran")
+
+    @pytest.mark.parametrize("name", available_backends())
+    def test_network_scores_agree(self, name, weights):
+        """Test that every backend scores like the NumPy backend."""
+        reference = SimpleNeuralNetwork(backend=create_backend("numpy"))
+        network = SimpleNeuralNetwork(backend=create_backend(name))
+        reference.set_weights(weights)
+        network.set_weights(weights)
+
+        rows = np.random.RandomState(3).uniform(0, 1, (4, 32))
+        assert network.forward(rows[0].tolist()) == pytest.approx(
+            reference.forward(rows[0].tolist()), abs=1e-5
+        )
+        np.testing.assert_allclose(
+            network.forward_batch(rows), reference.forward_batch(rows), atol=1e-5
+        )
+
+    @pytest.mark.parametrize("name", available_backends())
+    def test_add_bytes(self, name):
+        """Test that byte mixing is identical across backends."""
+        backend = create_backend(name)
+        assert backend.add_bytes(b"\x00\x7f\xff", 1) == b"\x01\x80\x00"
+
+    @pytest.mark.parametrize("name", available_backends())
+    def test_priority_router(self, name):
+        """Test that priority routing is backend independent."""
+        request = NotificationRequest(
+            notification_id="n1",
+            content_title="Urgent: action required",
+            content_body="Your password expires in 10 minutes",
+            recipient_id="u1",
+            context={"priority": "HIGH", "is_security_related": True},
+        )
+        reference = PriorityRouter(backend=create_backend("numpy"))
+        router = PriorityRouter(backend=create_backend(name))
+
+        assert router.calculate_priority(request) == reference.calculate_priority(
+            request
+        )
+
+    def test_benchmark(self):
+        """Test that the micro-benchmark times every available backend."""
+        timings = benchmark_backends(iterations=4, batch_size=2)
+        assert set(timings) == set(available_backends())
@@ -0,0 +1,308 @@
+"""
+Tests for columnar request batches.
+
+This module contains tests for building a RequestBatch and for the batch
+entry points of the spam filter, priority router and context analyzer.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from llama_notifications.batch import RequestBatch
+from llama_notifications.clock import VirtualClock
+from llama_notifications.context import (
+    BroadcastScorer,
+    ChannelType,
+    ContextAnalyzer,
+    EnvironmentContext,
+    NotificationContext,
+    RecipientColumns,
+    RecipientContext,
+    UserPreferences,
+)
+from llama_notifications.priority import NotificationRequest, PriorityRouter
+from llama_notifications.spam_filter import NotificationContent, SpamFilter
+
+
+@pytest.fixture
+def service_requests():
+    """Create service-level requests with varied content and context."""
+    bodies = [
+        "Your order has shipped.",
+        "WIN a FREE prize!!! Click here now to claim your cash",
+        "Your password expires in 10 minutes. " * 10,
+        "Meeting moved to 3pm",
+    ]
+    contexts = [
+        {},
+        {"priority": "LOW", "user_engagement": 0.2},
+        {"is_security_related": True, "time_sensitive": True},
+        {"priority": "HIGH", "interaction_required": True},
+    ]
+    requests = []
+    for i, (body, context) in enumerate(zip(bodies, contexts)):
+        requests.append(
+            SimpleNamespace(
+                notification_id=f"n{i}",
+                content=NotificationContent(title=f"Notice {i}", body=body),
+                recipient=SimpleNamespace(
+                    push_token="token", phone=None if i == 1 else "+1555", email="a@b"
+                ),
+                channels=list(ChannelType),
+                priority=SimpleNamespace(value=i % 4),
+                context=context,
+            )
+        )
+    return requests
+
+
+class TestRequestBatch:
+    """Tests for building columnar batches."""
+
+    def test_columns(self, service_requests):
+        """Test that columns mirror the request attributes."""
+        batch = RequestBatch.from_requests(service_requests)
+
+        assert len(batch) == 4
+        assert batch.titles_lower[0] == "notice 0"
+        assert batch.body_lengths[0] == len("Your order has shipped.")
+        assert batch.priority_levels.tolist() == [0, 1, 2, 3]
+        assert batch.column("user_engagement", 0.5).tolist() == [0.5, 0.2, 0.5, 0.5]
+        assert batch.has_channel(ChannelType.SMS).tolist() == [
+            True,
+            False,
+            True,
+            True,
+        ]
+
+
+class TestBatchEntryPoints:
+    """Tests for the columnar entry points of the ML stages."""
+
+    def test_spam_filter(self, service_requests):
+        """Test that columnar spam checks match per-content checks."""
+        batch = RequestBatch.from_requests(service_requests)
+        spam_filter = SpamFilter()
+        expected = spam_filter.is_spam_batch(batch.contents)
+
+        assert spam_filter.is_spam_columns(batch) == expected
+
+    def test_priority_router(self, service_requests):
+        """Test that columnar priorities match per-request priorities."""
+        batch = RequestBatch.from_requests(service_requests)
+        router = PriorityRouter()
+        expected = [
+            router.calculate_priority(
+                NotificationRequest(
+                    notification_id=request.notification_id,
+                    content_title=request.content.title,
+                    content_body=request.content.body,
+                    recipient_id="u1",
+                    context=request.context,
+                )
+            )
+            for request in service_requests
+        ]
+
+        assert router.calculate_priority_columns(batch) == expected
+
+    def test_context_analyzer(self, service_requests):
+        """Test that columnar channel selection matches the scalar path."""
+        batch = RequestBatch.from_requests(service_requests)
+        recipient = RecipientContext(
+            user_id="u1",
+            preferences=UserPreferences(
+                user_id="u1", preferred_channels=[ChannelType.EMAIL, ChannelType.PUSH]
+            ),
+            push_token="token",
+            phone="+1555",
+            email="a@b",
+            device_active=True,
+        )
+        analyzer = ContextAnalyzer()
+
+        results = analyzer.get_optimal_channels_columns(batch, [recipient] * len(batch))
+
+        for i, request in enumerate(service_requests):
+            expected = analyzer.get_optimal_channels(
+                recipient,
+                NotificationContext(
+                    notification_id=request.notification_id,
+                    title=request.content.title,
+                    body=request.content.body,
+                    priority_level=request.priority.value,
+                    time_sensitive=request.context.get("time_sensitive", False),
+                    interaction_required=request.context.get(
+                        "interaction_required", False
+                    ),
+                ),
+            )
+            if not batch.has_channel(ChannelType.SMS)[i]:
+                expected = [item for item in expected if item[0] != ChannelType.SMS]
+
+            assert [channel for channel, _ in results[i]] == [
+                channel for channel, _ in expected
+            ]
+            np.testing.assert_allclose(
+                [score for _, score in results[i]], [score for _, score in expected]
+            )
+
+
+class TestChannelScoringMany:
+    """Tests for vectorized channel scoring across recipients."""
+
+    NOW = 1714557600.0  # 2024-05-01 10:00 UTC
+
+    @pytest.fixture
+    def population(self):
+        """Create recipients and environments covering every factor."""
+        rng = np.random.RandomState(3)
+        channels = list(ChannelType)
+        recipients, environments = [], []
+        for i in range(300):
+            preferred = [channels[j] for j in rng.permutation(3)[: rng.randint(0, 4)]]
+            dnd = {channels[rng.randint(3)]: [(8, 12)]} if rng.rand() < 0.4 else {}
+            recipients.append(
+                RecipientContext(
+                    user_id=f"u{i}",
+                    preferences=(
+                        UserPreferences(f"u{i}", preferred, dnd)
+                        if rng.rand() < 0.8
+                        else None
+                    ),
+                    push_token="token" if rng.rand() < 0.8 else None,
+                    phone="+1555" if rng.rand() < 0.7 else None,
+                    email="a@b" if rng.rand() < 0.9 else None,
+                    sms_enabled=rng.rand() < 0.9,
+                    device_active=rng.rand() < 0.5,
+                    last_active=self.NOW - rng.randint(0, 7200),
+                )
+            )
+            environments.append(
+                EnvironmentContext(
+                    current_time=self.NOW,
+                    app_state=rng.choice(["foreground", "background", "closed"]),
+                    network_type=rng.choice(["wifi", "cellular", "offline"]),
+                    network_quality=float(rng.rand()),
+                    battery_level=float(rng.rand()),
+                )
+            )
+        return recipients, environments
+
+    @pytest.mark.parametrize("priority_level", [0, 2])
+    def test_matches_scalar_path(self, population, priority_level):
+        """Test that the score matrix reproduces per-recipient scoring."""
+        recipients, environments = population
+        notification = NotificationContext(
+            notification_id="n1",
+            title="Weekly summary",
+            body="x" * 400,
+            priority_level=priority_level,
+            interaction_required=True,
+        )
+        analyzer = ContextAnalyzer()
+        columns = RecipientColumns.from_contexts(recipients, environments, self.NOW)
+
+        results = analyzer.get_optimal_channels_many(columns, notification)
+
+        with patch("time.time", return_value=self.NOW):
+            for result, recipient, environment in zip(
+                results, recipients, environments
+            ):
+                expected = analyzer.get_optimal_channels(
+                    recipient, notification, environment
+                )
+                assert [c for c, _ in result] == [c for c, _ in expected]
+                np.testing.assert_allclose(
+                    [s for _, s in result], [s for _, s in expected]
+                )
+
+    @pytest.mark.parametrize("priority_level", [0, 2])
+    def test_broadcast_matches_scalar_path(self, population, priority_level):
+        """Test that memoized broadcast ranking matches per-recipient ranking."""
+        recipients, environments = population
+        notification = NotificationContext(
+            notification_id="n1",
+            title="Weekly summary",
+            body="x" * 400,
+            priority_level=priority_level,
+        )
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=self.NOW))
+
+        results = analyzer.get_optimal_channels_broadcast(
+            recipients, notification, environments
+        )
+
+        for result, recipient, environment in zip(results, recipients, environments):
+            assert result == analyzer.get_optimal_channels(
+                recipient, notification, environment
+            )
+
+    def test_broadcast_shares_profiles(self):
+        """Test that recipients with equal profiles are ranked once."""
+        preferences = UserPreferences("u", [ChannelType.PUSH, ChannelType.EMAIL])
+        recipients = [
+            RecipientContext(
+                user_id=f"u{i}",
+                preferences=preferences,
+                push_token=f"token{i}",
+                email=f"u{i}@example.com",
+                device_active=i % 2 == 0,
+            )
+            for i in range(1000)
+        ]
+        notification = NotificationContext(
+            notification_id="n1", title="Sale", body="Today only", priority_level=1
+        )
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=self.NOW))
+        scorer = BroadcastScorer(analyzer.channel_evaluator, notification)
+
+        with patch.object(
+            analyzer.channel_evaluator,
+            "evaluate_channel",
+            wraps=analyzer.channel_evaluator.evaluate_channel,
+        ) as evaluate:
+            rankings = [scorer.rank(recipient) for recipient in recipients]
+
+        assert len(scorer) == 2
+        assert scorer.hits == 998
+        assert evaluate.call_count == 4
+        assert rankings[0] is rankings[2]
+
+    @pytest.mark.parametrize("priority_level", [0, 2])
+    def test_explanations_match_scores(self, population, priority_level):
+        """Test that explanations come from the scoring pass itself."""
+        recipients, environments = population
+        notification = NotificationContext(
+            notification_id="n1",
+            title="Weekly summary",
+            body="x" * 400,
+            priority_level=priority_level,
+            time_sensitive=True,
+        )
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=self.NOW))
+        evaluator = analyzer.channel_evaluator
+
+        for recipient, environment in zip(recipients, environments):
+            with patch.object(
+                evaluator, "evaluate_channel", wraps=evaluator.evaluate_channel
+            ) as evaluate:
+                explanation = analyzer.explain_channel_selection(
+                    recipient, notification, environment
+                )
+            expected = analyzer.get_optimal_channels(
+                recipient, notification, environment
+            )
+
+            channels = recipient.get_enabled_channels()
+            assert evaluate.call_count == len(channels)
+            assert explanation["recommended_channels"] == [c.name for c, _ in expected]
+            assert set(explanation["channel_explanations"]) == {
+                c.name for c in channels
+            }
+            for item in explanation["channel_explanations"].values():
+                total = 0.5 + sum(f["contribution"] for f in item["factors"])
+                assert item["score"] == pytest.approx(max(0.0, min(total, 1.0)))
@@ -0,0 +1,187 @@
+"""
+Tests for frequency capping.
+
+This module contains tests for the sliding-window frequency capper and its
+use by the context analyzer.
+"""
+
+import math
+import time
+
+import pytest
+
+from llama_notifications.capping import CapRule, FrequencyCapper
+from llama_notifications.context import (
+    ChannelType,
+    ContextAnalyzer,
+    NotificationContext,
+    RecipientColumns,
+    RecipientContext,
+    UserPreferences,
+)
+
+HOUR = 3600.0
+DAY = 86400.0
+
+
+@pytest.fixture
+def capper():
+    """Create a capper with hourly and daily push caps and a daily SMS cap."""
+    return FrequencyCapper(
+        [
+            CapRule(ChannelType.PUSH, limit=3, window_seconds=HOUR),
+            CapRule(ChannelType.PUSH, limit=5, window_seconds=DAY),
+            CapRule(ChannelType.SMS, limit=1, window_seconds=DAY),
+        ],
+        sub_buckets=12,
+    )
+
+
+class TestFrequencyCapper:
+    """Tests for the frequency capper."""
+
+    def test_hourly_cap(self, capper):
+        """Test that a channel is capped once its limit is reached."""
+        now = 1_000_000.0
+        for i in range(3):
+            assert not capper.is_capped("u1", ChannelType.PUSH, now + i)
+            capper.record("u1", ChannelType.PUSH, now + i)
+
+        assert capper.is_capped("u1", ChannelType.PUSH, now + 10)
+        assert not capper.is_capped("u2", ChannelType.PUSH, now + 10)
+        assert not capper.is_capped("u1", ChannelType.EMAIL, now + 10)
+
+        # The window slides past the sends after an hour
+        assert not capper.is_capped("u1", ChannelType.PUSH, now + HOUR + 400)
+
+    def test_daily_cap_outlasts_hourly(self, capper):
+        """Test that every rule of a channel is enforced."""
+        now = 1_000_000.0
+        for hour in range(5):
+            assert capper.try_record("u1", ChannelType.PUSH, now + hour * HOUR)
+
+        later = now + 6 * HOUR
+        assert capper.is_capped("u1", ChannelType.PUSH, later)
+        assert not capper.try_record("u1", ChannelType.PUSH, later)
+
+        until = capper.capped_until("u1", ChannelType.PUSH, later)
+        # Sub-buckets make the window up to one sub-bucket shorter
+        assert now + DAY - DAY / 12 < until <= now + DAY
+        assert not capper.is_capped("u1", ChannelType.PUSH, until)
+
+    def test_capped_until_uncapped(self, capper):
+        """Test that uncapped channels have no deferral time."""
+        assert capper.capped_until("u1", ChannelType.SMS, 0.0) is None
+        assert capper.capped_until("u1", ChannelType.EMAIL, 0.0) is None
+
+    def test_zero_limit(self):
+        """Test that a zero limit blocks a channel outright."""
+        capper = FrequencyCapper([CapRule(ChannelType.SMS, 0, DAY)])
+
+        assert capper.is_capped("u1", ChannelType.SMS, 0.0)
+        assert not capper.try_record("u1", ChannelType.SMS, 0.0)
+        assert capper.capped_until("u1", ChannelType.SMS, 0.0) == math.inf
+
+    def test_bounded_keys(self, capper):
+        """Test that the least recently used keys are evicted."""
+        capper = FrequencyCapper(capper.rules[ChannelType.SMS], max_keys=10)
+        for i in range(25):
+            capper.record(f"u{i}", ChannelType.SMS, 0.0)
+
+        assert len(capper) == 10
+        assert capper.get_stats() == {"keys": 10, "evictions": 15}
+        assert capper.is_capped("u24", ChannelType.SMS, 1.0)
+
+    def test_purge(self, capper):
+        """Test that keys with empty windows are purged."""
+        capper.record("u1", ChannelType.SMS, 0.0)
+        capper.record("u2", ChannelType.SMS, DAY)
+
+        assert capper.purge(DAY + 10) == 1
+        assert len(capper) == 1
+
+    @pytest.mark.parametrize(
+        "rule",
+        [
+            {"limit": -1, "window_seconds": HOUR},
+            {"limit": 1, "window_seconds": 0},
+        ],
+    )
+    def test_invalid_rule(self, rule):
+        """Test that invalid rules are rejected."""
+        with pytest.raises(ValueError):
+            CapRule(ChannelType.PUSH, **rule)
+
+
+class TestCappedChannelSelection:
+    """Tests for frequency caps in channel selection."""
+
+    @pytest.fixture
+    def recipient(self):
+        """Create a recipient with all channels available."""
+        return RecipientContext(
+            user_id="user123",
+            preferences=UserPreferences(
+                user_id="user123",
+                preferred_channels=[ChannelType.SMS, ChannelType.PUSH],
+            ),
+            push_token="token",
+            phone="+1234567890",
+            email="user@example.com",
+            device_active=True,
+        )
+
+    @pytest.fixture
+    def notification(self):
+        """Create a high-priority notification."""
+        return NotificationContext(
+            notification_id="n1",
+            title="Security alert",
+            body="New sign-in",
+            priority_level=2,
+        )
+
+    def test_capped_channel_left_out(self, capper, recipient, notification):
+        """Test that capped channels are not selected."""
+        analyzer = ContextAnalyzer(frequency_capper=capper)
+        uncapped = [
+            c for c, _ in analyzer.get_optimal_channels(recipient, notification)
+        ]
+        assert ChannelType.SMS in uncapped
+
+        capper.record("user123", ChannelType.SMS)
+        capped = [c for c, _ in analyzer.get_optimal_channels(recipient, notification)]
+        assert capped == [c for c in uncapped if c != ChannelType.SMS]
+        assert analyzer.capped_until(recipient) is None
+
+        recipients = RecipientColumns.from_contexts([recipient])
+        many = analyzer.get_optimal_channels_many(recipients, notification)
+        assert [c for c, _ in many[0]] == capped
+
+    def test_defer_when_all_capped(self, recipient, notification):
+        """Test the deferral time when every channel is capped."""
+        capper = FrequencyCapper(
+            [CapRule(channel, 1, HOUR) for channel in ChannelType], sub_buckets=4
+        )
+        analyzer = ContextAnalyzer(frequency_capper=capper)
+        now = time.time()
+        for channel in ChannelType:
+            capper.record("user123", channel, now)
+
+        assert analyzer.get_optimal_channels(recipient, notification) == []
+        until = analyzer.capped_until(recipient, now)
+        assert now < until <= now + HOUR
+
+    def test_explanation_flags_capped_channel(self, capper, recipient, notification):
+        """Test that explanations keep capped channels but don't recommend them."""
+        analyzer = ContextAnalyzer(frequency_capper=capper)
+        capper.record("user123", ChannelType.SMS)
+
+        explanation = analyzer.explain_channel_selection(recipient, notification)
+
+        sms = explanation["channel_explanations"]["SMS"]
+        assert sms["factors"][-1]["factor"] == "frequency_cap"
+        assert "SMS" not in explanation["recommended_channels"]
+        assert explanation["recommended_channels"] == [
+            c.name for c, _ in analyzer.get_optimal_channels(recipient, notification)
+        ]
@@ -0,0 +1,158 @@
+"""
+Tests for pipeline clocks.
+
+This module contains tests for the cached and virtual clocks and for
+injecting a clock into context analysis.
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    from backports.zoneinfo import ZoneInfo
+
+from llama_notifications.clock import (
+    CachedClock,
+    SystemClock,
+    VirtualClock,
+    get_clock,
+    set_clock,
+)
+from llama_notifications.context import (
+    ChannelType,
+    ContextAnalyzer,
+    EnvironmentContext,
+    NotificationContext,
+    RecipientContext,
+    UserPreferences,
+)
+
+
+def timestamp(*args):
+    """Unix timestamp of a UTC wall-clock time."""
+    return datetime(*args, tzinfo=ZoneInfo("UTC")).timestamp()
+
+
+class TestClocks:
+    """Tests for the clock implementations."""
+
+    def test_cached_clock_ticks(self):
+        """Test that a cached clock only reads its source on tick."""
+        source = VirtualClock(start=100.0)
+        clock = CachedClock(source)
+
+        source.advance(5)
+        assert clock.time() == 100.0
+        assert clock.tick() == 105.0
+        assert clock.time() == 105.0
+
+    def test_cached_clock_avoids_syscalls(self):
+        """Test that reading a cached clock doesn't call time.time()."""
+        clock = CachedClock(SystemClock())
+        with patch("time.time", side_effect=AssertionError) as mock_time:
+            for _ in range(100):
+                clock.time()
+        assert mock_time.call_count == 0
+
+    def test_virtual_clock_timers(self):
+        """Test that timers run in time order at their scheduled time."""
+        clock = VirtualClock(start=0.0)
+        fired = []
+        clock.call_at(30.0, lambda: fired.append(("b", clock.time())))
+        clock.call_at(10.0, lambda: fired.append(("a", clock.time())))
+        clock.call_at(
+            10.0, lambda: clock.call_at(20.0, lambda: fired.append(("c", clock.time())))
+        )
+
+        assert clock.advance(25) == 3
+        assert fired == [("a", 10.0), ("c", 20.0)]
+        assert clock.time() == 25.0
+        assert clock.pending() == 1
+
+        clock.sleep(100)
+        assert fired[-1] == ("b", 30.0)
+        assert clock.time() == 125.0
+
+    def test_virtual_clock_forward_only(self):
+        """Test that a virtual clock can't move backwards."""
+        clock = VirtualClock(start=0.0)
+        with pytest.raises(ValueError):
+            clock.advance(-1)
+
+        clock.advance_to(-50)
+        assert clock.time() == 0.0
+
+    def test_default_clock(self):
+        """Test replacing the process-wide default clock."""
+        virtual = VirtualClock(start=timestamp(2024, 1, 1, 12))
+        previous = set_clock(virtual)
+        try:
+            assert get_clock() is virtual
+            assert EnvironmentContext().current_time == virtual.time()
+        finally:
+            set_clock(previous)
+        assert get_clock() is previous
+
+
+class TestClockInjection:
+    """Tests for context analysis with an injected clock."""
+
+    @pytest.fixture
+    def recipient(self):
+        """Create a recipient with overnight push DND."""
+        return RecipientContext(
+            user_id="user123",
+            preferences=UserPreferences(
+                user_id="user123",
+                preferred_channels=[ChannelType.PUSH, ChannelType.EMAIL],
+                do_not_disturb={ChannelType.PUSH: [(22, 7)]},
+            ),
+            push_token="token",
+            email="user@example.com",
+        )
+
+    @pytest.fixture
+    def notification(self):
+        """Create a low-priority notification expiring at 23:30 UTC."""
+        return NotificationContext(
+            notification_id="n1",
+            title="Weekly digest",
+            body="Your summary is ready",
+            priority_level=0,
+            expires_at=timestamp(2024, 1, 1, 23, 30),
+        )
+
+    def test_simulated_day(self, recipient, notification):
+        """Test channel selection driven by a virtual clock."""
+        clock = VirtualClock(start=timestamp(2024, 1, 1, 12))
+        analyzer = ContextAnalyzer(clock=clock)
+
+        def scores():
+            return dict(
+                analyzer.get_optimal_channels(
+                    recipient, notification, min_score_threshold=0.0
+                )
+            )
+
+        noon = scores()
+        clock.advance(11 * 3600)
+        night = scores()
+        assert night[ChannelType.PUSH] < noon[ChannelType.PUSH]
+        assert night[ChannelType.EMAIL] == noon[ChannelType.EMAIL]
+        assert not notification.is_expired(clock.time())
+
+        clock.advance(3600)
+        assert notification.is_expired(clock.time())
+
+    def test_one_time_per_call(self, recipient, notification):
+        """Test that the clock is read once per channel selection."""
+        clock = CachedClock(VirtualClock(start=timestamp(2024, 1, 1, 12)))
+        analyzer = ContextAnalyzer(clock=clock)
+
+        with patch.object(clock, "time", wraps=clock.time) as mock_time:
+            analyzer.get_optimal_channels(recipient, notification)
+        assert mock_time.call_count == 1
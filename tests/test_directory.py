@@ -0,0 +1,194 @@
+"""
+Tests for the recipient directory.
+
+This module contains tests for building, saving and memory-mapping the
+columnar recipient directory and for its recipient views.
+"""
+
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    from backports.zoneinfo import ZoneInfo
+
+from llama_notifications.context import (
+    ChannelType,
+    ContextAnalyzer,
+    EnvironmentContext,
+    NotificationContext,
+    RecipientColumns,
+    RecipientContext,
+    UserPreferences,
+)
+from llama_notifications.directory import (
+    DirectoryFormatError,
+    RecipientDirectory,
+    StringTable,
+)
+
+TIMEZONES = ["UTC", "America/New_York", "Asia/Tokyo", "Europe/Berlin"]
+
+
+@pytest.fixture
+def recipients():
+    """Create a random population of recipients."""
+    rng = random.Random(11)
+    channels = list(ChannelType)
+    population = []
+    for i in range(200):
+        preferences = None
+        if rng.random() < 0.8:
+            preferences = UserPreferences(
+                user_id=f"user{i}",
+                preferred_channels=rng.sample(channels, rng.randint(0, 3)),
+                do_not_disturb=rng.choice(
+                    [{}, {ChannelType.PUSH: [(22, 7)]}, {ChannelType.SMS: [(0, 24)]}]
+                ),
+                timezone=rng.choice(TIMEZONES),
+                language=rng.choice(["en", "de", "ja"]),
+            )
+        population.append(
+            RecipientContext(
+                user_id=f"user{i}",
+                preferences=preferences,
+                push_enabled=rng.random() < 0.9,
+                push_token=f"token-{i}" if rng.random() < 0.7 else None,
+                sms_enabled=rng.random() < 0.9,
+                phone=f"+1555{i:07d}" if rng.random() < 0.5 else None,
+                email=f"user{i}@example.com" if rng.random() < 0.8 else None,
+                device_active=rng.random() < 0.3,
+                last_active=rng.choice([None, 1_000_000.0, 1_700_000_000.0]),
+            )
+        )
+    return population
+
+
+@pytest.fixture
+def directory(recipients):
+    """Build a directory from the recipients."""
+    return RecipientDirectory.from_contexts(recipients)
+
+
+class TestStringTable:
+    """Tests for string tables."""
+
+    def test_round_trip(self):
+        """Test storing and reading back strings."""
+        table = StringTable.from_strings(["a", None, "ünïcode", ""])
+
+        assert len(table) == 4
+        assert [table[i] for i in range(4)] == ["a", "", "ünïcode", ""]
+
+    def test_empty(self):
+        """Test an empty table."""
+        assert len(StringTable.from_strings([])) == 0
+
+
+class TestRecipientDirectory:
+    """Tests for the recipient directory."""
+
+    def test_views_match_contexts(self, recipients, directory):
+        """Test that views expose the same attributes as the contexts."""
+        now = datetime(2024, 1, 1, 23, tzinfo=ZoneInfo("UTC")).timestamp()
+        for recipient in recipients:
+            view = directory.get(recipient.user_id)
+            assert view.user_id == recipient.user_id
+            assert view.get_enabled_channels() == recipient.get_enabled_channels()
+            assert view.push_token == recipient.push_token
+            assert view.email == recipient.email
+            assert view.sms_enabled == recipient.sms_enabled
+            assert view.device_active == recipient.device_active
+            assert view.last_active == recipient.last_active
+
+            preferences = recipient.preferences
+            if preferences is None:
+                assert view.preferences is None
+                continue
+            assert view.preferences.preferred_channels == (
+                preferences.preferred_channels
+            )
+            assert view.preferences.timezone == preferences.timezone
+            assert view.preferences.language == preferences.language
+            assert view.preferences.dnd_masks == preferences.dnd_masks
+            for channel in ChannelType:
+                assert view.preferences.is_dnd_active(
+                    channel, now
+                ) == preferences.is_dnd_active(channel, now)
+
+    def test_find(self, directory):
+        """Test looking up users by id."""
+        assert directory.user_ids[directory.find("user42")] == "user42"
+        assert directory.find("nobody") == -1
+        assert directory.get("nobody") is None
+        assert directory.rows(["user1", "nobody"]).tolist()[1] == -1
+
+    def test_recipient_columns(self, recipients, directory):
+        """Test that directory columns match columns built from contexts."""
+        now = datetime(2024, 1, 1, 23, tzinfo=ZoneInfo("UTC")).timestamp()
+        environments = [
+            EnvironmentContext(app_state="foreground", network_type="offline")
+        ] * len(recipients)
+        expected = RecipientColumns.from_contexts(recipients, environments, now)
+
+        rows = directory.rows([recipient.user_id for recipient in recipients])
+        actual = directory.recipient_columns(rows, environments, now)
+
+        assert actual.user_ids == expected.user_ids
+        for name in (
+            "available",
+            "dnd",
+            "dnd_ends",
+            "device_active",
+            "recently_active",
+            "app_foreground",
+            "offline",
+            "default_environment",
+        ):
+            assert np.array_equal(getattr(actual, name), getattr(expected, name))
+        assert np.allclose(actual.preference_boost, expected.preference_boost)
+
+    def test_analyzer_accepts_views(self, recipients, directory):
+        """Test that channel selection works on recipient views."""
+        analyzer = ContextAnalyzer()
+        notification = NotificationContext(
+            notification_id="n1", title="Hi", body="Hello", priority_level=2
+        )
+        for recipient in recipients[:20]:
+            view = directory.get(recipient.user_id)
+            assert analyzer.get_optimal_channels(
+                view, notification
+            ) == analyzer.get_optimal_channels(recipient, notification)
+
+    def test_save_and_load(self, directory, tmp_path):
+        """Test that a saved directory maps back with identical columns."""
+        path = str(tmp_path / "recipients.dir")
+        checksum = directory.save(path)
+        loaded = RecipientDirectory.load(path, verify=True)
+
+        assert len(checksum) == 64
+        assert len(loaded) == len(directory)
+        assert set(loaded.columns) == set(directory.columns)
+        for name, column in directory.columns.items():
+            assert loaded.columns[name].tobytes() == column.tobytes()
+            assert not loaded.columns[name].flags.writeable
+        assert loaded.get("user7").email == directory.get("user7").email
+
+    def test_corrupted_file(self, directory, tmp_path):
+        """Test that corrupted files are rejected."""
+        path = tmp_path / "recipients.dir"
+        directory.save(str(path))
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(DirectoryFormatError):
+            RecipientDirectory.load(str(path), verify=True)
+
+        path.write_bytes(b"not a directory" * 10)
+        with pytest.raises(DirectoryFormatError):
+            RecipientDirectory.load(str(path))
@@ -0,0 +1,291 @@
+"""
+Tests for Do Not Disturb schedules.
+
+This module contains tests for compiling DND ranges into slot bitmasks and
+for timezone-aware DND checks and deferral.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    from backports.zoneinfo import ZoneInfo
+
+from llama_notifications.batch import RequestBatch
+from llama_notifications.clock import VirtualClock
+from llama_notifications.context import (
+    ChannelType,
+    ContextAnalyzer,
+    NotificationContext,
+    RecipientColumns,
+    RecipientContext,
+    UserPreferences,
+)
+from llama_notifications.dnd import (
+    SLOTS_PER_HOUR,
+    compile_dnd_ranges,
+    is_slot_set,
+    local_slot,
+    next_allowed_time,
+)
+
+
+def timestamp(tz_name, *args):
+    """Unix timestamp of a local wall-clock time."""
+    return datetime(*args, tzinfo=ZoneInfo(tz_name)).timestamp()
+
+
+class TestCompileRanges:
+    """Tests for compiling DND ranges."""
+
+    @pytest.mark.parametrize(
+        "ranges,hour,expected",
+        [
+            ([(9, 17)], 9, True),
+            ([(9, 17)], 17, False),
+            ([(22, 6)], 23, True),
+            ([(22, 6)], 3, True),
+            ([(22, 6)], 6, False),
+            ([(22, 6)], 12, False),
+            ([(5, 5)], 5, False),
+            ([(0, 24)], 23, True),
+        ],
+    )
+    def test_ranges(self, ranges, hour, expected):
+        """Test simple and overnight ranges against the scalar rule."""
+        mask = compile_dnd_ranges(ranges)
+        assert is_slot_set(mask, hour * SLOTS_PER_HOUR) is expected
+
+    def test_quarter_hours(self):
+        """Test 15-minute resolution."""
+        mask = compile_dnd_ranges([(12.25, 12.75)])
+        slots = [slot for slot in range(96) if is_slot_set(mask, slot)]
+        assert slots == [49, 50]
+
+
+class TestTimezoneAwareDnd:
+    """Tests for DND checks in the user's timezone."""
+
+    def test_uses_user_timezone(self):
+        """Test that DND follows the user's local time."""
+        preferences = UserPreferences(
+            user_id="u1",
+            preferred_channels=[ChannelType.PUSH],
+            do_not_disturb={ChannelType.PUSH: [(22, 7)]},
+            timezone="Asia/Tokyo",
+        )
+        # 23:00 in Tokyo is 14:00 UTC
+        assert preferences.is_dnd_active(
+            ChannelType.PUSH, timestamp("Asia/Tokyo", 2024, 5, 1, 23, 0)
+        )
+        assert not preferences.is_dnd_active(
+            ChannelType.PUSH, timestamp("Asia/Tokyo", 2024, 5, 1, 12, 0)
+        )
+        assert not preferences.is_dnd_active(ChannelType.SMS)
+
+    def test_dst_transition(self):
+        """Test that local slots follow daylight saving changes."""
+        tz_name = "America/New_York"
+        # Before and after the spring-forward transition on 2024-03-10
+        assert local_slot(tz_name, timestamp(tz_name, 2024, 3, 10, 1, 45)) == 7
+        assert local_slot(tz_name, timestamp(tz_name, 2024, 3, 10, 3, 0)) == 12
+        assert local_slot(tz_name, timestamp(tz_name, 2024, 7, 1, 8, 0)) == 32
+
+    def test_ranges_recompile_on_assignment(self):
+        """Test that replacing the ranges updates the bitmasks."""
+        preferences = UserPreferences(user_id="u1", preferred_channels=[])
+        preferences.do_not_disturb = {ChannelType.EMAIL: [(0, 24)]}
+        assert preferences.is_dnd_active(ChannelType.EMAIL)
+
+    def test_ranges_recompile_on_edit(self):
+        """Test that editing the ranges in place updates the bitmasks."""
+        preferences = UserPreferences(user_id="u1", preferred_channels=[])
+        preferences.do_not_disturb[ChannelType.PUSH] = [(0, 12)]
+        assert preferences.is_dnd_active(ChannelType.PUSH, 3600.0)
+
+        preferences.do_not_disturb[ChannelType.PUSH].append((12, 24))
+        assert preferences.is_dnd_active(ChannelType.PUSH, 13 * 3600.0)
+
+        del preferences.do_not_disturb[ChannelType.PUSH]
+        assert not preferences.is_dnd_active(ChannelType.PUSH, 3600.0)
+
+    def test_unknown_timezone_falls_back_to_utc(self):
+        """Test that an invalid timezone name doesn't break DND checks."""
+        assert local_slot("Not/AZone", 3600.0) == 4
+
+
+class TestNextAllowedTime:
+    """Tests for finding the end of a DND period."""
+
+    def test_overnight_range(self):
+        """Test that an overnight range ends the next local morning."""
+        tz_name = "Asia/Tokyo"
+        mask = compile_dnd_ranges([(22, 7)])
+
+        assert next_allowed_time(
+            mask, tz_name, timestamp(tz_name, 2024, 5, 1, 23, 10)
+        ) == timestamp(tz_name, 2024, 5, 2, 7, 0)
+        assert next_allowed_time(
+            mask, tz_name, timestamp(tz_name, 2024, 5, 2, 3, 0)
+        ) == timestamp(tz_name, 2024, 5, 2, 7, 0)
+
+    def test_not_active(self):
+        """Test that the current time is returned outside DND."""
+        now = timestamp("UTC", 2024, 5, 1, 12, 5)
+        assert next_allowed_time(compile_dnd_ranges([(22, 7)]), "UTC", now) == now
+        assert next_allowed_time(0, "UTC", now) == now
+
+    def test_adjacent_ranges_and_full_day(self):
+        """Test that adjacent ranges merge and all-day DND never ends."""
+        mask = compile_dnd_ranges([(20, 24), (0, 6), (6, 8)])
+        assert next_allowed_time(
+            mask, "UTC", timestamp("UTC", 2024, 5, 1, 21)
+        ) == timestamp("UTC", 2024, 5, 2, 8)
+        assert next_allowed_time(compile_dnd_ranges([(0, 24)]), "UTC") is None
+
+    def test_dst_transition(self):
+        """Test the DND end across a spring-forward night."""
+        tz_name = "America/New_York"
+        mask = compile_dnd_ranges([(22, 7)])
+        end = next_allowed_time(mask, tz_name, timestamp(tz_name, 2024, 3, 9, 23))
+
+        assert end == timestamp(tz_name, 2024, 3, 10, 7, 0)
+        assert end - timestamp(tz_name, 2024, 3, 9, 23) == 7 * 3600
+
+        # DND ending at a wall time skipped by the transition
+        mask = compile_dnd_ranges([(1, 2.5)])
+        end = next_allowed_time(mask, tz_name, timestamp(tz_name, 2024, 3, 10, 1, 50))
+        assert end == timestamp(tz_name, 2024, 3, 10, 3, 0)
+
+
+class TestDndDeferral:
+    """Tests for deferring notifications until DND ends."""
+
+    @pytest.fixture
+    def recipient(self):
+        """Create a recipient preferring push, with overnight push DND."""
+        return RecipientContext(
+            user_id="u1",
+            preferences=UserPreferences(
+                user_id="u1",
+                preferred_channels=[ChannelType.PUSH, ChannelType.EMAIL],
+                do_not_disturb={ChannelType.PUSH: [(22, 7)]},
+                timezone="Europe/Berlin",
+            ),
+            push_token="token",
+            email="u1@example.com",
+            device_active=True,
+        )
+
+    @pytest.mark.parametrize("priority_level,deferred", [(0, True), (2, False)])
+    def test_defers_until_dnd_ends(self, recipient, priority_level, deferred):
+        """Test that low-priority notifications wait for the best channel."""
+        now = timestamp("Europe/Berlin", 2024, 5, 1, 23, 20)
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=now), dnd_deferral=True)
+        notification = NotificationContext(
+            notification_id="n1",
+            title="Weekly digest",
+            body="Ready",
+            priority_level=priority_level,
+        )
+
+        until = analyzer.dnd_until(recipient, notification)
+        channels = analyzer.get_optimal_channels(recipient, notification)
+
+        if deferred:
+            assert until == timestamp("Europe/Berlin", 2024, 5, 2, 7, 0)
+            assert channels == []
+            assert analyzer.get_optimal_channels_broadcast(
+                [recipient], notification
+            ) == [[]]
+        else:
+            assert until is None
+            assert channels[0][0] == ChannelType.PUSH
+
+    @pytest.mark.parametrize("priority_level", [0, 2])
+    def test_explanation_matches_deferral(self, recipient, priority_level):
+        """Test that explanations recommend nothing for deferred notifications."""
+        now = timestamp("Europe/Berlin", 2024, 5, 1, 23, 20)
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=now), dnd_deferral=True)
+        notification = NotificationContext(
+            notification_id="n1",
+            title="Weekly digest",
+            body="Ready",
+            priority_level=priority_level,
+        )
+
+        explanation = analyzer.explain_channel_selection(recipient, notification)
+        expected = analyzer.get_optimal_channels(recipient, notification)
+
+        assert explanation["recommended_channels"] == [c.name for c, _ in expected]
+        assert explanation["deferred_until"] == analyzer.dnd_until(
+            recipient, notification
+        )
+        assert set(explanation["channel_explanations"]) == {"PUSH", "EMAIL"}
+
+    def test_no_deferral_outside_dnd(self, recipient):
+        """Test that nothing is deferred when the best channel is free."""
+        now = timestamp("Europe/Berlin", 2024, 5, 1, 12, 0)
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=now), dnd_deferral=True)
+        notification = NotificationContext(
+            notification_id="n1", title="Hi", body="Hello", priority_level=0
+        )
+
+        assert analyzer.dnd_until(recipient, notification) is None
+        assert analyzer.get_optimal_channels(recipient, notification)
+
+    @pytest.mark.parametrize("priority_level", [0, 2])
+    @pytest.mark.parametrize("push_dnd", [(22, 7), (0, 24)])
+    def test_every_path_defers(self, recipient, priority_level, push_dnd):
+        """Test that batch and vectorized paths defer like the scalar path."""
+        recipient.preferences.do_not_disturb = {ChannelType.PUSH: [push_dnd]}
+        now = timestamp("Europe/Berlin", 2024, 5, 1, 23, 20)
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=now), dnd_deferral=True)
+        notification = NotificationContext(
+            notification_id="n1",
+            title="Weekly digest",
+            body="Ready",
+            priority_level=priority_level,
+        )
+        request = SimpleNamespace(
+            notification_id="n1",
+            content=SimpleNamespace(title="Weekly digest", body="Ready"),
+            recipient=recipient,
+            channels=list(ChannelType),
+            priority=SimpleNamespace(value=priority_level),
+            context={},
+        )
+
+        expected = analyzer.get_optimal_channels(recipient, notification)
+        columns = RecipientColumns.from_contexts([recipient], now=now)
+
+        # DND all day never ends, so there is nothing to wait for
+        assert (expected == []) == (priority_level < 2 and push_dnd == (22, 7))
+        assert analyzer.get_optimal_channels_columns(
+            RequestBatch.from_requests([request]), [recipient]
+        ) == [expected]
+        assert analyzer.get_optimal_channels_many(columns, notification) == [expected]
+        assert analyzer.get_optimal_channels_broadcast([recipient], notification) == [
+            expected
+        ]
+
+    def test_deferral_scores_channels_once(self, recipient):
+        """Test that the deferral decision reuses the ranking pass."""
+        now = timestamp("Europe/Berlin", 2024, 5, 1, 23, 20)
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=now), dnd_deferral=True)
+        notification = NotificationContext(
+            notification_id="n1", title="Hi", body="Hello", priority_level=0
+        )
+        evaluator = analyzer.channel_evaluator
+
+        with patch.object(
+            evaluator, "evaluate_channel", wraps=evaluator.evaluate_channel
+        ) as evaluate:
+            assert analyzer.get_optimal_channels(recipient, notification) == []
+
+        assert evaluate.call_count == len(recipient.get_enabled_channels())
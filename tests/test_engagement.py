@@ -0,0 +1,181 @@
+"""
+Tests for engagement statistics.
+
+This module contains tests for the decayed receipt histograms of the
+engagement store and for their use in priority routing.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from llama_notifications.batch import RequestBatch
+from llama_notifications.clock import VirtualClock, set_clock
+from llama_notifications.engagement import EngagementStore, ReceiptEvent, hour_of_week
+from llama_notifications.priority import NotificationRequest, PriorityRouter
+from llama_notifications.spam_filter import NotificationContent
+
+DAY = 86400.0
+MONDAY = 1714348800.0  # 2024-04-29 00:00 UTC
+
+
+def receive(store, user_id, timestamp, opened=True, clicked=False):
+    """Record a delivery and its follow-up receipts."""
+    store.record(user_id, ReceiptEvent.DELIVERED, timestamp)
+    if opened:
+        store.record(user_id, ReceiptEvent.OPENED, timestamp + 60)
+    if clicked:
+        store.record(user_id, ReceiptEvent.CLICKED, timestamp + 120)
+
+
+class TestEngagementStore:
+    """Tests for the engagement store."""
+
+    def test_hour_of_week(self):
+        """Test that hours of the week start on Monday UTC."""
+        assert hour_of_week(MONDAY) == 0
+        assert hour_of_week(MONDAY + 9.5 * 3600) == 9
+        assert hour_of_week(MONDAY + 7 * DAY - 1) == 167
+
+    def test_engagement(self):
+        """Test engagement rates and the neutral default."""
+        store = EngagementStore(landmark=MONDAY, prior_weight=0.0)
+        for day in range(10):
+            receive(store, "engaged", MONDAY + day * DAY, clicked=True)
+            receive(store, "ignores", MONDAY + day * DAY, opened=False)
+
+        now = MONDAY + 10 * DAY
+        assert store.engagement("engaged", now) == pytest.approx(1.0)
+        assert store.engagement("ignores", now) == 0.0
+        assert store.engagement("nobody", now) == 0.5
+        assert store.engagement_many(["ignores", None, "engaged"], now) == (
+            pytest.approx([0.0, 0.5, 1.0])
+        )
+
+    def test_decay(self):
+        """Test that old receipts count for less than recent ones."""
+        store = EngagementStore(half_life_days=1.0, landmark=MONDAY, prior_weight=0.0)
+        for day in range(5):
+            receive(store, "u1", MONDAY + day * 0.01, opened=True)
+        for day in range(5):
+            receive(store, "u1", MONDAY + 10 * DAY + day * 0.01, opened=False)
+
+        # The ignored recent deliveries outweigh the opened old ones ~1000:1
+        assert store.engagement("u1", MONDAY + 10 * DAY) < 0.001
+
+    def test_prior_fades_with_age(self):
+        """Test that the prior dominates once a user's receipts are old."""
+        store = EngagementStore(half_life_days=1.0, landmark=MONDAY)
+        for _ in range(20):
+            receive(store, "u1", MONDAY, opened=False)
+
+        assert store.engagement("u1", MONDAY) < 0.1
+        assert store.engagement("u1", MONDAY + 30 * DAY) == pytest.approx(0.5, 1e-3)
+
+    def test_landmark_rescaling(self):
+        """Test that moving the landmark doesn't change rates."""
+        store = EngagementStore(half_life_days=1.0, landmark=MONDAY, prior_weight=0.0)
+        receive(store, "u1", MONDAY, clicked=True)
+        receive(store, "u1", MONDAY + 100 * DAY, opened=False)
+
+        assert store.landmark > MONDAY
+        assert np.isfinite(store._counts).all()
+        assert store.engagement("u1", MONDAY + 100 * DAY) == pytest.approx(
+            0.0, abs=1e-9
+        )
+
+    def test_bounded_users(self):
+        """Test that the least recently updated users are evicted."""
+        store = EngagementStore(max_users=3, landmark=MONDAY)
+        for user_id in ["a", "b", "c"]:
+            receive(store, user_id, MONDAY)
+        receive(store, "a", MONDAY + 60)
+        receive(store, "d", MONDAY + 120)
+
+        assert len(store) == 3
+        assert store.hourly_engagement("b") is None
+        assert store.hourly_engagement("a") is not None
+        assert store.get_stats() == {"users": 3, "rows": 3, "evictions": 1}
+
+    def test_best_time(self):
+        """Test finding the most engaging upcoming hour."""
+        store = EngagementStore(landmark=MONDAY)
+        for week in range(4):
+            for hour in range(24):
+                receive(
+                    store,
+                    "u1",
+                    MONDAY + week * 7 * DAY + hour * 3600,
+                    opened=hour == 19,
+                )
+
+        now = MONDAY + 28 * DAY + 8.5 * 3600  # Monday 08:30
+        evening = MONDAY + 28 * DAY + 19 * 3600
+        assert store.best_time("u1", now) == evening
+        assert store.best_time("u1", now, horizon_hours=6) == now
+        assert store.best_time("u1", now, deadline=evening - 1) == now
+        assert store.best_time("nobody", now) == now
+
+
+class TestEngagementRouting:
+    """Tests for engagement statistics in priority routing."""
+
+    @pytest.fixture
+    def store(self):
+        """Create a store with one engaged and one disengaged user."""
+        previous = set_clock(VirtualClock(start=MONDAY + DAY))
+        store = EngagementStore()
+        for hour in range(20):
+            receive(store, "fan", MONDAY + hour * 3600, clicked=True)
+            receive(store, "lurker", MONDAY + hour * 3600, opened=False)
+        yield store
+        set_clock(previous)
+
+    def test_feature_from_store(self, store):
+        """Test that stored engagement fills in the missing context value."""
+        router = PriorityRouter(engagement_store=store)
+        extractor = router.feature_extractor
+
+        def engagement(user_id, context=None):
+            request = NotificationRequest("n1", "Hi", "Hello", user_id, context)
+            return extractor.extract_features(request)["user_engagement"]
+
+        assert engagement("fan") > 0.9
+        assert engagement("lurker") < 0.1
+        assert engagement("nobody") == 0.5
+        assert engagement("lurker", {"user_engagement": 0.7}) == 0.7
+
+    def test_columns_match_requests(self, store):
+        """Test that columnar priorities read the same engagement."""
+        router = PriorityRouter(engagement_store=store)
+        users = ["fan", "lurker", "nobody", "lurker"]
+        contexts = [{}, {}, {}, {"user_engagement": 0.9}]
+        requests = [
+            SimpleNamespace(
+                notification_id=f"n{i}",
+                content=NotificationContent(title="Sale", body="Today only"),
+                recipient=SimpleNamespace(user_id=user_id, email="a@b"),
+                channels=[],
+                priority=SimpleNamespace(value=1),
+                context=context,
+            )
+            for i, (user_id, context) in enumerate(zip(users, contexts))
+        ]
+
+        batch = RequestBatch.from_requests(requests)
+        expected = [
+            router.evaluate_priority(
+                NotificationRequest(
+                    request.notification_id,
+                    "Sale",
+                    "Today only",
+                    request.recipient.user_id,
+                    request.context,
+                )
+            ).priority
+            for request in requests
+        ]
+
+        assert batch.user_ids == users
+        assert router.calculate_priority_columns(batch) == expected
@@ -0,0 +1,132 @@
+"""
+Tests for per-channel notification history.
+
+This module contains tests for the time-ordered history ring buffers and
+their window queries and counters.
+"""
+
+import random
+
+import pytest
+
+from llama_notifications.context import ChannelType, RecipientContext
+from llama_notifications.history import HistoryRing, NotificationHistory
+
+
+class TestHistoryRing:
+    """Tests for the ring buffer of one channel."""
+
+    def test_keeps_newest_entries(self):
+        """Test that the oldest notifications are overwritten at capacity."""
+        ring = HistoryRing(capacity=4)
+        for i in range(10):
+            ring.append(float(i), f"n{i}", i % 4)
+
+        assert len(ring) == 4
+        assert [n["notification_id"] for n in ring.since(0)] == [
+            "n6",
+            "n7",
+            "n8",
+            "n9",
+        ]
+        assert ring.since(8.0)[0] == {
+            "timestamp": 8.0,
+            "notification_id": "n8",
+            "priority": 0,
+        }
+
+    def test_out_of_order_insert(self):
+        """Test that late notifications are inserted in time order."""
+        ring = HistoryRing(capacity=8)
+        for ts in (1.0, 5.0, 3.0, 4.0, 2.0):
+            ring.append(ts, f"n{int(ts)}")
+
+        assert [n["timestamp"] for n in ring.since(0)] == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert ring.count_window(2.5, now=5.0) == 3
+
+    def test_bisect(self):
+        """Test binary search across the ring wrap-around."""
+        ring = HistoryRing(capacity=5)
+        for ts in range(8):
+            ring.append(float(ts), "n")
+
+        assert ring.bisect(0.0) == 0
+        assert ring.bisect(5.0) == 2
+        assert ring.bisect(5.0, right=True) == 3
+        assert ring.bisect(99.0) == 5
+
+    def test_window_counter_matches_scan(self):
+        """Test that incremental window counts match a full scan."""
+        rng = random.Random(7)
+        ring = HistoryRing(capacity=64)
+        timestamps = []
+        now = 0.0
+        for _ in range(500):
+            now += rng.uniform(0, 30)
+            ring.append(now, "n")
+            timestamps.append(now)
+            kept = timestamps[-64:]
+            for seconds in (60.0, 600.0):
+                expected = sum(1 for ts in kept if ts >= now - seconds)
+                assert ring.count_window(seconds, now) == expected
+
+        # Moving backwards in time falls back to a binary search
+        earlier = now - 300
+        expected = sum(1 for ts in timestamps[-64:] if earlier - 60 <= ts)
+        assert ring.count_window(60.0, earlier) == expected
+
+    def test_invalid_capacity(self):
+        """Test that a ring needs room for at least one entry."""
+        with pytest.raises(ValueError):
+            HistoryRing(capacity=0)
+
+
+class TestRecipientHistory:
+    """Tests for recipient-level history queries."""
+
+    @pytest.fixture
+    def recipient(self):
+        """Create a recipient with notifications on two channels."""
+        now = 1_000_000.0
+        return RecipientContext(
+            user_id="user123",
+            notification_history={
+                ChannelType.PUSH: [
+                    {"timestamp": now - 7200, "notification_id": "p1"},
+                    {"timestamp": now - 60, "notification_id": "p2"},
+                ],
+                ChannelType.EMAIL: [
+                    {"timestamp": now - 100000, "notification_id": "e1"},
+                    {"timestamp": now - 1800, "notification_id": "e2"},
+                ],
+            },
+        )
+
+    def test_recent_notifications(self, recipient, monkeypatch):
+        """Test window queries per channel and across channels."""
+        monkeypatch.setattr("time.time", lambda: 1_000_000.0)
+
+        push = recipient.get_recent_notifications(ChannelType.PUSH, hours=1)
+        assert [n["notification_id"] for n in push] == ["p2"]
+
+        merged = recipient.get_recent_notifications(hours=24)
+        assert [n["notification_id"] for n in merged] == ["p1", "e2", "p2"]
+        assert recipient.get_recent_notifications(ChannelType.SMS) == []
+
+    def test_record_and_count(self, recipient):
+        """Test recording notifications and counting them by window."""
+        now = 1_000_000.0
+        recipient.record_notification(ChannelType.PUSH, "p3", 2, timestamp=now)
+
+        assert recipient.count_recent_notifications(ChannelType.PUSH, 1, now) == 2
+        assert recipient.count_recent_notifications(hours=24, now=now) == 4
+        assert recipient.count_recent_notifications(ChannelType.SMS, now=now) == 0
+
+    def test_history_capacity(self):
+        """Test that history memory is bounded per channel."""
+        history = NotificationHistory(capacity=3)
+        for i in range(100):
+            history.record(ChannelType.SMS, float(i), f"s{i}")
+
+        assert len(history) == 3
+        assert history.channels() == [ChannelType.SMS]
@@ -0,0 +1,250 @@
+"""
+Tests for device presence.
+
+This module contains tests for ingesting heartbeats into the presence store
+and for presence-aware channel selection.
+"""
+
+import threading
+
+import pytest
+
+from llama_notifications.clock import VirtualClock
+from llama_notifications.context import (
+    ChannelType,
+    ContextAnalyzer,
+    EnvironmentContext,
+    NotificationContext,
+    RecipientColumns,
+    RecipientContext,
+    UserPreferences,
+)
+from llama_notifications.presence import Heartbeat, PresenceStore
+
+NOW = 1714557600.0  # 2024-05-01 10:00 UTC
+
+
+class TestPresenceStore:
+    """Tests for the presence store."""
+
+    def test_last_value_per_device(self):
+        """Test that each device keeps its latest state."""
+        store = PresenceStore()
+        applied = store.ingest(
+            [
+                Heartbeat("u1", "phone", NOW - 30, "background", "wifi", 0.9, 0.8),
+                Heartbeat("u1", "tablet", NOW - 20, "closed"),
+                Heartbeat("u1", "phone", NOW - 10, "foreground"),
+                Heartbeat("u1", "phone", NOW - 60, "closed"),
+            ]
+        )
+
+        assert applied == 3
+        latest = store.latest("u1")
+        assert latest.device_id == "phone"
+        assert latest.app_state == "foreground"
+        # Fields a heartbeat omits keep the device's previous value
+        assert latest.network_type == "wifi"
+        assert latest.battery_level == 0.8
+        assert [d.device_id for d in store.devices("u1")] == ["phone", "tablet"]
+        assert store.get_stats()["out_of_order"] == 1
+        assert store.latest("nobody") is None
+
+    def test_staleness(self):
+        """Test that old heartbeats no longer show the device as active."""
+        store = PresenceStore(stale_after=300)
+        store.record(Heartbeat("u1", "phone", NOW))
+
+        assert store.is_active("u1", NOW + 300)
+        assert not store.is_active("u1", NOW + 301)
+        assert not store.is_active("nobody", NOW)
+
+    def test_purge(self):
+        """Test that silent devices are dropped."""
+        store = PresenceStore(stale_after=60, retain_seconds=3600)
+        store.ingest(
+            [
+                Heartbeat("u1", "phone", NOW),
+                Heartbeat("u1", "laptop", NOW - 7200),
+                Heartbeat("u2", "phone", NOW - 7200),
+            ]
+        )
+
+        assert store.purge(NOW) == 2
+        assert [d.device_id for d in store.devices("u1")] == ["phone"]
+        assert len(store) == 1
+
+    def test_bounded_users(self):
+        """Test that the users heard from least recently are evicted."""
+        store = PresenceStore(max_users=2)
+        store.ingest([Heartbeat(f"u{i}", "phone", NOW + i) for i in range(3)])
+
+        assert len(store) == 2
+        assert store.latest("u0") is None
+        assert store.get_stats()["evictions"] == 1
+
+        store.record(Heartbeat("u1", "phone", NOW + 3))
+        store.record(Heartbeat("u3", "phone", NOW + 4))
+        assert store.latest("u2") is None
+        assert store.latest("u1") is not None
+        assert store.get_stats()["evictions"] == 2
+
+    @pytest.mark.parametrize(
+        "stale_after,retain_seconds,max_users", [(0, 60, 1), (60, 30, 1), (60, 60, 0)]
+    )
+    def test_invalid_settings(self, stale_after, retain_seconds, max_users):
+        """Test that invalid settings are rejected."""
+        with pytest.raises(ValueError):
+            PresenceStore(stale_after, retain_seconds, max_users)
+
+    def test_concurrent_reads(self):
+        """Test that readers see whole heartbeats while writers ingest."""
+        store = PresenceStore()
+        store.record(Heartbeat("u1", "phone", 0.0, "foreground", "wifi"))
+        errors = []
+
+        def read():
+            for _ in range(20000):
+                heartbeat = store.latest("u1")
+                if heartbeat is None or heartbeat.network_type != "wifi":
+                    errors.append(heartbeat)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for batch in range(200):
+            # Omitted network types are carried over from the previous heartbeat
+            store.ingest(
+                Heartbeat("u1", "phone", batch * 100 + i, "background")
+                for i in range(100)
+            )
+        reader.join()
+
+        assert errors == []
+
+
+class TestPresenceAwareSelection:
+    """Tests for channel selection using presence."""
+
+    @pytest.fixture
+    def recipient(self):
+        """Create a recipient whose caller knows nothing about the device."""
+        return RecipientContext(
+            user_id="u1",
+            preferences=UserPreferences("u1", [ChannelType.EMAIL, ChannelType.PUSH]),
+            push_token="token",
+            phone="+1555",
+            email="u1@example.com",
+        )
+
+    @pytest.fixture
+    def notification(self):
+        """Create a normal-priority notification."""
+        return NotificationContext(
+            notification_id="n1", title="New message", body="Hi", priority_level=1
+        )
+
+    def test_presence_fills_in_context(self, recipient, notification):
+        """Test that a fresh heartbeat matches caller-supplied context."""
+        store = PresenceStore()
+        store.record(
+            Heartbeat("u1", "phone", NOW - 5, "foreground", "offline", 0.9, 0.1)
+        )
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=NOW), presence_store=store)
+
+        expected = ContextAnalyzer(clock=VirtualClock(start=NOW)).get_optimal_channels(
+            RecipientContext(
+                user_id="u1",
+                preferences=recipient.preferences,
+                push_token="token",
+                phone="+1555",
+                email="u1@example.com",
+                device_active=True,
+                last_active=NOW - 5,
+            ),
+            notification,
+            EnvironmentContext(
+                current_time=NOW,
+                app_state="foreground",
+                network_type="offline",
+                network_quality=0.9,
+                battery_level=0.1,
+            ),
+        )
+
+        assert analyzer.get_optimal_channels(recipient, notification) == expected
+        assert analyzer.get_optimal_channels_broadcast([recipient], notification) == [
+            expected
+        ]
+        factors = analyzer.explain_channel_selection(recipient, notification)[
+            "channel_explanations"
+        ]["PUSH"]["factors"]
+        assert {"device_active", "app_state", "device_constraints"} <= {
+            factor["factor"] for factor in factors
+        }
+
+    def test_stale_presence(self, recipient, notification):
+        """Test that a stale heartbeat only contributes the last activity."""
+        store = PresenceStore(stale_after=60)
+        store.record(Heartbeat("u1", "phone", NOW - 600, "foreground"))
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=NOW), presence_store=store)
+
+        factors = analyzer.explain_channel_selection(recipient, notification)[
+            "channel_explanations"
+        ]["PUSH"]["factors"]
+        assert [factor["factor"] for factor in factors] == [
+            "user_preference",
+            "recent_activity",
+        ]
+
+    def test_caller_environment_wins(self, recipient, notification):
+        """Test that an explicit environment is not replaced by presence."""
+        store = PresenceStore()
+        store.record(Heartbeat("u1", "phone", NOW, "foreground"))
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=NOW), presence_store=store)
+        environment = EnvironmentContext(current_time=NOW, app_state="closed")
+
+        factors = analyzer.explain_channel_selection(
+            recipient, notification, environment
+        )["channel_explanations"]["PUSH"]["factors"]
+        names = [factor["factor"] for factor in factors]
+        assert "device_active" in names
+        assert "app_state" not in names
+
+    def test_vectorized_path_uses_presence(self, notification):
+        """Test that vectorized selection overlays presence like the scalar path."""
+        store = PresenceStore(stale_after=60)
+        store.ingest(
+            [
+                Heartbeat("u0", "phone", NOW - 5, "foreground", "offline", 0.3, 0.1),
+                Heartbeat("u1", "phone", NOW - 600, "foreground"),
+                Heartbeat("u2", "phone", NOW - 5, "background", "wifi", 0.2),
+            ]
+        )
+        analyzer = ContextAnalyzer(clock=VirtualClock(start=NOW), presence_store=store)
+        recipients = [
+            RecipientContext(
+                user_id=f"u{i}",
+                preferences=UserPreferences(f"u{i}", [ChannelType.EMAIL]),
+                push_token="token",
+                phone="+1555",
+                email=f"u{i}@example.com",
+            )
+            for i in range(4)
+        ]
+        # The caller's environment wins over presence for u2
+        environments = [
+            None,
+            None,
+            EnvironmentContext(current_time=NOW, app_state="closed"),
+            None,
+        ]
+
+        columns = RecipientColumns.from_contexts(recipients, environments, NOW)
+        results = analyzer.get_optimal_channels_many(columns, notification)
+
+        expected = [
+            analyzer.get_optimal_channels(recipient, notification, environment)
+            for recipient, environment in zip(recipients, environments)
+        ]
+        assert results == expected
+        assert len({tuple(result) for result in results}) == 4
@@ -0,0 +1,270 @@
+"""
+Tests for priority routing.
+
+This module contains tests for feature extraction and scoring in the
+priority router.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from llama_notifications.clock import VirtualClock
+from llama_notifications.priority import (
+    FEATURE_NAMES,
+    ContextFeatureExtractor,
+    NotificationRequest,
+    Priority,
+    PriorityRouter,
+    ThresholdCalibrator,
+)
+
+
+@pytest.fixture
+def requests():
+    """Create requests covering every priority level."""
+    contexts = [
+        {},
+        {"priority": "LOW", "user_engagement": 0.1, "business_impact": 0.0},
+        {"priority": "HIGH", "is_security_related": True},
+        {
+            "priority": 1.0,
+            "is_security_related": True,
+            "is_safety_related": True,
+            "content_importance": 1.0,
+        },
+        {"priority": "unknown", "time_sensitivity": 0.9},
+        {"is_time_critical": True},
+    ]
+    return [
+        NotificationRequest(
+            notification_id=f"n{i}",
+            content_title="Urgent reminder" if i % 2 else "Weekly digest",
+            content_body="Payment due in 2 hours" if i % 2 else "Here is your news",
+            recipient_id="u1",
+            context=context,
+        )
+        for i, context in enumerate(contexts)
+    ]
+
+
+class TestPriorityFeatures:
+    """Tests for dense priority feature extraction."""
+
+    def test_row_matches_dict(self, requests):
+        """Test that dense rows and feature dicts agree."""
+        extractor = ContextFeatureExtractor()
+        for request in requests:
+            row = np.empty(len(FEATURE_NAMES))
+            extractor.extract_features_into(request, row)
+            features = extractor.extract_features(request)
+
+            for name, value in zip(FEATURE_NAMES, row):
+                if np.isnan(value):
+                    assert name not in features
+                else:
+                    assert features[name] == value
+
+    def test_unknown_priority_is_missing(self, requests):
+        """Test that an unrecognized explicit priority is left out."""
+        features = ContextFeatureExtractor().extract_features(requests[4])
+        assert "explicit_priority" not in features
+
+
+class TestPriorityBatch:
+    """Tests for batched priority calculation."""
+
+    def test_batch_matches_single(self, requests):
+        """Test that batched and per-request priorities agree."""
+        router = PriorityRouter()
+        expected = [router.calculate_priority(request) for request in requests]
+
+        assert router.calculate_priority_batch(requests) == expected
+        assert set(expected) == set(Priority)
+
+    def test_empty_batch(self):
+        """Test that an empty batch returns no priorities."""
+        assert PriorityRouter().calculate_priority_batch([]) == []
+
+
+class TestPriorityExplanation:
+    """Tests for priority explanations."""
+
+    def test_explanation_matches_priority(self, requests):
+        """Test that explanations agree with the calculated priority."""
+        router = PriorityRouter()
+        for request in requests:
+            explanation = router.explain_priority(request)
+
+            assert explanation["priority"] == router.calculate_priority(request).name
+            assert sum(explanation["contributions"].values()) == pytest.approx(1.0)
+            assert len(explanation["top_factors"]) == 3
+
+    def test_features_extracted_once(self, requests):
+        """Test that an explanation evaluates the features a single time."""
+        router = PriorityRouter()
+        extractor = router.feature_extractor
+        with patch.object(
+            extractor,
+            "extract_features_into",
+            wraps=extractor.extract_features_into,
+        ) as extract:
+            result = router.evaluate_priority(requests[2])
+            result.to_dict()
+
+        assert extract.call_count == 1
+        assert result.priority == Priority.NORMAL
+        assert result.top_factors(1)[0][0] == "is_security_related"
+
+
+class TestDeadlines:
+    """Tests for deadline extraction from notification text."""
+
+    NOW = datetime(2024, 5, 1, 10, 0)
+
+    @pytest.mark.parametrize(
+        "text,expected",
+        [
+            ("payment due in 15 minutes", datetime(2024, 5, 1, 10, 15)),
+            ("meeting in 2 hrs", datetime(2024, 5, 1, 12, 0)),
+            ("session ends in 30 secs", datetime(2024, 5, 1, 10, 0, 30)),
+            ("standup today at 14", datetime(2024, 5, 1, 14, 0)),
+            ("submit by 9:30", datetime(2024, 5, 2, 9, 30)),
+            ("in 3 hours or by 11:15", datetime(2024, 5, 1, 11, 15)),
+            ("your report is due at noon", None),
+            ("nothing time related", None),
+        ],
+    )
+    def test_extract_deadline(self, text, expected):
+        """Test that deadlines are parsed into absolute times."""
+        _, deadline = ContextFeatureExtractor().scan_time_references(text, self.NOW)
+        assert deadline == expected
+
+    def test_out_of_range_amount(self):
+        """Test that huge relative amounts set no deadline instead of failing."""
+        text = "server restarts in 99999999999 minutes"
+        _, deadline = ContextFeatureExtractor().scan_time_references(text, self.NOW)
+        assert deadline is None
+
+        request = NotificationRequest("n1", "t", text, "u1")
+        router = PriorityRouter()
+        assert router.evaluate_priority(request, now=self.NOW).deadline is None
+        assert router.calculate_priority_batch([request]) == [
+            router.calculate_priority(request)
+        ]
+
+    def test_reference_count_matches_patterns(self):
+        """Test that each kind of time reference is counted once."""
+        extractor = ContextFeatureExtractor()
+        count, _ = extractor.scan_time_references(
+            "due in 5 minutes, in 10 minutes or by 12:00", self.NOW
+        )
+        assert count == 3
+
+    def test_result_carries_deadline(self):
+        """Test that priority evaluation reports the parsed deadline."""
+        request = NotificationRequest(
+            notification_id="n1",
+            content_title="Reminder",
+            content_body="Your session expires in 10 minutes",
+            recipient_id="u1",
+        )
+        result = PriorityRouter().evaluate_priority(request, now=self.NOW)
+        assert result.deadline == datetime(2024, 5, 1, 10, 10)
+
+    def test_router_clock(self):
+        """Test that deadlines default to the router's clock."""
+        clock = VirtualClock(start=self.NOW.timestamp())
+        router = PriorityRouter(clock=clock)
+        request = NotificationRequest("n1", "Reminder", "Expires in 10 minutes", "u1")
+
+        assert router.evaluate_priority(request).deadline == datetime(
+            2024, 5, 1, 10, 10
+        )
+        clock.advance(3600)
+        assert router.evaluate_priority(request).deadline == datetime(
+            2024, 5, 1, 11, 10
+        )
+        _, deadline = router.feature_extractor.scan_time_references("by 9:00")
+        assert deadline == datetime(2024, 5, 2, 9, 0)
+
+
+class TestTextFeatureCache:
+    """Tests for the text feature cache."""
+
+    def make_request(self, **context):
+        """Create a request from a fixed template."""
+        return NotificationRequest(
+            notification_id="n1",
+            content_title="Reminder",
+            content_body="Your session expires in 10 minutes",
+            recipient_id="u1",
+            context=context,
+        )
+
+    def test_template_text_is_processed_once(self):
+        """Test that repeated templates reuse cached text features."""
+        extractor = ContextFeatureExtractor()
+        row = np.empty(len(FEATURE_NAMES))
+        for relationship in (0.1, 0.5, 0.9):
+            extractor.extract_features_into(
+                self.make_request(user_relationship=relationship), row
+            )
+
+        info = extractor.text_features.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+        assert row[FEATURE_NAMES.index("user_relationship")] == 0.9
+
+    def test_deadlines_resolve_per_request(self):
+        """Test that cached text still yields deadlines relative to now."""
+        extractor = ContextFeatureExtractor()
+        row = np.empty(len(FEATURE_NAMES))
+        first = extractor.extract_features_into(
+            self.make_request(), row, datetime(2024, 5, 1, 10, 0)
+        )
+        second = extractor.extract_features_into(
+            self.make_request(), row, datetime(2024, 5, 1, 11, 0)
+        )
+
+        assert second - first == timedelta(hours=1)
+
+    def test_cache_is_bounded(self):
+        """Test that the cache evicts least recently used templates."""
+        extractor = ContextFeatureExtractor(cache_size=2)
+        for i in range(5):
+            extractor.text_features(f"title {i}", "body")
+
+        assert extractor.text_features.cache_info().currsize == 2
+
+
+class TestThresholdCalibration:
+    """Tests for streaming calibration of priority thresholds."""
+
+    def test_calibrator_hits_target_shares(self):
+        """Test that recalibrated thresholds split scores as targeted."""
+        calibrator = ThresholdCalibrator(target_shares=(4, 3, 2, 1), window=5000)
+        scores = np.random.RandomState(1).uniform(0.2, 0.7, 5000)
+
+        thresholds = None
+        for score in scores:
+            thresholds = calibrator.observe(score) or thresholds
+
+        shares = np.bincount(np.digitize(scores, thresholds, right=True)) / 5000
+        np.testing.assert_allclose(shares, [0.4, 0.3, 0.2, 0.1], atol=0.02)
+        assert calibrator.count == 0
+
+    def test_router_swaps_thresholds(self, requests):
+        """Test that the router applies thresholds after each window."""
+        router = PriorityRouter(calibrator=ThresholdCalibrator(window=10))
+        original = router.thresholds
+        router.calculate_priority_batch(requests * 2)
+
+        assert router.thresholds is not original
+        assert np.all(np.diff(router.thresholds) >= 0)
+
+    def test_rejects_invalid_thresholds(self):
+        """Test that decreasing thresholds are rejected."""
+        with pytest.raises(ValueError):
+            PriorityRouter().set_thresholds((0.8, 0.6, 0.3))
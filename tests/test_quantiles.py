@@ -0,0 +1,43 @@
+"""
+Tests for streaming quantile estimation.
+
+This module contains tests for the P² estimator used to calibrate priority
+thresholds.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from llama_notifications.quantiles import P2Quantile
+
+
+class TestP2Quantile:
+    """Tests for the P² quantile estimator."""
+
+    @pytest.mark.parametrize("quantile", [0.1, 0.5, 0.95])
+    def test_tracks_quantile(self, quantile):
+        """Test that the estimate converges to the true quantile."""
+        values = np.random.RandomState(0).beta(2, 5, 20000)
+        estimator = P2Quantile(quantile)
+        for value in values:
+            estimator.add(value)
+
+        assert estimator.value() == pytest.approx(
+            np.quantile(values, quantile), abs=0.01
+        )
+
+    def test_few_observations(self):
+        """Test estimates before the markers are initialized."""
+        estimator = P2Quantile(0.5)
+        assert math.isnan(estimator.value())
+
+        for value in (3.0, 1.0, 2.0):
+            estimator.add(value)
+        assert estimator.value() == 2.0
+
+    def test_invalid_quantile(self):
+        """Test that quantiles outside (0, 1) are rejected."""
+        with pytest.raises(ValueError):
+            P2Quantile(1.0)
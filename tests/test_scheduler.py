@@ -0,0 +1,150 @@
+"""
+Tests for the dispatch scheduler.
+
+This module contains tests for priority lanes, deadline ordering and
+deferred release in the dispatch queue.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from llama_notifications.clock import VirtualClock
+from llama_notifications.engagement import EngagementStore, ReceiptEvent
+from llama_notifications.priority import NotificationRequest, Priority, PriorityRouter
+from llama_notifications.scheduler import DispatchQueue
+
+NOW = datetime(2024, 5, 1, 10, 0)
+
+
+class TestDispatchQueue:
+    """Tests for the dispatch queue."""
+
+    def test_higher_lanes_first(self):
+        """Test that higher priority lanes are drained first."""
+        queue = DispatchQueue()
+        queue.push("low", Priority.LOW, NOW)
+        queue.push("urgent", Priority.URGENT)
+        queue.push("normal", Priority.NORMAL, NOW)
+
+        assert [queue.pop() for _ in range(3)] == ["urgent", "normal", "low"]
+
+    def test_earliest_deadline_first_within_lane(self):
+        """Test that a lane is ordered by deadline, then arrival."""
+        queue = DispatchQueue()
+        queue.push("no-deadline-1", Priority.NORMAL)
+        queue.push("later", Priority.NORMAL, NOW + timedelta(hours=2))
+        queue.push("no-deadline-2", Priority.NORMAL)
+        queue.push("sooner", Priority.NORMAL, NOW + timedelta(minutes=5))
+
+        assert queue.peek() == "sooner"
+        assert [queue.pop() for _ in range(4)] == [
+            "sooner",
+            "later",
+            "no-deadline-1",
+            "no-deadline-2",
+        ]
+
+    def test_push_result(self):
+        """Test that evaluated priorities and deadlines route the queue."""
+        router = PriorityRouter()
+        queue = DispatchQueue()
+        for minutes in (30, 5):
+            request = NotificationRequest(
+                notification_id=f"expires-{minutes}",
+                content_title="Reminder",
+                content_body=f"Your code expires in {minutes} minutes",
+                recipient_id="u1",
+            )
+            queue.push_result(request, router.evaluate_priority(request, now=NOW))
+
+        assert queue.pop().notification_id == "expires-5"
+        assert len(queue) == 1
+
+    def test_pop_empty(self):
+        """Test that popping an empty queue raises."""
+        queue = DispatchQueue()
+        assert queue.peek() is None
+        with pytest.raises(IndexError):
+            queue.pop()
+
+
+class TestDeferral:
+    """Tests for deferred notifications."""
+
+    def test_release_at_time(self):
+        """Test that deferred notifications join their lane when due."""
+        clock = VirtualClock(start=1000.0)
+        queue = DispatchQueue(clock=clock)
+        queue.defer("digest", Priority.LOW, release_at=1600.0)
+        queue.push("alert", Priority.HIGH)
+
+        assert len(queue) == 2
+        assert queue.pop() == "alert"
+        assert queue.peek() is None
+        assert queue.next_release_time() == 1600.0
+        with pytest.raises(IndexError):
+            queue.pop()
+
+        clock.advance(600)
+        assert queue.pop() == "digest"
+        assert queue.deferred_count() == 0
+
+    def test_batch_jitter(self):
+        """Test that batch deferral spreads wake-ups without moving them earlier."""
+        queue = DispatchQueue(clock=VirtualClock(start=0.0), seed=7)
+        queue.defer_many(
+            [(f"n{i}", Priority.LOW, 7200.0) for i in range(100)]
+            + [("other", Priority.NORMAL, 9000.0)],
+            jitter_seconds=600.0,
+        )
+
+        release_times = sorted(entry[0] for entry in queue._deferred)
+        assert release_times[0] >= 7200.0
+        assert release_times[-2] < 7800.0
+        assert release_times[-1] == pytest.approx(9000.0, abs=600.0)
+        # Evenly spread: each minute of the window gets its share
+        buckets = [int((t - 7200.0) // 60) for t in release_times[:100]]
+        assert all(buckets.count(minute) == 10 for minute in range(10))
+
+        assert queue.release(7500.0) == 50
+        assert queue.lane_sizes()["LOW"] == 50
+
+    def test_batch_deadlines(self):
+        """Test that batch deferral keeps deadlines and releases by them."""
+        queue = DispatchQueue(clock=VirtualClock(start=0.0), seed=7)
+        queue.defer_many(
+            [
+                ("later", Priority.LOW, 100.0, datetime.fromtimestamp(5000.0)),
+                ("none", Priority.LOW, 100.0),
+                ("sooner", Priority.LOW, 100.0, datetime.fromtimestamp(150.0)),
+            ],
+            jitter_seconds=600.0,
+        )
+
+        release_times = {entry[2]: entry[0] for entry in queue._deferred}
+        assert 100.0 <= release_times["sooner"] <= 150.0
+
+        queue.release(1000.0)
+        assert [queue.pop() for _ in range(3)] == ["sooner", "later", "none"]
+
+    def test_best_hour(self):
+        """Test deferring low-priority notifications to the best hour."""
+        monday = 1714348800.0  # 2024-04-29 00:00 UTC
+        store = EngagementStore(landmark=monday)
+        for hour in range(24):
+            store.record("u1", ReceiptEvent.DELIVERED, monday + hour * 3600)
+        store.record("u1", ReceiptEvent.OPENED, monday + 18.2 * 3600)
+
+        clock = VirtualClock(start=monday + 7 * 86400 + 9 * 3600)
+        queue = DispatchQueue(clock=clock, engagement_store=store)
+
+        evening = monday + 7 * 86400 + 18 * 3600
+        assert queue.push_at_best_hour("digest", Priority.LOW, "u1") == evening
+        assert queue.push_at_best_hour("alert", Priority.HIGH, "u1") is None
+        assert queue.push_at_best_hour("promo", Priority.LOW, "nobody") is None
+        assert queue.pop() == "alert"
+        assert queue.pop() == "promo"
+
+        clock.advance_to(evening)
+        assert queue.pop() == "digest"
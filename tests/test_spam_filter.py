@@ -0,0 +1,471 @@
+"""
+Tests for the spam filter.
+
+This module contains tests for the neural network spam filter and the
+on-disk model format it loads.
+"""
+
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from llama_notifications.model_store import (
+    HEADER_SIZE,
+    ModelFormatError,
+    load_weights,
+    save_weights,
+)
+from llama_notifications.near_duplicate import NearDuplicateIndex
+from llama_notifications.reputation import SenderReputationStore
+from llama_notifications.spam_filter import (
+    CascadeConfig,
+    NotificationContent,
+    SimpleNeuralNetwork,
+    SpamFilter,
+)
+from llama_notifications.spam_pool import SpamFeaturePool
+from llama_notifications.spam_training import FeedbackBuffer, OnlineSpamTrainer
+
+
+@pytest.fixture
+def sample_content():
+    """Create sample notification content for testing."""
+    return NotificationContent(
+        title="Your order has shipped",
+        body="Track your package with the link in the app.",
+    )
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    """Write a model file from a freshly initialized network."""
+    path = str(tmp_path / "spam.model")
+    network = SimpleNeuralNetwork()
+    save_weights(path, network.get_weights())
+    return path
+
+
+class TestModelStore:
+    """Tests for the versioned model file format."""
+
+    def test_round_trip(self, model_file):
+        """Test that saved weights are mapped back unchanged."""
+        weights = load_weights(model_file)
+        assert weights.input_size == 32
+        assert weights.hidden_size == 16
+        assert weights["w1"].shape == (32, 16)
+        assert weights["b2"].shape == (1,)
+        assert not weights["w1"].flags.writeable
+
+    def test_checksum_mismatch(self, model_file):
+        """Test that a corrupted payload is rejected."""
+        with open(model_file, "r+b") as f:
+            f.seek(HEADER_SIZE + 8)
+            f.write(b"\xff\xff\xff\xff")
+
+        with pytest.raises(ModelFormatError):
+            load_weights(model_file)
+
+    def test_bad_magic(self, tmp_path):
+        """Test that files without the model header are rejected."""
+        path = tmp_path / "not-a-model"
+        path.write_bytes(b"\x00" * (HEADER_SIZE * 2))
+
+        with pytest.raises(ModelFormatError):
+            load_weights(str(path))
+
+
+class TestSpamFilterWeights:
+    """Tests for loading spam filter weights from disk."""
+
+    def test_lazy_load(self, model_file, sample_content):
+        """Test that weights are only mapped on first use."""
+        spam_filter = SpamFilter(model_path=model_file)
+        assert spam_filter.model_weights is None
+
+        spam_filter.is_spam(sample_content)
+        assert spam_filter.model_weights is not None
+
+    def test_scores_are_deterministic(self, model_file, sample_content):
+        """Test that filters loading the same file agree exactly."""
+        first = SpamFilter(model_path=model_file, cascade=CascadeConfig(enabled=False))
+        second = SpamFilter(model_path=model_file, cascade=CascadeConfig(enabled=False))
+
+        assert first.is_spam(sample_content) == second.is_spam(sample_content)
+
+    def test_missing_file(self, tmp_path, sample_content):
+        """Test that a missing model file falls back to default weights."""
+        spam_filter = SpamFilter(model_path=str(tmp_path / "missing.model"))
+        assert not spam_filter.preload()
+
+        is_spam, score = spam_filter.is_spam(sample_content)
+        assert 0.0 <= score <= 1.0
+
+
+class TestInferenceModes:
+    """Tests for reduced-precision spam network inference."""
+
+    @pytest.fixture
+    def sample_batch(self):
+        """Create a batch of varied contents for calibration."""
+        return [
+            NotificationContent(
+                title=f"Message {i}" + "!" * (i % 4),
+                body="FREE cash offer http://example.com " * (i % 3)
+                + "Your appointment is confirmed.",
+            )
+            for i in range(64)
+        ]
+
+    @pytest.mark.parametrize("mode", ["float32", "int8"])
+    def test_modes_track_float64(self, model_file, sample_batch, mode):
+        """Test that reduced-precision scores stay close to float64."""
+        reference = SpamFilter(model_path=model_file)
+        reduced = SpamFilter(model_path=model_file, inference_mode=mode)
+        reduced.calibrate(sample_batch)
+
+        expected = np.array([s for _, s in reference.is_spam_batch(sample_batch)])
+        actual = np.array([s for _, s in reduced.is_spam_batch(sample_batch)])
+        assert np.max(np.abs(expected - actual)) < 0.02
+
+    def test_batch_matches_single(self, model_file, sample_batch):
+        """Test that batch scoring agrees with per-item scoring."""
+        spam_filter = SpamFilter(model_path=model_file)
+        batch = spam_filter.is_spam_batch(sample_batch[:8])
+        single = [spam_filter.is_spam(content) for content in sample_batch[:8]]
+
+        for (_, batch_score), (_, single_score) in zip(batch, single):
+            assert batch_score == pytest.approx(single_score)
+
+    def test_inference_report(self, model_file, sample_batch):
+        """Test that the report covers every mode."""
+        spam_filter = SpamFilter(model_path=model_file)
+        report = spam_filter.inference_report(sample_batch, repeats=1)
+
+        assert set(report) == {"float64", "float32", "int8"}
+        assert report["float64"]["max_abs_error"] == 0.0
+        assert report["int8"]["rows_per_second"] > 0
+
+
+class TestNearDuplicateIndex:
+    """Tests for campaign detection over near-duplicate messages."""
+
+    @staticmethod
+    def _variant(i):
+        words = [
+            "Congratulations you have been selected to receive a gift card",
+            "worth 500 dollars claim it at our site before the offer expires",
+        ]
+        return NotificationContent(title="Reward", body=f"{' '.join(words)} {i}")
+
+    def test_variants_join_one_cluster(self):
+        """Test that messages differing by a word share a cluster."""
+        index = NearDuplicateIndex(volume_threshold=3)
+        matches = [index.observe(self._variant(i), now=100.0) for i in range(3)]
+
+        assert len({m.cluster_id for m in matches}) == 1
+        assert matches[-1].is_campaign
+
+    def test_unrelated_messages_stay_apart(self):
+        """Test that different messages form separate clusters."""
+        index = NearDuplicateIndex()
+        first = index.observe(
+            NotificationContent(title="Order", body="Your order has shipped"),
+            now=100.0,
+        )
+        second = index.observe(
+            NotificationContent(title="Meeting", body="Standup moved to 10am"),
+            now=100.0,
+        )
+        assert first.cluster_id != second.cluster_id
+
+    def test_entries_expire(self):
+        """Test that entries older than the window are dropped."""
+        index = NearDuplicateIndex(window_seconds=60)
+        index.observe(self._variant(0), now=0.0)
+        index.observe(self._variant(1), now=100.0)
+
+        assert len(index) == 1
+
+    def test_campaign_verdict_is_reused(self, model_file):
+        """Test that later campaign members reuse the cluster verdict."""
+        index = NearDuplicateIndex(volume_threshold=2)
+        spam_filter = SpamFilter(model_path=model_file, near_duplicate_index=index)
+
+        spam_filter.is_spam(self._variant(0))
+        boosted = spam_filter.is_spam(self._variant(1))
+        with patch.object(spam_filter.scorer, "forward") as forward:
+            reused = spam_filter.is_spam(self._variant(2))
+
+        assert not forward.called
+        assert reused == boosted
+
+
+class TestSpamCascade:
+    """Tests for the cheap-rule-first spam cascade."""
+
+    def test_short_plain_text_skips_model(self, sample_content):
+        """Test that obviously clean content exits at the clean rule."""
+        spam_filter = SpamFilter()
+        with patch.object(spam_filter.scorer, "forward") as forward:
+            is_spam, _ = spam_filter.is_spam(sample_content)
+
+        assert not is_spam
+        assert not forward.called
+        assert spam_filter.get_cascade_stats()["exits"]["clean_rule"] == 1
+
+    def test_phrase_hits_skip_model(self):
+        """Test that content with several spam phrases exits as spam."""
+        spam_filter = SpamFilter()
+        content = NotificationContent(
+            title="Act now", body="Get rich quick and double your money"
+        )
+        is_spam, _ = spam_filter.is_spam(content)
+
+        assert is_spam
+        assert spam_filter.stage_exits["phrase_rule"] == 1
+        assert spam_filter.stage_exits["model"] == 0
+
+    def test_ambiguous_content_reaches_model(self):
+        """Test that links send content through the model stage."""
+        spam_filter = SpamFilter()
+        content = NotificationContent(
+            title="Update", body="See https://example.com/changes for details"
+        )
+        spam_filter.is_spam(content)
+
+        stats = spam_filter.get_cascade_stats()
+        assert stats["exits"]["model"] == 1
+        assert stats["model_skip_rate"] == 0.0
+
+    def test_disabled_cascade(self, sample_content):
+        """Test that a disabled cascade always runs the model."""
+        spam_filter = SpamFilter(cascade=CascadeConfig(enabled=False))
+        spam_filter.is_spam_batch([sample_content, sample_content])
+
+        assert spam_filter.stage_exits["model"] == 2
+
+
+class TestSenderReputation:
+    """Tests for the per-sender reputation store."""
+
+    def test_trust_requires_history(self):
+        """Test that senders become trusted only after clean volume."""
+        store = SenderReputationStore(min_volume=20)
+        for i in range(10):
+            store.record("tenant-a", False, now=float(i))
+        assert not store.is_trusted("tenant-a", now=10.0)
+
+        for i in range(10, 40):
+            store.record("tenant-a", False, now=float(i))
+        assert store.is_trusted("tenant-a", now=40.0)
+
+    def test_spam_history_blocks_trust(self):
+        """Test that spam verdicts lower a sender's reputation."""
+        store = SenderReputationStore(min_volume=5)
+        for i in range(20):
+            store.record("tenant-b", i % 2 == 0, now=float(i))
+
+        reputation = store.get("tenant-b", now=20.0)
+        assert reputation.spam_rate > 0.4
+        assert not store.is_trusted("tenant-b", now=20.0)
+
+    def test_volume_spike_blocks_trust(self):
+        """Test that a burst of messages withholds trust."""
+        store = SenderReputationStore(min_volume=5, max_burst=10)
+        for _ in range(20):
+            store.record("tenant-c", False, now=0.0)
+        assert not store.is_trusted("tenant-c", now=0.0)
+        assert store.is_trusted("tenant-c", now=3600.0)
+
+    def test_capacity_is_bounded(self):
+        """Test that the table evicts instead of growing."""
+        store = SenderReputationStore(capacity=16, max_probe=4)
+        for i in range(100):
+            store.record(f"sender-{i}", False, now=0.0)
+
+        assert len(store) <= 16
+        assert store.evictions > 0
+
+    def test_trusted_sender_skips_model(self):
+        """Test that the spam filter skips inference for trusted senders."""
+        store = SenderReputationStore(min_volume=2, trust_threshold=0.75)
+        spam_filter = SpamFilter(reputation_store=store)
+        content = NotificationContent(
+            title="Invoice",
+            body="Your invoice is ready at https://billing.example.com",
+            metadata={"sender_id": "billing"},
+        )
+        for _ in range(3):
+            store.record("billing", False)
+
+        with patch.object(spam_filter.scorer, "forward") as forward:
+            is_spam, _ = spam_filter.is_spam(content)
+
+        assert not is_spam
+        assert not forward.called
+        assert spam_filter.stage_exits["reputation"] == 1
+
+    def test_trusted_sender_text_is_checked(self):
+        """Test that trust neither skips the phrase rule nor feeds itself."""
+        store = SenderReputationStore(min_volume=2, trust_threshold=0.75)
+        spam_filter = SpamFilter(reputation_store=store)
+        for _ in range(3):
+            store.record("billing", False)
+
+        spam = NotificationContent(
+            title="Congratulations you won",
+            body="Click here to claim your free money, act now!",
+            metadata={"sender_id": "billing"},
+        )
+        invoice = NotificationContent(
+            title="Invoice",
+            body="Your invoice is ready at https://billing.example.com",
+            metadata={"sender_id": "billing"},
+        )
+        before = store.get("billing")
+        spam_filter.is_spam(invoice)
+        spam_filter.is_spam_batch([invoice, invoice])
+        after = store.get("billing")
+        assert spam_filter.stage_exits["reputation"] == 3
+        assert after.volume > before.volume
+        assert after.reputation == pytest.approx(before.reputation, rel=1e-3)
+
+        assert spam_filter.is_spam(spam)[0]
+        assert spam_filter.stage_exits["phrase_rule"] == 1
+        assert not store.is_trusted("billing")
+
+    def test_burst_withdraws_trust(self):
+        """Test that a burst from a trusted sender goes back to the model."""
+        store = SenderReputationStore(min_volume=2, trust_threshold=0.75, max_burst=5)
+        spam_filter = SpamFilter(reputation_store=store)
+        for _ in range(3):
+            store.record("billing", False)
+        invoice = NotificationContent(
+            title="Invoice",
+            body="Your invoice is ready at https://billing.example.com",
+            metadata={"sender_id": "billing"},
+        )
+
+        with patch.object(spam_filter.scorer, "forward", return_value=0.1) as forward:
+            for _ in range(10):
+                spam_filter.is_spam(invoice)
+
+        assert spam_filter.stage_exits["reputation"] == 3
+        assert forward.call_count == 7
+        assert not store.is_trusted("billing")
+
+
+class TestOnlineTraining:
+    """Tests for online training from user feedback."""
+
+    @pytest.fixture
+    def feedback(self):
+        """Create labeled spam and legitimate examples."""
+        spam = NotificationContent(
+            title="FREE PRIZE WINNER",
+            body="Click here now to claim your free money! Act now!!!",
+        )
+        ham = NotificationContent(
+            title="Build finished",
+            body="The nightly build for the main branch completed.",
+        )
+        return spam, ham
+
+    def test_training_separates_labels(self, feedback):
+        """Test that minibatch SGD learns to separate the feedback."""
+        spam, ham = feedback
+        spam_filter = SpamFilter(cascade=CascadeConfig(enabled=False))
+        trainer = OnlineSpamTrainer(
+            spam_filter, min_samples=20, publish_every=100, seed=0
+        )
+        for _ in range(50):
+            trainer.report_spam(spam)
+            trainer.report_opened(ham)
+
+        losses = [trainer.train_step() for _ in range(300)]
+        assert losses[-1] < losses[0]
+        assert trainer.publishes == 3
+
+        features = spam_filter.feature_extractor.extract_features
+        assert spam_filter.model.forward(features(spam)) > spam_filter.model.forward(
+            features(ham)
+        )
+
+    def test_waits_for_min_samples(self, feedback):
+        """Test that no step runs before enough feedback arrives."""
+        spam, _ = feedback
+        trainer = OnlineSpamTrainer(SpamFilter(), min_samples=10)
+        trainer.report_spam(spam)
+
+        assert trainer.train_step() is None
+        assert len(trainer.buffer) == 1
+
+    def test_full_queue_drops_feedback(self, feedback):
+        """Test that submitting never blocks on a full queue."""
+        spam, _ = feedback
+        trainer = OnlineSpamTrainer(SpamFilter(), max_pending=2)
+
+        assert [trainer.report_spam(spam) for _ in range(3)] == [True, True, False]
+        assert trainer.dropped == 1
+
+    def test_ring_buffer_overwrites_oldest(self):
+        """Test that the feedback buffer stays bounded."""
+        buffer = FeedbackBuffer(capacity=4, input_size=2)
+        for i in range(6):
+            buffer.append([i, i], float(i % 2))
+
+        assert len(buffer) == 4
+        assert sorted(buffer.features[:, 0].tolist()) == [2, 3, 4, 5]
+
+    def test_published_file_is_reloaded(self, model_file, feedback):
+        """Test that other processes pick up weights written to disk."""
+        spam, ham = feedback
+        trainer_filter = SpamFilter(model_path=model_file)
+        trainer = OnlineSpamTrainer(
+            trainer_filter, min_samples=2, publish_path=model_file
+        )
+        serving_filter = SpamFilter(model_path=model_file, model_reload_seconds=0)
+        serving_filter.preload()
+        before = serving_filter.model.get_weights()["w1"].copy()
+
+        trainer.report_spam(spam)
+        trainer.report_opened(ham)
+        trainer.train_step()
+        trainer.publish()
+        # Make sure the new file has a different mtime
+        os.utime(model_file, (0, 1))
+        serving_filter._ensure_model()
+
+        after = serving_filter.model.get_weights()["w1"]
+        assert not np.allclose(before, after)
+
+
+class TestSpamFeaturePool:
+    """Tests for process-pool feature extraction."""
+
+    def test_matches_serial_extraction(self, sample_content):
+        """Test that worker processes fill the same feature matrix."""
+        contents = [
+            NotificationContent(title=f"Offer {i}", body="Win FREE cash now! " * i)
+            for i in range(40)
+        ] + [sample_content]
+        serial = SpamFilter()._extract_feature_matrix(contents)
+
+        with SpamFeaturePool(workers=2, min_batch_size=8) as pool:
+            parallel = pool.extract(contents)
+            results = SpamFilter(
+                cascade=CascadeConfig(enabled=False), feature_pool=pool
+            ).is_spam_batch(contents)
+
+        np.testing.assert_array_equal(parallel, serial)
+        assert len(results) == len(contents)
+
+    def test_small_batches_stay_in_process(self, sample_content):
+        """Test that small batches don't start worker processes."""
+        pool = SpamFeaturePool(workers=2, min_batch_size=8)
+        pool.extract([sample_content])
+
+        assert pool._executor is None